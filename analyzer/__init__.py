@@ -0,0 +1 @@
+"""Analysis engine shared by the Streamlit pages (mapping, normalization, aggregation)."""
@@ -0,0 +1,211 @@
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from analyzer.drill import column_codes
+from analyzer.jobs import get_job_manager
+from analyzer.parallel import PARALLEL_MIN_ROWS, parallel_group_sums
+
+# ── Code-handling logic (disambiguation, normalization) ─────────────────────────
+CODE_KEYS = {"isrc", "upc"}                 # only codes (without *_id)
+MISSING_LABEL = "NaN"                       # label for empty code
+DISAMBIG_MODE = "full"                      # "full" - show full code; "tail"  only tail
+DISAMBIG_TAIL_LEN = 6
+RPM_MIN_STREAMS = 1000
+
+def _is_code_key(name: str) -> bool:
+    return str(name).lower() in CODE_KEYS
+
+def _normalize_code_series(s: pd.Series) -> pd.Series:
+    # keep true missing values, empty strings -> <NA>
+    s = pd.Series(s, dtype="string")
+    s = s.str.strip().str.upper().str.replace(r"[^A-Z0-9]", "", regex=True)
+    s = s.replace("", pd.NA)
+    return s
+
+def _normalized_codes(codes: np.ndarray, uniques: pd.Index) -> Tuple[np.ndarray, pd.Index]:
+    """Factorization of the normalized code key, from one of the raw codes (normalizes the uniques only)."""
+    norm_codes, norm_uniques = pd.factorize(_normalize_code_series(pd.Series(uniques)))
+    return np.append(norm_codes, -1)[codes], pd.Index(norm_uniques)
+
+def _group_sums(frame: pd.DataFrame, group_key: str, cols: Sequence[str] = ("quantity", "revenue"),
+                dropna: bool = False, coded: Optional[Tuple[np.ndarray, pd.Index]] = None) -> pd.DataFrame:
+    """
+    groupby-sum; large frames are split into row partitions summed by worker processes.
+    coded: (codes, uniques) of frame[group_key] when the dataset already has them (drill.column_codes).
+    """
+    if len(frame) >= PARALLEL_MIN_ROWS:
+        return parallel_group_sums(frame[group_key], {c: frame[c] for c in cols}, dropna,
+                                   get_job_manager().process_pool, coded)
+    return frame.groupby(group_key, dropna=dropna, as_index=False).agg(**{c: (c, "sum") for c in cols})
+
+def resolve_dim_keys(analysis_type: str, frame: pd.DataFrame) -> Tuple[str, str, str]:
+    if analysis_type == "Platforms": return "platform", "platform", "Top Platforms"
+    if analysis_type == "Countries": return "country", "country", "Top Countries"
+    if analysis_type == "Artists":   return "artist_name", "artist_name", "Top Artists"
+    if analysis_type == "Releases":
+        if "upc" in frame.columns and frame["upc"].notna().any():
+            return "upc", "release_title", "Top Releases"
+        return "release_title", "release_title", "Top Releases"
+    # Tracks
+    if "isrc" in frame.columns and frame["isrc"].notna().any():
+        return "isrc", "track_title", "Top Tracks"
+    return "track_title", "track_title", "Top Tracks"
+
+def aggregate_with_labels(df_src: pd.DataFrame, key_col: str, label_col: str,
+                          coded: Optional[Tuple[np.ndarray, pd.Index]] = None) -> pd.DataFrame:
+    """coded: cached (codes, uniques) of df_src[key_col], used by the worker-process path of large frames."""
+    if key_col not in df_src.columns: key_col, coded = label_col, None
+    tmp = df_src.copy()
+    group_key = key_col
+
+    # code key → normalize and group with dropna=False (to keep NaN group)
+    if _is_code_key(key_col):
+        if coded is not None:
+            coded = _normalized_codes(*coded)
+            tmp["_key_norm"] = pd.array(coded[1], dtype="string").take(coded[0], allow_fill=True)
+        else:
+            tmp["_key_norm"] = _normalize_code_series(tmp[key_col])
+        group_key = "_key_norm"
+
+    agg = _group_sums(tmp, group_key, coded=coded)
+    if group_key != key_col:
+        agg = agg.rename(columns={group_key: key_col})
+
+    # labels
+    if key_col == label_col or label_col not in tmp.columns:
+        agg["label"] = agg[key_col].astype("string").fillna(MISSING_LABEL)
+    else:
+        labels = tmp[[group_key, label_col]].copy()
+        if group_key != key_col:
+            labels = labels.rename(columns={group_key: key_col})
+        labels = (
+            labels
+            .dropna(subset=[key_col, label_col])
+            .drop_duplicates(subset=[key_col])
+            .rename(columns={label_col: "label"})
+        )
+        agg = agg.merge(labels, on=key_col, how="left")
+        agg["label"] = agg["label"].astype("string")
+        agg.loc[agg["label"].isna(), "label"] = agg[key_col].astype("string")
+        agg["label"] = agg["label"].fillna(MISSING_LABEL)
+
+    # rpm
+    q, r = agg["quantity"].to_numpy("float64"), agg["revenue"].to_numpy("float64")
+    agg["rpm"] = np.divide(r, q, out=np.zeros_like(r), where=q > 0) * 1000
+    return agg
+
+def top_k_indices(values: np.ndarray, k: int) -> np.ndarray:
+    """
+    Positions of the k largest values, largest first, without sorting the whole array
+    (argpartition + sort of the k winners). Ties keep row order, like a stable descending sort.
+    """
+    v = np.asarray(values, dtype=np.float64)
+    v = np.where(np.isnan(v), -np.inf, v)
+    n = len(v)
+    k = max(0, min(int(k), n))
+    if k == 0:
+        return np.empty(0, dtype=np.intp)
+    if k < n:
+        thr = v[np.argpartition(v, n - k)[n - k]]
+        above = np.flatnonzero(v > thr)
+        idx = np.concatenate([above, np.flatnonzero(v == thr)[:k - len(above)]])
+    else:
+        idx = np.arange(n)
+    return idx[np.argsort(-v[idx], kind="stable")]
+
+def top_k(agg: pd.DataFrame, metric_col: str, k: int, min_quantity: float = 0) -> pd.DataFrame:
+    """
+    Top-k rows of an aggregate by metric_col (largest first). Rows with quantity below
+    min_quantity are excluded in the same pass (used for the RPM_MIN_STREAMS threshold).
+    """
+    values = agg[metric_col].to_numpy(dtype=np.float64, na_value=np.nan)
+    if not min_quantity:
+        return agg.iloc[top_k_indices(values, k)]
+    eligible = np.flatnonzero(agg["quantity"].to_numpy(dtype=np.float64, na_value=np.nan) >= min_quantity)
+    return agg.iloc[eligible[top_k_indices(values[eligible], k)]]
+
+def top3_labels_by_revenue(frame: pd.DataFrame, key_col: str, label_col: str,
+                           labels: Optional[pd.Series] = None) -> List[str]:
+    """Top 3 groups by revenue as 'label (share)'; labels: optional lookup table key → label."""
+    if key_col not in frame.columns: key_col = label_col
+    tmp = frame[[c for c in dict.fromkeys([key_col, label_col, "revenue"]) if c in frame.columns]].copy()
+    group_key = key_col
+
+    # large frames (the whole dataset for the KPI header): its cached factorization of the key
+    coded = column_codes(frame, key_col) if len(frame) >= PARALLEL_MIN_ROWS else None
+    if _is_code_key(key_col):
+        if coded is not None:
+            coded = _normalized_codes(*coded)
+            tmp["_key_norm"] = pd.array(coded[1], dtype="string").take(coded[0], allow_fill=True)
+        else:
+            tmp["_key_norm"] = _normalize_code_series(tmp[key_col])
+        group_key = "_key_norm"
+
+    agg = _group_sums(tmp, group_key, ("revenue",), coded=coded)
+    if agg.empty: return []
+
+    total = float(agg["revenue"].sum()) or 1.0
+    agg = top_k(agg, "revenue", 3).reset_index(drop=True)   # label only the winners
+
+    if labels is not None:
+        keys = agg[group_key].astype("string")
+        agg["label"] = keys.map(labels).astype("string").fillna(keys).fillna(MISSING_LABEL)
+    elif key_col == label_col or label_col not in tmp.columns:
+        agg["label"] = agg[group_key].astype("string").fillna(MISSING_LABEL)
+    else:
+        labels = (
+            tmp.loc[tmp[group_key].isin(agg[group_key]), [group_key, label_col]]
+            .dropna(subset=[group_key, label_col])
+            .drop_duplicates(subset=[group_key])
+            .rename(columns={label_col: "label"})
+        )
+        agg = agg.merge(labels, on=group_key, how="left")
+        agg["label"] = agg["label"].astype("string")
+        agg.loc[agg["label"].isna(), "label"] = agg[group_key].astype("string")
+        agg["label"] = agg["label"].fillna(MISSING_LABEL)
+
+    return [f'{row["label"]} ({row["revenue"]/total:.0%})' for _, row in agg.iterrows()]
+
+def _disambiguate_labels(frame: pd.DataFrame, key_col: str, label_col: str = "label") -> pd.DataFrame:
+    df2 = frame.copy()
+    if key_col not in df2.columns or label_col not in df2.columns: return df2
+    dup_mask = df2[label_col].astype("string").duplicated(keep=False)
+    if dup_mask.any():
+        raw = df2[key_col].astype("string")
+        clean = raw.fillna("").str.replace(r"[^A-Za-z0-9]", "", regex=True).str.upper()
+        if DISAMBIG_MODE == "full":
+            code_show = clean
+        else:
+            code_show = clean.str[-max(1, int(DISAMBIG_TAIL_LEN)):]
+        # add tail only where key is not empty
+        add_mask = dup_mask & raw.notna() & (clean != "")
+        df2.loc[add_mask, label_col] = df2.loc[add_mask, label_col].astype("string") + " • " + code_show[add_mask]
+    return df2
+
+# ── Report-level helpers ─────────────────────────────────
+def period_label_from_reporting_month(frame: pd.DataFrame) -> str:
+    if "reporting_month" not in frame.columns:
+        return "—"
+    ser = pd.to_datetime(frame["reporting_month"], errors="coerce").dropna()
+    if ser.empty:
+        return "—"
+    start, end = ser.min(), ser.max()
+    fmt = "%m.%Y"
+    return start.strftime(fmt) if start.to_period("M") == end.to_period("M") else f"{start.strftime(fmt)}–{end.strftime(fmt)}"
+
+def detect_currency_hint(frame: pd.DataFrame) -> str:
+    if "currency" in frame.columns:
+        vals = [str(x).upper() for x in frame["currency"].dropna().unique().tolist()]
+        if len(vals) == 1: return f"currency: {vals[0]}"
+        elif len(vals) > 1:
+            preview = ", ".join(sorted(vals[:3])); suffix = "…" if len(vals) > 3 else ""
+            return f"mixed currencies ({preview}{suffix})"
+    return "in report currency (e.g., $ € £)"
+
+def apply_filters(frame: pd.DataFrame, filters: tuple) -> pd.DataFrame:
+    """filters: ((column, value), ...) — rows where every column equals its value."""
+    for col, val in filters:
+        frame = frame[frame[col] == val]
+    return frame
@@ -0,0 +1,447 @@
+"""
+HTTP API over the analysis engine (run locally with `python -m analyzer.api`).
+
+Uploads go through the same ingestion, mapping and background preparation as the
+Streamlit app, and every result is stored in (and served from) the same process-wide
+ResultCache under the same keys as the dashboard — one cached dataset serves any
+number of concurrent clients. Heavy work runs on worker threads, never on the event loop.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.gzip import DEFAULT_EXCLUDED_CONTENT_TYPES, GZipMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+from analyzer.aggregate import RPM_MIN_STREAMS, top_k
+from analyzer.cache import get_result_cache
+from analyzer.dataset import dataset_key, get_normalized, prepare_in_background, quality_report
+from analyzer.drill import drill_rows
+from analyzer.export import (
+    ARROW_MIME, METRIC_COLUMNS, PARQUET_MIME, XLSX_MIME, build_workbook, dataset_table,
+    summary_csv, summary_table, to_arrow_ipc, to_parquet,
+)
+from analyzer.ingest import parse_upload, sample_upload, upload_mode
+from analyzer.jobs import get_job_manager
+from analyzer.mapping import REQUIRED_FIELDS, suggest_mapping
+from analyzer.sketches import ALL, GROUP_DIMS, HEAVY_CANDIDATES, build_sketches, catalog_summary, selection_group
+from analyzer.startup import prewarm
+from analyzer.storage import PREVIEW_ROWS
+from analyzer.streaming import StreamSource
+from analyzer.views import TABS, kpi_summary, tab_view
+
+# ── Settings ─────────────────────────────────────────────
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8600
+DEFAULT_DATASETS = 32          # uploads kept by the service (override with ROYALTY_API_DATASETS)
+PAGE_LIMIT = 50                # rows per page of a tab (default / maximum)
+MAX_PAGE_LIMIT = 1000
+GZIP_MIN_BYTES = 1024          # smaller responses are sent uncompressed
+GZIP_LEVEL = 5                 # JSON / CSV compress well at a fraction of level 9's CPU
+# already compressed formats are not gzipped again
+BINARY_TYPES = (PARQUET_MIME, ARROW_MIME, XLSX_MIME)
+METRICS = {"earnings": "Earnings", "streams": "Streams", "rpm": "Value per 1K Streams"}
+TAB_NAMES = {tab.lower(): tab for tab in TABS}
+
+class ApiError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+# ── Dataset registry ─────────────────────────────────────
+class Dataset:
+    """
+    One upload + mapping. state mirrors the Streamlit session keys, so the normalized
+    frame is prepared, reused and released (IdleRef) exactly as for a browser session.
+    """
+
+    def __init__(self, name: str, digest: str, parse_job, stream_source=None, mapping=None):
+        self.name = name
+        self.state = {"dataset_digest": digest, "stream_source": stream_source}
+        self.parse_job = parse_job
+        self.raw = None
+        self.mapping: Optional[Dict[str, str]] = mapping
+        self.error: Optional[str] = None
+        self._lock = threading.Lock()
+        requested = json.dumps(mapping, sort_keys=True) if mapping is not None else "auto"
+        self.id = hashlib.blake2b(f"{digest}:{name}:{requested}".encode("utf-8"), digest_size=8).hexdigest()
+
+    @property
+    def key(self) -> tuple:
+        return dataset_key(self.state["dataset_digest"], self.mapping or {})
+
+    def start(self) -> None:
+        """Parse result → mapping (given or suggested) → background preparation. Errors end up in status()."""
+        try:
+            raw = self.parse_job.wait()
+            if self.mapping is None:
+                self.mapping = suggest_mapping(raw.head(PREVIEW_ROWS))
+            missing = [f for f in REQUIRED_FIELDS if f not in self.mapping]
+            if missing:
+                raise ValueError("Some required fields are not mapped: " + ", ".join(missing))
+            self.state["df_norm"] = prepare_in_background(
+                raw, self.mapping, self.state["dataset_digest"], self.state["stream_source"])
+            self.state["df_norm_mapping"] = dict(self.mapping)
+            self.raw = raw
+        except Exception as exc:
+            self.error = str(exc) or type(exc).__name__
+
+    def frame(self) -> pd.DataFrame:
+        with self._lock:
+            return get_normalized(self.state, self.raw, self.mapping)
+
+    def status(self) -> dict:
+        job = self.state.get("df_norm")
+        if self.error:
+            status, progress, message = "failed", 0.0, self.error
+        elif self.raw is None:
+            status, progress, message = "parsing", self.parse_job.progress, self.parse_job.message
+        elif job is not None and hasattr(job, "status") and not job.done:
+            status, progress, message = "preparing", job.progress, job.message
+        else:
+            status, progress, message = "ready", 1.0, ""
+        return {"id": self.id, "name": self.name, "status": status, "progress": round(progress, 3),
+                "message": message, "streaming": self.state["stream_source"] is not None,
+                "mapping": self.mapping}
+
+class Registry:
+    """Most recently used datasets (LRU); the oldest upload is dropped beyond the limit."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._items: "OrderedDict[str, Dataset]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, ds: Dataset) -> Dataset:
+        with self._lock:
+            ds = self._items.setdefault(ds.id, ds)
+            self._items.move_to_end(ds.id)
+            while len(self._items) > self.limit:
+                self._items.popitem(last=False)
+            return ds
+
+    def get(self, ds_id: str) -> Dataset:
+        with self._lock:
+            ds = self._items.get(ds_id)
+            if ds is None:
+                raise ApiError(404, f"Unknown dataset {ds_id}")
+            self._items.move_to_end(ds_id)
+            return ds
+
+    def remove(self, ds_id: str) -> None:
+        with self._lock:
+            if self._items.pop(ds_id, None) is None:
+                raise ApiError(404, f"Unknown dataset {ds_id}")
+
+    def all(self) -> List[Dataset]:
+        with self._lock:
+            return list(self._items.values())
+
+REGISTRY = Registry(int(os.environ.get("ROYALTY_API_DATASETS") or DEFAULT_DATASETS))
+
+# ── Helpers ──────────────────────────────────────────────
+async def off_loop(fn, *args):
+    """Run blocking work on a worker thread."""
+    return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+def cached(ds: Dataset, key: tuple, compute):
+    """Same cache entry as the dashboard's cached() for this dataset."""
+    return get_result_cache().get_or_compute((ds.key,) + key, compute)
+
+def _rows(ds: Dataset, df: pd.DataFrame, selection: tuple):
+    return drill_rows(df, selection, get_result_cache(), (ds.key,))
+
+def _ready(request: Request, selection: tuple = ()) -> Tuple[Dataset, pd.DataFrame]:
+    """The request's dataset, once prepared; the columns of a where= drill path must exist in it."""
+    ds, df = _ready_id(request.path_params["dataset_id"])
+    unknown = [col for col, _ in selection if col not in df.columns]
+    if unknown:
+        raise ApiError(400, f"Unknown where column {unknown[0]!r}; use one of " + ", ".join(map(str, df.columns)))
+    return ds, df
+
+def _ready_id(dataset_id: str) -> Tuple[Dataset, pd.DataFrame]:
+    ds = REGISTRY.get(dataset_id)
+    status = ds.status()["status"]
+    if status == "failed":
+        raise ApiError(422, ds.error)
+    if status != "ready":
+        raise ApiError(409, f"Dataset is still {status}")
+    return ds, ds.frame()
+
+def _tab(request: Request) -> str:
+    tab = TAB_NAMES.get(request.path_params["tab"].lower())
+    if tab is None:
+        raise ApiError(404, "Unknown tab; use one of " + ", ".join(TAB_NAMES))
+    return tab
+
+def _metric(request: Request) -> str:
+    metric = METRICS.get(request.query_params.get("metric", "earnings").lower())
+    if metric is None:
+        raise ApiError(400, "metric must be one of " + ", ".join(METRICS))
+    return metric
+
+def _int_param(request: Request, name: str, default: int, lo: int, hi: int) -> int:
+    try:
+        value = int(request.query_params.get(name, default))
+    except ValueError:
+        raise ApiError(400, f"{name} must be an integer")
+    return max(lo, min(hi, value))
+
+def _selection(request: Request) -> tuple:
+    """
+    Drill path from repeated ?where=column:value parameters (the dashboard's drill steps);
+    several values of one column select any of them.
+    """
+    steps: Dict[str, list] = {}
+    for item in request.query_params.getlist("where"):
+        col, sep, value = item.partition(":")
+        if not sep or not col:
+            raise ApiError(400, "where must look like column:value")
+        steps.setdefault(col, []).append(value)
+    return tuple((col, vals[0] if len(vals) == 1 else tuple(vals)) for col, vals in steps.items())
+
+def _json_safe(value):
+    if isinstance(value, (np.integer,)):
+        return int(value)
+    if isinstance(value, (np.floating, float)):
+        return None if np.isnan(value) else float(value)
+    if value is None or value is pd.NA or value is pd.NaT:
+        return None
+    return value
+
+def _download(data: bytes, media_type: str, filename: str) -> Response:
+    return Response(data, media_type=media_type, headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+# ── Endpoints ────────────────────────────────────────────
+async def upload(request: Request):
+    """POST /datasets?name=report.csv[&mapping={json}] with the file as the request body."""
+    name = (request.query_params.get("name") or "").strip()
+    if upload_mode(name, 0) == "unsupported":
+        raise ApiError(415, "Unsupported file type; upload a .csv or .xlsx file (pass ?name=)")
+    mapping = None
+    if "mapping" in request.query_params:
+        try:
+            mapping = {str(k): str(v) for k, v in json.loads(request.query_params["mapping"]).items()}
+        except (ValueError, AttributeError):
+            raise ApiError(400, "mapping must be a JSON object of field → column")
+
+    # the body goes to a temporary file as it arrives; only table-mode files are read into memory
+    source = StreamSource()
+    try:
+        async for chunk in request.stream():
+            source.write(chunk)
+            if upload_mode(name, source.size) == "too_large":
+                raise ApiError(413, "File too large")
+    except BaseException:
+        source.discard()
+        raise
+    source.close()
+    jobs = get_job_manager()
+    if upload_mode(name, source.size) == "stream":
+        ds = Dataset(name, source.digest, jobs.submit("sample", sample_upload, source), source, mapping)
+    else:
+        data = source.read_bytes()
+        source.discard()
+        ds = Dataset(name, source.digest, jobs.submit("parse", parse_upload, data, name.lower(), source.digest),
+                     None, mapping)
+    added = REGISTRY.add(ds)
+    if added is ds:
+        # parsing continues after the response; poll GET /datasets/{id} until it is ready
+        asyncio.get_running_loop().run_in_executor(None, ds.start)
+    return JSONResponse(added.status(), status_code=202)
+
+async def list_datasets(request: Request):
+    return JSONResponse([ds.status() for ds in REGISTRY.all()])
+
+async def dataset_status(request: Request):
+    ds = REGISTRY.get(request.path_params["dataset_id"])
+    out = ds.status()
+    if out["status"] == "ready":
+        ds, df = await off_loop(_ready, request)
+        out["rows"] = len(df)
+        out["quality"] = await off_loop(
+            quality_report, ds.raw, df, ds.mapping, ds.state["dataset_digest"], ds.state["stream_source"])
+    return JSONResponse(out)
+
+async def delete_dataset(request: Request):
+    REGISTRY.remove(request.path_params["dataset_id"])
+    return Response(status_code=204)
+
+async def summary(request: Request):
+    """KPI header: period, totals, currency and top 3 platforms / countries / tracks."""
+    def _work():
+        ds, df = _ready(request)
+        return cached(ds, ("summary",), lambda: kpi_summary(df))
+    return JSONResponse(await off_loop(_work))
+
+async def tab_page(request: Request):
+    """
+    GET /datasets/{id}/tabs/{tab}?metric=&offset=&limit=&where=col:value — one page of
+    the tab ranked by metric (RPM ranking skips entries under RPM_MIN_STREAMS streams).
+    """
+    tab, metric, selection = _tab(request), _metric(request), _selection(request)
+    offset = _int_param(request, "offset", 0, 0, 10**9)
+    limit = _int_param(request, "limit", PAGE_LIMIT, 1, MAX_PAGE_LIMIT)
+
+    def _work():
+        ds, df = _ready(request, selection)
+        view = cached(ds, ("tab", tab, selection), lambda: tab_view(df, tab, (), _rows(ds, df, selection)))
+        if view is None:
+            return {"tab": tab, "metric": metric, "total": 0, "offset": offset, "items": []}
+        agg = view["agg"]
+        min_q = RPM_MIN_STREAMS if metric == "Value per 1K Streams" else 0
+        ranked = top_k(agg, METRIC_COLUMNS[metric], offset + limit, min_q).iloc[offset:]
+        total = int((agg["quantity"] >= min_q).sum()) if min_q else len(agg)
+        items = [
+            {"key": _json_safe(k), "label": str(lbl), "streams": _json_safe(q), "earnings": _json_safe(r), "rpm": _json_safe(m)}
+            for k, lbl, q, r, m in zip(ranked[view["key_col"]].tolist(), ranked["label"].tolist(),
+                                       ranked["quantity"].tolist(), ranked["revenue"].tolist(), ranked["rpm"].tolist())
+        ]
+        return {"tab": tab, "metric": metric, "key_col": view["key_col"], "total": total, "offset": offset,
+                "streams": view["streams"], "earnings": view["revenue"], "items": items}
+    return JSONResponse(await off_loop(_work))
+
+async def tab_export(request: Request):
+    """GET /datasets/{id}/tabs/{tab}/export?format=csv|parquet|arrow — the dashboard's tab downloads."""
+    tab, metric, selection = _tab(request), _metric(request), _selection(request)
+    fmt = request.query_params.get("format", "csv").lower()
+    formats = {"csv": (summary_csv, "text/csv"),
+               "parquet": (lambda v, m: to_parquet(summary_table(v, m)), PARQUET_MIME),
+               "arrow": (lambda v, m: to_arrow_ipc(summary_table(v, m)), ARROW_MIME)}
+    if fmt not in formats:
+        raise ApiError(400, "format must be one of " + ", ".join(formats))
+    build, media_type = formats[fmt]
+
+    def _work():
+        ds, df = _ready(request, selection)
+        view = cached(ds, ("tab", tab, selection), lambda: tab_view(df, tab, (), _rows(ds, df, selection)))
+        if view is None:
+            raise ApiError(404, "No data for this selection")
+        return cached(ds, (fmt, tab, selection, metric), lambda: build(view, metric))
+    return _download(await off_loop(_work), media_type, f"{tab.lower()}_summary.{fmt}")
+
+async def report_xlsx(request: Request):
+    """GET /datasets/{id}/report.xlsx?where=… — workbook with KPIs and every tab."""
+    selection = _selection(request)
+
+    def _work():
+        ds, df = _ready(request, selection)
+        title = " › ".join(str(v) for _, v in selection)
+        return cached(ds, ("xlsx", selection), lambda: build_workbook(df, _rows(ds, df, selection), title))
+    return _download(await off_loop(_work), XLSX_MIME, "royalty_report.xlsx")
+
+async def rows_export(request: Request):
+    """GET /datasets/{id}/rows?format=parquet|arrow&where=… — row-level data with typed columns."""
+    selection = _selection(request)
+    fmt = request.query_params.get("format", "parquet").lower()
+    writers = {"parquet": (to_parquet, PARQUET_MIME), "arrow": (to_arrow_ipc, ARROW_MIME)}
+    if fmt not in writers:
+        raise ApiError(400, "format must be parquet or arrow")
+    write, media_type = writers[fmt]
+
+    def _work():
+        ds, df = _ready(request, selection)
+        return cached(ds, ("rows_" + fmt, selection), lambda: write(dataset_table(df, _rows(ds, df, selection))))
+    return _download(await off_loop(_work), media_type, f"royalty_rows.{fmt}")
+
+def _sketches(ds: Dataset, df: pd.DataFrame, selection: tuple):
+    """(catalog sketches, group) answering a drill path — the dashboard's cache entries."""
+    group = selection_group(selection)
+    if group is not None:
+        return cached(ds, ("sketches",), lambda: build_sketches(df)), group
+    return cached(ds, ("sketches", selection), lambda: build_sketches(df, _rows(ds, df, selection))), ALL
+
+def _catalog_json(sk, group, by: Optional[str], top: int) -> dict:
+    out = catalog_summary(sk, group, top)
+    if by:
+        counts = {name: sk.group_counts(by, name) for name in sk.distinct}
+        out["by_" + by] = [{by: value, **{name: round(float(c[value])) for name, c in counts.items()}}
+                           for value in next(iter(counts.values()), pd.Series(dtype="float64")).index]
+    return out
+
+def _by(request: Request) -> Optional[str]:
+    by = request.query_params.get("by")
+    if by is not None and by not in GROUP_DIMS:
+        raise ApiError(400, "by must be one of " + ", ".join(GROUP_DIMS))
+    return by
+
+async def catalog(request: Request):
+    """
+    GET /datasets/{id}/catalog?where=…&by=platform|country&top=10 — exact distinct tracks,
+    releases and earning ISRCs (error_95 = 0) and top earning tracks from the sketches.
+    """
+    selection, by = _selection(request), _by(request)
+    top = _int_param(request, "top", 10, 1, HEAVY_CANDIDATES)
+
+    def _work():
+        ds, df = _ready(request, selection)
+        sk, group = _sketches(ds, df, selection)
+        return _catalog_json(sk, group, by if group == ALL else None, top)
+    return JSONResponse(await off_loop(_work))
+
+async def merged_catalog(request: Request):
+    """
+    GET /catalog?ids=a&ids=b[&by=…] — catalog of several datasets together (e.g. monthly files),
+    estimated from the merged HyperLogLog / count-min sketches (±error_95, relative).
+    """
+    ids, by = request.query_params.getlist("ids"), _by(request)
+    top = _int_param(request, "top", 10, 1, HEAVY_CANDIDATES)
+    if not ids:
+        raise ApiError(400, "pass one or more ?ids= dataset ids")
+
+    def _work():
+        merged = None
+        for dataset_id in dict.fromkeys(ids):
+            ds, df = _ready_id(dataset_id)
+            sk = cached(ds, ("sketches",), lambda: build_sketches(df))
+            merged = sk if merged is None else merged.merge(sk)
+        out = _catalog_json(merged, ALL, by, top)
+        out["datasets"] = list(dict.fromkeys(ids))
+        return out
+    return JSONResponse(await off_loop(_work))
+
+async def api_error(request: Request, exc: ApiError):
+    return JSONResponse({"error": exc.message}, status_code=exc.status)
+
+# ── Application ──────────────────────────────────────────
+def create_app() -> Starlette:
+    routes = [
+        Route("/datasets", upload, methods=["POST"]),
+        Route("/datasets", list_datasets, methods=["GET"]),
+        Route("/datasets/{dataset_id}", dataset_status, methods=["GET"]),
+        Route("/datasets/{dataset_id}", delete_dataset, methods=["DELETE"]),
+        Route("/datasets/{dataset_id}/summary", summary, methods=["GET"]),
+        Route("/datasets/{dataset_id}/tabs/{tab}", tab_page, methods=["GET"]),
+        Route("/datasets/{dataset_id}/tabs/{tab}/export", tab_export, methods=["GET"]),
+        Route("/datasets/{dataset_id}/report.xlsx", report_xlsx, methods=["GET"]),
+        Route("/datasets/{dataset_id}/rows", rows_export, methods=["GET"]),
+        Route("/datasets/{dataset_id}/catalog", catalog, methods=["GET"]),
+        Route("/catalog", merged_catalog, methods=["GET"]),
+    ]
+    middleware = [Middleware(GZipMiddleware, minimum_size=GZIP_MIN_BYTES, compresslevel=GZIP_LEVEL,
+                             exclude_content_types=DEFAULT_EXCLUDED_CONTENT_TYPES + BINARY_TYPES)]
+    return Starlette(routes=routes, middleware=middleware, exception_handlers={ApiError: api_error})
+
+def main(argv: Optional[List[str]] = None) -> None:
+    import uvicorn
+    parser = argparse.ArgumentParser(description="Streaming royalty analyzer HTTP API")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    args = parser.parse_args(argv)
+    prewarm()
+    uvicorn.run(create_app(), host=args.host, port=args.port)
+
+if __name__ == "__main__":
+    main()
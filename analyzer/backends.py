@@ -0,0 +1,213 @@
+import importlib.util
+import os
+import threading
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from analyzer.aggregate import MISSING_LABEL, _is_code_key, aggregate_with_labels, apply_filters, top_k
+from analyzer.cache import FrameCache
+from analyzer.drill import column_codes, select_rows
+from analyzer.parallel import PARALLEL_MIN_ROWS
+
+# Optional columnar engines (the app works with pandas alone), imported when first selected
+pl = None
+duckdb = None
+
+def _import_engine(name: str) -> bool:
+    """Import an optional engine into this module on first use; False if it cannot be loaded."""
+    global pl, duckdb
+    try:
+        if name == "polars" and pl is None:
+            import polars as pl
+        elif name == "duckdb" and duckdb is None:
+            import duckdb
+    except Exception:
+        return False
+    return True
+
+# Engine for dashboard aggregations (override with ROYALTY_BACKEND=pandas|polars|duckdb)
+DEFAULT_BACKEND = "pandas"
+
+def _finish(out: pd.DataFrame, df: pd.DataFrame, key_col: str, label_col: str) -> pd.DataFrame:
+    """Bring an engine result to the aggregate_with_labels layout: key, quantity, revenue, label, rpm."""
+    out = out.reset_index(drop=True)
+    out[key_col] = out[key_col].astype("string" if _is_code_key(key_col) else df[key_col].dtype)
+    for col in ("quantity", "revenue"):
+        out[col] = out[col].fillna(0).astype(df[col].dtype)
+    key_str = out[key_col].astype("string")
+    if key_col == label_col or label_col not in df.columns:
+        out["label"] = key_str.fillna(MISSING_LABEL)
+    else:
+        label = out["label"].astype("string").mask(out[key_col].isna())
+        out["label"] = label.fillna(key_str).fillna(MISSING_LABEL)
+    q, r = out["quantity"].to_numpy("float64"), out["revenue"].to_numpy("float64")
+    out["rpm"] = np.divide(r * 1000, q, out=np.zeros_like(r), where=q > 0)
+    return out[[key_col, "quantity", "revenue", "label", "rpm"]]
+
+class Backend:
+    """
+    Aggregation engine behind the dashboard. aggregate() returns the same frame as
+    aggregate_with_labels(apply_filters(df, filters), key_col, label_col).
+    """
+    name = "base"
+
+    def aggregate(self, df: pd.DataFrame, key_col: str, label_col: str, filters: tuple = (),
+                  rows: Optional[np.ndarray] = None) -> pd.DataFrame:
+        """rows: positions of a drill-down selection (analyzer.drill); None = all rows."""
+        raise NotImplementedError
+
+    def top_n(self, df: pd.DataFrame, key_col: str, label_col: str, metric: str, n: int,
+              filters: tuple = (), min_quantity: float = 0, rows: Optional[np.ndarray] = None) -> pd.DataFrame:
+        """Filter + group + rank as one query: the n groups with the largest metric."""
+        agg = self.aggregate(df, key_col, label_col, filters, rows)
+        return top_k(agg, metric, n, min_quantity).reset_index(drop=True)
+
+    def any_notna(self, df: pd.DataFrame, col: str, filters: tuple = (), rows: Optional[np.ndarray] = None) -> bool:
+        if col not in df.columns:
+            return False
+        frame = select_rows(df, rows, [col] + [c for c, _ in filters])
+        return bool(apply_filters(frame, filters)[col].notna().any())
+
+class PandasBackend(Backend):
+    name = "pandas"
+
+    def aggregate(self, df, key_col, label_col, filters=(), rows=None):
+        frame = select_rows(df, rows, [key_col, label_col, "quantity", "revenue"] + [c for c, _ in filters])
+        coded = None
+        if not filters and key_col in df.columns and len(frame) >= PARALLEL_MIN_ROWS:
+            # large selections: the dataset's cached factorization instead of hashing the keys again
+            codes, uniques = column_codes(df, key_col)
+            coded = (codes if rows is None else codes[rows], uniques)
+        return aggregate_with_labels(apply_filters(frame, filters), key_col, label_col, coded)
+
+class PolarsBackend(Backend):
+    """Lazy, multi-threaded Polars query: filter → group → (top-n) in one plan."""
+    name = "polars"
+
+    def __init__(self):
+        self._frames = FrameCache(lambda df: pl.from_pandas(df).with_row_index("_row"))
+
+    def _lazy(self, df, filters, rows):
+        frame = self._frames.get(df)
+        lf = (frame if rows is None else frame[rows]).lazy()
+        for col, val in filters:
+            lf = lf.filter(pl.col(col) == val)
+        return lf
+
+    def _query(self, df, key_col, label_col, filters, rows):
+        lf = self._lazy(df, filters, rows)
+        key = pl.col(key_col)
+        if _is_code_key(key_col):
+            norm = key.cast(pl.String).str.strip_chars().str.to_uppercase().str.replace_all(r"[^A-Z0-9]", "")
+            key = pl.when(norm == "").then(None).otherwise(norm)
+        aggs = [pl.col("quantity").sum(), pl.col("revenue").sum()]
+        if key_col != label_col and label_col in df.columns:
+            lbl = pl.col(label_col).cast(pl.String)
+            aggs.append(lbl.drop_nulls().first().alias("label"))   # row order is kept within groups
+        q = pl.col("quantity").cast(pl.Float64)
+        return (
+            lf.with_columns(key.alias(key_col))
+            .group_by(key_col).agg(aggs)
+            .with_columns(rpm=pl.when(q > 0).then(pl.col("revenue") / q * 1000).otherwise(0.0))
+        )
+
+    def aggregate(self, df, key_col, label_col, filters=(), rows=None):
+        if key_col not in df.columns:
+            key_col = label_col
+        out = self._query(df, key_col, label_col, filters, rows).sort(key_col, nulls_last=True).collect().to_pandas()
+        return _finish(out, df, key_col, label_col)
+
+    def top_n(self, df, key_col, label_col, metric, n, filters=(), min_quantity=0, rows=None):
+        if key_col not in df.columns:
+            key_col = label_col
+        lf = self._query(df, key_col, label_col, filters, rows)
+        if min_quantity:
+            lf = lf.filter(pl.col("quantity") >= min_quantity)
+        out = lf.sort([metric, key_col], descending=[True, False], nulls_last=True).head(n).collect().to_pandas()
+        return _finish(out, df, key_col, label_col)
+
+    def any_notna(self, df, col, filters=(), rows=None):
+        if col not in df.columns:
+            return False
+        lf = self._lazy(df, filters, rows)
+        return bool(lf.select(pl.col(col).is_not_null().any()).collect().item())
+
+class DuckDBBackend(Backend):
+    """In-process DuckDB over an Arrow copy of the dataset: filter + group + top-n as one SQL query."""
+    name = "duckdb"
+
+    def __init__(self):
+        self._tables = FrameCache(self._to_arrow)
+        self._local = threading.local()
+
+    @staticmethod
+    def _to_arrow(df: pd.DataFrame):
+        import pyarrow as pa
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        return table.append_column("_row", pa.array(np.arange(len(df), dtype=np.int64)))
+
+    def _con(self):
+        con = getattr(self._local, "con", None)
+        if con is None:
+            con = self._local.con = duckdb.connect()
+        return con
+
+    @staticmethod
+    def _q(name: str) -> str:
+        return '"' + str(name).replace('"', '""') + '"'
+
+    def _sql(self, df, key_col, label_col, filters, tail=""):
+        key = self._q(key_col)
+        if _is_code_key(key_col):
+            key = f"NULLIF(regexp_replace(upper(trim(CAST({key} AS VARCHAR))), '[^A-Z0-9]', '', 'g'), '')"
+        label = ""
+        if key_col != label_col and label_col in df.columns:
+            label = f", arg_min(CAST({self._q(label_col)} AS VARCHAR), _row) FILTER (WHERE {self._q(label_col)} IS NOT NULL) AS label"
+        where = " AND ".join(f"{self._q(c)} = ?" for c, _ in filters) or "TRUE"
+        return (
+            f"SELECT {key} AS {self._q(key_col)}, sum(quantity) AS quantity, sum(revenue) AS revenue{label},"
+            f" CASE WHEN sum(quantity) > 0 THEN sum(revenue) / sum(quantity) * 1000 ELSE 0 END AS rpm"
+            f" FROM t WHERE {where} GROUP BY 1 {tail}"
+        )
+
+    def _run(self, df, sql, filters, rows) -> pd.DataFrame:
+        con = self._con()
+        table = self._tables.get(df)
+        con.register("t", table if rows is None else table.take(rows))
+        try:
+            return con.execute(sql, [v for _, v in filters]).df()
+        finally:
+            con.unregister("t")
+
+    def aggregate(self, df, key_col, label_col, filters=(), rows=None):
+        if key_col not in df.columns:
+            key_col = label_col
+        sql = self._sql(df, key_col, label_col, filters, "ORDER BY 1 NULLS LAST")
+        return _finish(self._run(df, sql, filters, rows), df, key_col, label_col)
+
+    def top_n(self, df, key_col, label_col, metric, n, filters=(), min_quantity=0, rows=None):
+        if key_col not in df.columns:
+            key_col = label_col
+        having = f"HAVING sum(quantity) >= {float(min_quantity)}" if min_quantity else ""
+        sql = self._sql(df, key_col, label_col, filters, f"{having} ORDER BY {metric} DESC, 1 NULLS LAST LIMIT {int(n)}")
+        return _finish(self._run(df, sql, filters, rows), df, key_col, label_col)
+
+BACKENDS = {"pandas": PandasBackend, "polars": PolarsBackend, "duckdb": DuckDBBackend}
+_AVAILABLE = {"pandas": True, **{name: importlib.util.find_spec(name) is not None for name in ("polars", "duckdb")}}
+_INSTANCES: Dict[str, Backend] = {}
+_LOCK = threading.Lock()
+
+def available_backends() -> list:
+    return [name for name, ok in _AVAILABLE.items() if ok]
+
+def get_backend(name: Optional[str] = None) -> Backend:
+    """Configured backend; falls back to pandas when the optional engine is not installed."""
+    name = (name or os.environ.get("ROYALTY_BACKEND") or DEFAULT_BACKEND).lower()
+    with _LOCK:
+        if not (_AVAILABLE.get(name) and _import_engine(name)):
+            name = "pandas"
+        if name not in _INSTANCES:
+            _INSTANCES[name] = BACKENDS[name]()
+        return _INSTANCES[name]
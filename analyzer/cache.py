@@ -0,0 +1,161 @@
+import os
+import sys
+import threading
+import weakref
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Optional
+
+import pandas as pd
+
+from analyzer.jobs import JobCancelled
+
+# Byte budget for the shared cache (override with ROYALTY_CACHE_MB)
+DEFAULT_CACHE_MB = 512
+_RETRY = object()       # handed to waiters when the computing job was cancelled
+
+def estimate_size(obj: Any) -> int:
+    """Approximate memory footprint of a cached value in bytes."""
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(index=True, deep=True).sum())
+    if isinstance(obj, pd.Series):
+        return int(obj.memory_usage(index=True, deep=True))
+    if isinstance(obj, (bytes, bytearray)):
+        return len(obj)
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(estimate_size(k) + estimate_size(v) for k, v in obj.items())
+    if isinstance(obj, (list, tuple, set)):
+        return sys.getsizeof(obj) + sum(estimate_size(v) for v in obj)
+    nbytes = getattr(obj, "nbytes", None)
+    if isinstance(nbytes, int):
+        return nbytes
+    return sys.getsizeof(obj)
+
+class ResultCache:
+    """
+    Process-wide LRU cache with a byte budget, shared by all Streamlit sessions.
+    Concurrent requests for the same key are de-duplicated (single-flight):
+    the first caller computes, the others wait for its result (if its job is
+    cancelled, one of the waiters computes instead; errors are shared).
+    Cached values are shared — callers must treat them as read-only.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = int(max_bytes)
+        self._items: "OrderedDict[Hashable, tuple[Any, int]]" = OrderedDict()
+        self._inflight: dict = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        while True:
+            with self._lock:
+                if key in self._items:
+                    self._items.move_to_end(key)
+                    self.hits += 1
+                    return self._items[key][0]
+                pending = self._inflight.get(key)
+                if pending is None:
+                    pending = Future()
+                    self._inflight[key] = pending
+                    owner = True
+                    self.misses += 1
+                else:
+                    owner = False
+
+            if not owner:
+                value = pending.result()
+                if value is _RETRY:
+                    continue    # the computing job was cancelled: the next waiter computes
+                return value
+
+            try:
+                value = compute()
+            except JobCancelled:
+                # cancellation belongs to the owner's job only, not to the other sessions waiting
+                with self._lock:
+                    self._inflight.pop(key, None)
+                pending.set_result(_RETRY)
+                raise
+            except BaseException as exc:
+                with self._lock:
+                    self._inflight.pop(key, None)
+                pending.set_exception(exc)
+                raise
+            self._store(key, value)
+            pending.set_result(value)
+            return value
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Cached value without computing it on a miss (the miss is not cached either)."""
+        with self._lock:
+            if key not in self._items:
+                return default
+            self._items.move_to_end(key)
+            self.hits += 1
+            return self._items[key][0]
+
+    def _store(self, key: Hashable, value: Any) -> None:
+        size = estimate_size(value)
+        with self._lock:
+            self._inflight.pop(key, None)
+            if size > self.max_bytes:
+                return   # larger than the whole budget: hand it out without caching
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._items[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._items:
+                _, (_, evicted) = self._items.popitem(last=False)
+                self._bytes -= evicted
+
+    def evict(self, match: Callable[[Hashable], bool]) -> int:
+        """Drop every cached entry whose key matches; returns how many were dropped."""
+        with self._lock:
+            keys = [k for k in self._items if match(k)]
+            for k in keys:
+                self._bytes -= self._items.pop(k)[1]
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._items), "bytes": self._bytes, "max_bytes": self.max_bytes,
+                    "hits": self.hits, "misses": self.misses}
+
+class FrameCache:
+    """One derived object per pandas frame, released when the frame is garbage-collected."""
+
+    def __init__(self, build: Callable[[pd.DataFrame], Any]):
+        self._build = build
+        self._items: Dict[int, tuple] = {}
+        self._lock = threading.Lock()
+
+    def get(self, df: pd.DataFrame) -> Any:
+        key = id(df)
+        with self._lock:
+            hit = self._items.get(key)
+            if hit is not None and hit[0]() is df:
+                return hit[1]
+        value = self._build(df)
+        with self._lock:
+            self._items[key] = (weakref.ref(df, lambda _, k=key: self._items.pop(k, None)), value)
+        return value
+
+_CACHE: Optional[ResultCache] = None
+_CACHE_LOCK = threading.Lock()
+
+def get_result_cache() -> ResultCache:
+    """The shared cache of this server process."""
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            mb = float(os.environ.get("ROYALTY_CACHE_MB") or DEFAULT_CACHE_MB)
+            _CACHE = ResultCache(int(mb * 1024 * 1024))
+        return _CACHE
@@ -0,0 +1,84 @@
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from analyzer.drill import column_codes
+
+# ── Period-over-period comparison ────────────────────────
+# A period is a set of reporting months, applied as one drill step, so each side of a
+# comparison is an ordinary cached tab view. The two aggregates are aligned on the
+# dataset's dictionary of key values (the factorized key column): every group gets an
+# integer slot and both sides are scattered into dense arrays — no join on strings.
+PERIOD_COL = "reporting_month"
+
+def month_order(df: pd.DataFrame) -> List[str]:
+    """Distinct reporting months, oldest first (values that are not dates go last)."""
+    if PERIOD_COL not in df.columns:
+        return []
+    _, uniques = column_codes(df, PERIOD_COL)
+    months = pd.Series(uniques.dropna().astype(str).unique())
+    dates = pd.to_datetime(months, errors="coerce")
+    return months.iloc[np.lexsort((months.to_numpy(), dates.to_numpy(), dates.isna().to_numpy()))].tolist()
+
+def default_periods(months: List[str]) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+    """(previous, current): the latest half of the months against the same number of months before it."""
+    n = max(len(months) // 2, 1)
+    return tuple(months[-2 * n:-n]), tuple(months[-n:])
+
+def period_step(months) -> tuple:
+    """Drill step selecting the rows of a set of months (see analyzer.drill)."""
+    return (PERIOD_COL, tuple(months))
+
+def _dictionary(df: pd.DataFrame, key_col: str, prev: pd.DataFrame, cur: pd.DataFrame) -> pd.Index:
+    """Shared key dictionary: the dataset's factorized key column, or the union of both sides."""
+    if key_col in df.columns:
+        uniques = column_codes(df, key_col)[1]
+        if not ((uniques.get_indexer(cur[key_col]) < 0) & cur[key_col].notna()).any() and \
+           not ((uniques.get_indexer(prev[key_col]) < 0) & prev[key_col].notna()).any():
+            return uniques
+    return pd.Index(pd.concat([prev[key_col], cur[key_col]], ignore_index=True).dropna().unique())
+
+def compare_views(df: pd.DataFrame, prev_view: dict, cur_view: dict) -> pd.DataFrame:
+    """
+    One row per entity of either period: label, quantity/revenue/rpm of both periods
+    (previous ones suffixed _prev) and status "new" / "lost" / "" (in both periods).
+    """
+    key_col = cur_view["key_col"] if cur_view["key_col"] == prev_view["key_col"] else "label"
+    prev, cur = prev_view["agg"], cur_view["agg"]
+    uniques = _dictionary(df, key_col, prev, cur)
+    n = len(uniques) + 1                        # last slot: missing key
+
+    def _scatter(agg: pd.DataFrame):
+        pos = uniques.get_indexer(agg[key_col])
+        pos[pos < 0] = n - 1
+        present = np.zeros(n, dtype=bool)
+        present[pos] = True
+        sums = {col: np.zeros(n, dtype="float64") for col in ("quantity", "revenue")}
+        for col, out in sums.items():
+            np.add.at(out, pos, agg[col].to_numpy("float64"))
+        label = np.full(n, None, dtype=object)
+        label[pos] = agg["label"].astype(str).to_numpy()
+        return present, sums, label
+
+    p_present, p_sums, p_label = _scatter(prev)
+    c_present, c_sums, c_label = _scatter(cur)
+    slots = np.flatnonzero(p_present | c_present)
+    keys = np.append(np.asarray(uniques, dtype=object), None)[slots]
+    out = pd.DataFrame({
+        key_col: keys,
+        "label": np.where(c_present[slots], c_label[slots], p_label[slots]),
+        "quantity_prev": p_sums["quantity"][slots], "revenue_prev": p_sums["revenue"][slots],
+        "quantity": c_sums["quantity"][slots], "revenue": c_sums["revenue"][slots],
+        "status": np.select([~p_present[slots], ~c_present[slots]], ["new", "lost"], ""),
+    })
+    for suffix in ("_prev", ""):
+        q, r = out["quantity" + suffix].to_numpy(), out["revenue" + suffix].to_numpy()
+        out["rpm" + suffix] = np.divide(r * 1000, q, out=np.zeros_like(r), where=q > 0)
+    return out
+
+def metric_deltas(cmp: pd.DataFrame, metric_col: str) -> pd.DataFrame:
+    """cmp with prev / current / delta / growth (fraction, NaN without a previous value) of one metric."""
+    prev, cur = cmp[metric_col + "_prev"].to_numpy(), cmp[metric_col].to_numpy()
+    growth = np.divide(cur - prev, np.abs(prev), out=np.full(len(cmp), np.nan), where=prev != 0)
+    return cmp.assign(prev=prev, current=cur, delta=cur - prev, growth=growth)
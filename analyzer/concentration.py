@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+
+# ── Revenue concentration (Pareto / Gini) ────────────────
+# Computed from a tab's cached aggregate: one sort of its metric column, then cumulative
+# sums. Negative totals (refund-only entries) count as zero.
+TOP_SHARES = (0.01, 0.05, 0.10, 0.20, 0.50)     # "top X% of entries produce Y%"
+TARGET_SHARE = 0.80                             # "N entries produce 80%"
+CURVE_POINTS = 200                              # Pareto curve is downsampled for the chart
+
+def concentration(agg: pd.DataFrame, metric_col: str) -> dict | None:
+    """
+    Concentration of metric_col over the rows of an aggregate: Gini coefficient, share of
+    the top X% of entries, entries needed for TARGET_SHARE, and the Pareto curve as
+    (share of entries, cumulative share) points. None when the total is zero.
+    """
+    values = np.maximum(agg[metric_col].to_numpy(dtype=np.float64, na_value=0.0), 0.0)
+    n = len(values)
+    total = values.sum()
+    if n == 0 or total <= 0:
+        return None
+    desc = np.sort(values)[::-1]
+    cum = np.cumsum(desc) / total
+
+    # Gini from the same sort: ascending ranks 1..n of the values
+    ranks = np.arange(n, 0, -1, dtype=np.float64)
+    gini = float(2 * (ranks * desc).sum() / (n * total) - (n + 1) / n) if n > 1 else 0.0
+
+    top = {}
+    for x in TOP_SHARES:
+        k = max(1, int(np.ceil(x * n)))
+        top[x] = (k, float(cum[k - 1]))
+    needed = int(np.searchsorted(cum, TARGET_SHARE - 1e-12) + 1)
+
+    pos = np.unique(np.linspace(0, n - 1, min(n, CURVE_POINTS)).round().astype(np.int64))
+    curve = pd.DataFrame({"entries": np.r_[0.0, (pos + 1) / n], "share": np.r_[0.0, cum[pos]]})
+    return {
+        "entries": n, "earning": int((values > 0).sum()), "gini": gini, "top": top,
+        "needed": needed, "needed_share": needed / n, "curve": curve,
+    }
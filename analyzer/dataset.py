@@ -0,0 +1,191 @@
+import functools
+import hashlib
+from typing import Dict
+
+import pandas as pd
+
+from analyzer.cache import get_result_cache
+from analyzer.drill import drill_rows
+from analyzer.entities import resolve_entities
+from analyzer.jobs import Job, get_job_manager
+from analyzer.sketches import build_sketches
+from analyzer.storage import PREVIEW_ROWS, CompressedFrame, IdleRef
+from analyzer.streaming import StreamSource
+from analyzer.validation import validate_dataset
+from analyzer.views import SEGMENT_SLICE_MAX, TABS, kpi_summary, segment_columns, segment_summary, tab_view
+
+NUMERIC_FIELDS = ("revenue", "quantity")
+
+def content_digest(data: bytes) -> str:
+    """Hash of the uploaded file bytes — identical statements share cached results."""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+def frame_digest(frame: pd.DataFrame | CompressedFrame) -> str:
+    """Content hash of an already parsed frame (used when the file bytes are not available)."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update("\x1f".join(map(str, frame.columns)).encode("utf-8"))
+    if isinstance(frame, CompressedFrame):
+        for buf in frame.buffers():
+            h.update(buf)
+    else:
+        h.update(pd.util.hash_pandas_object(frame, index=False).values.tobytes())
+    return h.hexdigest()
+
+def mapping_key(mapping: Dict[str, str]) -> tuple:
+    return tuple(sorted((str(k), str(v)) for k, v in mapping.items()))
+
+def normalize_dataset(raw_df: pd.DataFrame | CompressedFrame, mapping: Dict[str, str]) -> pd.DataFrame:
+    """
+    Keep the mapped columns (plus currency) under their canonical names, coerce
+    revenue/quantity to numbers and resolve track/release entities (see analyzer.entities).
+    Only those columns are decompressed from a CompressedFrame.
+    """
+    wanted = {str(orig).strip() for orig in mapping.values()} | {"currency"}
+    df = raw_df[[c for c in raw_df.columns if str(c).strip() in wanted]]
+    df.columns = df.columns.map(lambda c: str(c).strip())
+    rename_map = {str(orig).strip(): canon for canon, orig in mapping.items() if str(orig).strip() in df.columns}
+    df = df.rename(columns=rename_map)
+
+    for col in NUMERIC_FIELDS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0)
+    return resolve_entities(df)
+
+def normalize_shared(raw_df: pd.DataFrame, mapping: Dict[str, str], digest: str,
+                     stream_source=None, job=None) -> pd.DataFrame:
+    """
+    Normalized dataset from the cross-session cache (computed once per file + mapping).
+    In streaming mode (large CSV) it is the aggregated cube read chunk by chunk from
+    stream_source (a StreamSource: the upload spooled to a temporary file).
+    """
+    key = ("normalized", digest, mapping_key(mapping))
+    if stream_source is not None:
+        return get_result_cache().get_or_compute(key, lambda: _stream_normalized(stream_source, mapping, digest, job))
+    # in a worker process: only the compressed upload goes there and the normalized frame comes back
+    return get_result_cache().get_or_compute(
+        key, lambda: get_job_manager().run_in_process(job, normalize_dataset, raw_df, dict(mapping)))
+
+def _stream_normalized(stream_source: StreamSource, mapping: Dict[str, str], digest: str, job=None) -> pd.DataFrame:
+    """Cube of a streamed file; its quality report is counted in the same pass and cached next to it."""
+    cube = stream_source.cube(mapping, job)
+    get_result_cache().get_or_compute((dataset_key(digest, mapping), "quality"), lambda: stream_source.report)
+    return cube
+
+def dataset_key(digest: str, mapping: Dict[str, str]) -> tuple:
+    """Cache key prefix of everything derived from one normalized dataset."""
+    return (digest, mapping_key(mapping))
+
+def quality_report(raw_df: pd.DataFrame, norm: pd.DataFrame, mapping: Dict[str, str], digest: str,
+                   stream_source=None) -> dict | None:
+    """
+    Data quality report of the dataset (see analyzer.validation), cached next to its views.
+    Streamed files are checked while they are read: the report stays with the session's
+    StreamSource; a file read by another session has it in the cache only (None once evicted).
+    """
+    key = (dataset_key(digest, mapping), "quality")
+    if stream_source is not None:
+        if stream_source.report is None:
+            return get_result_cache().get(key)
+        return get_result_cache().get_or_compute(key, lambda: stream_source.report)
+    return get_result_cache().get_or_compute(key, lambda: validate_dataset(raw_df, norm, mapping))
+
+def preview_quality(raw_df: pd.DataFrame | CompressedFrame, mapping: Dict[str, str]) -> dict:
+    """
+    Data check of the first PREVIEW_ROWS rows with a mapping, shown while the columns are
+    mapped (a wrong column shows up as non-numeric values or invalid codes); skipped lines
+    are those of the whole file.
+    """
+    sample = raw_df.head(PREVIEW_ROWS)
+    report = validate_dataset(sample, normalize_dataset(sample, mapping), mapping)
+    report["skipped_lines"] = raw_df.attrs.get("skipped_lines", 0)
+    return report
+
+def prepare_dataset(job: Job, raw_df: pd.DataFrame, mapping: Dict[str, str], digest: str,
+                    stream_source=None) -> pd.DataFrame:
+    """
+    Job: normalize and check the data, then pre-compute the catalog sketches, the KPI
+    header, every unfiltered tab and the segment indexes into the shared cache.
+    """
+    job.update(0.05, "Normalizing columns…")
+    norm = normalize_shared(raw_df, mapping, digest, stream_source, job)
+    key = dataset_key(digest, mapping)
+    cache = get_result_cache()
+
+    if stream_source is None:
+        job.update(0.2, "Checking data quality…")
+    quality_report(raw_df, norm, mapping, digest, stream_source)
+    job.update(0.88 if stream_source is not None else 0.25, "Building catalog sketches…")
+    cache.get_or_compute((key, "sketches"), lambda: build_sketches(norm))
+    job.update(0.9 if stream_source is not None else 0.3, "Computing totals…")
+    cache.get_or_compute((key, "summary"), lambda: kpi_summary(norm))
+    for i, tab in enumerate(TABS):
+        start = 0.92 if stream_source is not None else 0.4
+        job.update(start + (1 - start) * i / len(TABS), f"Building {tab.lower()}…")
+        cache.get_or_compute((key, "tab", tab, ()), lambda: tab_view(norm, tab, ()))
+    job.update(0.98, "Indexing segments…")
+    prepare_segments(norm, key)
+    return norm
+
+def prepare_segments(norm: pd.DataFrame, key: tuple) -> None:
+    """
+    Per-segment totals and, for segments with few values (sales / content type), the row
+    selection and every tab for each value — the entries the dashboard's segment filter reads.
+    """
+    cache = get_result_cache()
+    for col in segment_columns(norm):
+        summary = cache.get_or_compute((key, "segments", col), lambda: segment_summary(norm, col))
+        if len(summary) > SEGMENT_SLICE_MAX:
+            continue
+        for value in summary[col].tolist():
+            selection = ((col, value),)
+            rows = drill_rows(norm, selection, cache, (key,))
+            for tab in TABS:
+                cache.get_or_compute((key, "tab", tab, selection), lambda: tab_view(norm, tab, (), rows))
+
+def prepare_in_background(raw_df: pd.DataFrame, mapping: Dict[str, str], digest: str,
+                          stream_source=None) -> Job:
+    """Start normalization right after upload/confirm, while the user is still on that page."""
+    return get_job_manager().submit("prepare", prepare_dataset, raw_df, dict(mapping), digest, stream_source)
+
+def get_normalized(state, raw_df: pd.DataFrame | CompressedFrame, mapping: Dict[str, str]) -> pd.DataFrame:
+    """
+    Normalized dataset for the session: reuse the finished (or still running)
+    background job when it was built with the same mapping, else build it now.
+    The session holds it through an IdleRef: an idle session lets it go (see
+    release_dataset), and it is rebuilt from the compressed upload on return.
+    Also sets state['dataset_key'], the cache key prefix for derived results.
+    """
+    digest = state.get("dataset_digest")
+    if not digest:
+        digest = frame_digest(raw_df)
+        state["dataset_digest"] = digest
+
+    handle = state.get("df_norm")
+    norm = handle.get() if isinstance(handle, IdleRef) else handle
+    if isinstance(norm, Job):
+        try:
+            norm = norm.wait()
+        except Exception:
+            norm = None
+    if not isinstance(norm, pd.DataFrame) or state.get("df_norm_mapping") != dict(mapping):
+        norm = normalize_shared(raw_df, mapping, digest, state.get("stream_source"))
+    if not (isinstance(handle, IdleRef) and handle.get() is norm):
+        release = functools.partial(release_dataset, digest, dict(mapping), raw_df, state.get("stream_source"))
+        state["df_norm"] = IdleRef(norm, dataset_key(digest, mapping), release)
+    state["df_norm_mapping"] = dict(mapping)
+    state["dataset_key"] = dataset_key(digest, mapping)
+    return norm
+
+def release_dataset(digest: str, mapping: Dict[str, str], raw_df=None, stream_source=None) -> None:
+    """
+    Idle release of a dataset no session is using: evict its shared cache entries (normalized
+    frame, views, rows, sketches, parsed upload) and move the compressed upload and the
+    streamed cube to temporary files. Everything is rebuilt from those when a session returns.
+    """
+    key = dataset_key(digest, mapping)
+    get_result_cache().evict(lambda k: isinstance(k, tuple) and (
+        k[:1] == (key,) or k == ("normalized",) + key or k[:2] == ("parsed", digest)))
+    if isinstance(raw_df, CompressedFrame):
+        raw_df.spill()
+    if isinstance(stream_source, StreamSource):
+        stream_source.spill()
@@ -0,0 +1,62 @@
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from analyzer.cache import FrameCache, ResultCache
+
+# ── Drill-down (row selections shared by all tabs) ───────
+# A drill path is a tuple of (column, value) steps, e.g. (("platform", "Spotify"), ("country", "US")).
+# A tuple value selects any of several values, e.g. ("reporting_month", ("2025-01", "2025-02")).
+# Each prefix of the path is a sorted array of row positions; a deeper step only scans
+# its parent's rows, comparing small integer codes instead of strings.
+
+_CODES = FrameCache(lambda df: {})
+
+def column_codes(df: pd.DataFrame, col: str) -> Tuple[np.ndarray, pd.Index]:
+    """Factorized column (codes, uniques), built once per dataset and column."""
+    per_frame = _CODES.get(df)
+    if col not in per_frame:
+        codes, uniques = pd.factorize(df[col])
+        per_frame[col] = (codes.astype(np.int16 if len(uniques) < 2**15 else np.int32), pd.Index(uniques))
+    return per_frame[col]
+
+def step_rows(df: pd.DataFrame, parent: Optional[np.ndarray], col: str, value) -> np.ndarray:
+    """Rows of parent (all rows when None) where col == value (or col in value, for a tuple)."""
+    codes, uniques = column_codes(df, col)
+    dtype = np.int32 if len(df) < 2**31 else np.int64
+    if isinstance(value, tuple):
+        hit = np.zeros(len(uniques) + 1, dtype=bool)        # last slot: code -1 (missing)
+        pos = uniques.get_indexer(list(value))
+        hit[pos[pos >= 0]] = True
+        if parent is None:
+            return np.flatnonzero(hit[codes]).astype(dtype)
+        return parent[hit[codes[parent]]]
+    pos = uniques.get_indexer([value])[0]
+    if pos < 0:
+        return np.empty(0, dtype=dtype)
+    if parent is None:
+        return np.flatnonzero(codes == pos).astype(dtype)
+    return parent[codes[parent] == pos]
+
+def drill_rows(df: pd.DataFrame, path: tuple, cache: Optional[ResultCache] = None,
+               prefix: tuple = ()) -> Optional[np.ndarray]:
+    """
+    Row positions selected by a drill path (None = whole dataset). With a cache, every
+    prefix of the path is stored under prefix + ("rows", path[:i]) and reused by deeper steps.
+    """
+    rows = None
+    for i, (col, value) in enumerate(path):
+        if col not in df.columns:
+            continue
+        if cache is None:
+            rows = step_rows(df, rows, col, value)
+        else:
+            rows = cache.get_or_compute(prefix + ("rows", tuple(path[:i + 1])),
+                                        lambda parent=rows, c=col, v=value: step_rows(df, parent, c, v))
+    return rows
+
+def select_rows(df: pd.DataFrame, rows: Optional[np.ndarray], cols=None) -> pd.DataFrame:
+    """The selected rows (optionally only some columns) as a frame."""
+    frame = df if cols is None else df[[c for c in dict.fromkeys(cols) if c in df.columns]]
+    return frame if rows is None else frame.take(rows)
@@ -0,0 +1,101 @@
+from typing import Callable, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from analyzer.aggregate import MISSING_LABEL, _disambiguate_labels, _normalize_code_series
+from analyzer.cache import FrameCache
+
+# ── Entity resolution (ISRC → track, UPC → release) ──────
+ISRC_PATTERN = r"[A-Z]{2}[A-Z0-9]{3}[0-9]{7}"
+UPC_PATTERN = r"[0-9]{12,14}"
+
+# code column → (resolved key column, title column, valid code pattern)
+ENTITIES = {
+    "isrc": ("track_key", "track_title", ISRC_PATTERN),
+    "upc": ("release_key", "release_title", UPC_PATTERN),
+}
+FALLBACK_PREFIX = "~"   # keys of rows without a valid code: "~" + normalized title
+
+def _on_uniques(s: pd.Series, fn: Callable[[pd.Series], pd.Series]) -> pd.Series:
+    """Apply a string transform once per distinct value instead of once per row."""
+    codes, uniques = pd.factorize(s)
+    out = fn(pd.Series(uniques, dtype="string")).array
+    return pd.Series(out.take(codes, allow_fill=True), index=s.index)
+
+def _clean_codes(s: pd.Series, code_col: str) -> pd.Series:
+    s = _normalize_code_series(s.str.replace(r"\.0+$", "", regex=True))   # codes read as numbers: 1234.0
+    if code_col == "upc":
+        # UPC-A / EAN-13 / GTIN-14 of one product differ only in leading zeros
+        s = s.where(~s.str.len().between(11, 14).fillna(False), s.str.lstrip("0").str.zfill(12))
+    return s
+
+def _valid_codes(cleaned: pd.Series, code_col: str) -> pd.Series:
+    """Cleaned codes that match the format and are not all zeros."""
+    pattern = ENTITIES[code_col][2]
+    return cleaned.str.fullmatch(pattern).fillna(False) & cleaned.str.strip("0").ne("").fillna(False)
+
+def _title_keys(s: pd.Series) -> pd.Series:
+    s = s.str.strip().str.casefold().str.replace(r"\s+", " ", regex=True).replace("", pd.NA)
+    return FALLBACK_PREFIX + s
+
+def resolve_keys(frame: pd.DataFrame, code_col: str) -> pd.Series:
+    """
+    One entity key per row: the validated, canonical code; rows with a missing or
+    malformed code fall back to their normalized title (or keep the malformed code).
+    """
+    title_col = ENTITIES[code_col][1]
+    cleaned = _on_uniques(frame[code_col], lambda s: _clean_codes(s, code_col))
+    keys = cleaned.where(_valid_codes(cleaned, code_col))
+    if title_col in frame.columns:
+        keys = keys.fillna(_on_uniques(frame[title_col], _title_keys))
+    return keys.fillna(cleaned)
+
+def resolve_entities(df: pd.DataFrame) -> pd.DataFrame:
+    """Add the resolved key columns (track_key, release_key) to a normalized dataset, in place."""
+    for code_col, (key_col, _, _) in ENTITIES.items():
+        if code_col in df.columns:
+            df[key_col] = resolve_keys(df, code_col)
+    return df
+
+def _build_labels(df: pd.DataFrame) -> Dict[str, pd.Series]:
+    """Canonical label per entity key: the most frequent title spelling (ties → first seen)."""
+    out = {}
+    for code_col, (key_col, title_col, _) in ENTITIES.items():
+        if key_col not in df.columns:
+            continue
+        if title_col not in df.columns:
+            out[code_col] = pd.Series(dtype="string")
+            continue
+        key_codes, keys = pd.factorize(df[key_col])
+        raw_codes, raw_titles = pd.factorize(df[title_col])
+        strip_codes, titles = pd.factorize(pd.Series(raw_titles, dtype="string").str.strip())
+        title_codes = np.where(raw_codes >= 0, strip_codes[np.maximum(raw_codes, 0)], -1) if len(raw_titles) else raw_codes
+        ok = (key_codes >= 0) & (title_codes >= 0)
+        pair = key_codes[ok].astype(np.int64) * max(len(titles), 1) + title_codes[ok]
+        pairs, first, counts = np.unique(pair, return_index=True, return_counts=True)
+        pair_key, pair_title = pairs // max(len(titles), 1), pairs % max(len(titles), 1)
+        order = np.lexsort((first, -counts, pair_key))          # per key: most rows, then first seen
+        best = order[np.r_[True, pair_key[order][1:] != pair_key[order][:-1]]] if len(order) else order
+        out[code_col] = pd.Series(np.asarray(titles, dtype=object)[pair_title[best]],
+                                  index=np.asarray(keys, dtype=object)[pair_key[best]], dtype="string")
+    return out
+
+_LABELS = FrameCache(_build_labels)
+
+def entity_labels(df: pd.DataFrame, code_col: str) -> Optional[pd.Series]:
+    """Lookup table entity key → label, built once per dataset; None when the dataset has no resolved keys."""
+    spec = ENTITIES.get(code_col)
+    if spec is None or spec[0] not in df.columns:
+        return None
+    return _LABELS.get(df).get(code_col)
+
+def label_entities(agg: pd.DataFrame, key_col: str, labels: pd.Series) -> pd.DataFrame:
+    """Attach canonical labels to an aggregate grouped by a resolved key column."""
+    keys = agg[key_col].astype("string")
+    label = keys.map(labels).astype("string")
+    fallback = keys.str.startswith(FALLBACK_PREFIX).fillna(False)
+    label = label.fillna(keys.where(~fallback, keys.str[len(FALLBACK_PREFIX):])).fillna(MISSING_LABEL)
+    # only real codes are appended when two entities share a title
+    agg = agg.assign(label=label, _code=keys.where(~fallback))
+    return _disambiguate_labels(agg, "_code", "label").drop(columns="_code")
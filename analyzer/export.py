@@ -0,0 +1,257 @@
+import io
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from analyzer.aggregate import (
+    MISSING_LABEL, RPM_MIN_STREAMS, _disambiguate_labels, _is_code_key, detect_currency_hint,
+    period_label_from_reporting_month, resolve_dim_keys,
+)
+from analyzer.drill import column_codes
+from analyzer.entities import ENTITIES, FALLBACK_PREFIX, entity_labels, label_entities
+from analyzer.views import TABS
+
+# ── Full-report workbook (KPIs + one sheet per dimension) ─
+SHEET_HEADERS = {"Platforms": "Platform", "Countries": "Country", "Artists": "Artist",
+                 "Releases": "Release", "Tracks": "Track"}
+CODE_HEADERS = {"isrc": "ISRC", "upc": "UPC"}
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+PARQUET_MIME = "application/vnd.apache.parquet"
+ARROW_MIME = "application/vnd.apache.arrow.file"
+METRIC_COLUMNS = {"Earnings": "revenue", "Streams": "quantity", "Value per 1K Streams": "rpm"}
+
+def _sheet_dims(df: pd.DataFrame) -> Dict[str, tuple]:
+    """tab → (group column, entity labels or None, code column or None), as in views.tab_view."""
+    dims = {}
+    for tab in TABS:
+        key_col, label_col, _ = resolve_dim_keys(tab, df)
+        labels = entity_labels(df, key_col)
+        if labels is not None:
+            dims[tab] = (ENTITIES[key_col][0], labels, key_col)
+        else:
+            dims[tab] = (label_col if _is_code_key(key_col) else key_col, None, None)
+    return dims
+
+def _present(df: pd.DataFrame, col: str, rows: Optional[np.ndarray]) -> pd.DataFrame:
+    """Distinct values of col among the selected rows, as a one-column frame."""
+    if col not in df.columns:
+        return pd.DataFrame()
+    codes, uniques = column_codes(df, col)
+    found = np.unique(codes if rows is None else codes[rows])
+    return pd.DataFrame({col: uniques[found[found >= 0]]})
+
+def dimension_sums(df: pd.DataFrame, rows: Optional[np.ndarray] = None) -> Dict[str, pd.DataFrame]:
+    """
+    Per-tab aggregates (key, quantity, revenue, label, rpm) from one pass over the rows:
+    the rows are grouped once by all dimension codes together, and every tab is then
+    summed from that (much smaller) combination table.
+    """
+    dims = _sheet_dims(df)
+    group_cols = list(dict.fromkeys(col for col, _, _ in dims.values() if col in df.columns))
+    coded = {col: column_codes(df, col) for col in group_cols}
+    measures = {m: df[m].to_numpy(dtype=np.float64) if rows is None else df[m].to_numpy(dtype=np.float64)[rows]
+                for m in ("quantity", "revenue")}
+
+    # one combined integer key per row (mixed radix over the dimension codes, 0 = missing)
+    bases = [len(uniques) + 1 for _, uniques in coded.values()]
+    if np.prod(np.array(bases, dtype=np.float64)) < 2**62:
+        key = np.zeros(len(df) if rows is None else len(rows), dtype=np.int64)
+        for (codes, _), base in zip(coded.values(), bases):
+            key = key * base + ((codes if rows is None else codes[rows]).astype(np.int64) + 1)
+        group, combos = pd.factorize(key)
+        cube = {m: np.bincount(group, weights=values, minlength=len(combos)) for m, values in measures.items()}
+        for (col, _), base in zip(reversed(list(coded.items())), reversed(bases)):
+            combos, cube[col] = np.divmod(combos, base)
+    else:   # too many distinct combinations for one int64 key
+        combo = pd.DataFrame({col: (codes if rows is None else codes[rows]).astype(np.int64) + 1
+                              for col, (codes, _) in coded.items()} | measures)
+        cube = combo.groupby(group_cols, sort=False, as_index=False).sum()
+
+    out = {}
+    for tab, (col, labels, _) in dims.items():
+        if col not in coded:
+            continue
+        codes, uniques = coded[col]
+        slot = np.asarray(cube[col], dtype=np.int64)                      # 0 = missing value
+        n = len(uniques) + 1
+        present = np.bincount(slot, minlength=n) > 0
+        agg = pd.DataFrame({col: np.concatenate([[None], np.asarray(uniques, dtype=object)])})
+        for m in ("quantity", "revenue"):
+            sums = np.bincount(slot, weights=np.asarray(cube[m], dtype=np.float64), minlength=n)
+            agg[m] = sums.round().astype(df[m].dtype) if pd.api.types.is_integer_dtype(df[m].dtype) else sums
+        agg = agg[present].reset_index(drop=True)
+        if labels is not None:
+            agg = label_entities(agg, col, labels)
+        else:
+            agg["label"] = agg[col].astype("string").fillna(MISSING_LABEL)
+            agg = _disambiguate_labels(agg, col, "label")
+        q, r = agg["quantity"].to_numpy(np.float64), agg["revenue"].to_numpy(np.float64)
+        agg["rpm"] = np.divide(r * 1000, q, out=np.zeros_like(r), where=q > 0)
+        out[tab] = agg
+    return out
+
+def _text(ws, value):
+    """Text cell that is never read as a formula (labels come from the uploaded file)."""
+    if isinstance(value, str) and value.startswith("="):
+        from openpyxl.cell import WriteOnlyCell
+        cell = WriteOnlyCell(ws, value)
+        cell.data_type = "s"
+        return cell
+    return value
+
+def _header(ws, names: List[str]) -> list:
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+    cells = []
+    for name in names:
+        cell = WriteOnlyCell(ws, name)
+        cell.font = Font(bold=True)
+        cells.append(cell)
+    return cells
+
+def build_workbook(df: pd.DataFrame, rows: Optional[np.ndarray] = None, selection: str = "") -> bytes:
+    """
+    Summary + Platforms/Countries/Artists/Releases/Tracks sheets as one XLSX file,
+    written in openpyxl's write-only (streaming) mode.
+    """
+    sheets = dimension_sums(df, rows)
+    streams = float(df["quantity"].to_numpy()[rows].sum() if rows is not None else df["quantity"].sum())
+    revenue = float(df["revenue"].to_numpy()[rows].sum() if rows is not None else df["revenue"].sum())
+
+    from openpyxl import Workbook   # imported on the first export, not at app start
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Summary")
+    ws.column_dimensions["A"].width = 26
+    ws.column_dimensions["B"].width = 40
+    ws.append(_header(ws, ["Metric", "Value"]))
+    for name, value in [
+        ("Report period", period_label_from_reporting_month(_present(df, "reporting_month", rows))),
+        ("Selection", selection or "Whole report"),
+        ("Total Earnings", round(revenue, 2)),
+        ("Total Streams", streams),
+        ("Value per 1K Streams", round(revenue / streams * 1000, 4) if streams > 0 else 0.0),
+        ("Currency", detect_currency_hint(_present(df, "currency", rows))),
+        ("Rows", int(len(df) if rows is None else len(rows))),
+        ("Generated", datetime.now().strftime("%Y-%m-%d %H:%M")),
+    ]:
+        ws.append([name, _text(ws, value)])
+
+    dims = _sheet_dims(df)
+    for tab, agg in sheets.items():
+        code_col = dims[tab][2]
+        ws = wb.create_sheet(tab)
+        names = [SHEET_HEADERS[tab]] + ([CODE_HEADERS[code_col]] if code_col else []) + [
+            "Streams", "Earnings", "Value per 1K Streams", "Share of Earnings"]
+        for letter, width in zip("ABCDEF", [40] + [16] * 5):
+            ws.column_dimensions[letter].width = width
+        ws.append(_header(ws, names))
+        agg = agg.sort_values("revenue", ascending=False, kind="stable")
+        codes = [None] * len(agg)
+        if code_col:
+            keys = agg[dims[tab][0]].astype("string")
+            codes = keys.where(~keys.str.startswith(FALLBACK_PREFIX).fillna(False)).fillna("").tolist()
+        share = agg["revenue"].to_numpy(np.float64) / revenue if revenue else np.zeros(len(agg))
+        for label, code, q, r, rpm, s in zip(agg["label"].tolist(), codes, agg["quantity"].tolist(),
+                                             agg["revenue"].tolist(), agg["rpm"].tolist(), share.tolist()):
+            row = [_text(ws, label)] + ([code] if code_col else []) + [q, round(r, 2), round(rpm, 4), round(s, 6)]
+            ws.append(row)
+
+    buf = io.BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+# ── Typed exports (Parquet / Arrow IPC) ──────────────────
+def _dictionary(codes: np.ndarray, uniques: pd.Index) -> pa.DictionaryArray:
+    """Categorical column straight from factorized codes (-1 = missing)."""
+    return pa.DictionaryArray.from_arrays(pa.array(codes, mask=codes < 0), pa.array(np.asarray(uniques, dtype=object)))
+
+def _month_column(codes: np.ndarray, uniques: pd.Index) -> pa.Array:
+    """reporting_month as date32 (first day of the month); unparsable values become null."""
+    months = pd.to_datetime(pd.Series(uniques), errors="coerce").dt.to_period("M").dt.start_time
+    days = months.to_numpy("datetime64[D]")
+    values = np.where(codes >= 0, days[np.maximum(codes, 0)] if len(days) else np.datetime64("NaT"), np.datetime64("NaT"))
+    return pa.array(values.astype("datetime64[D]"), type=pa.date32(), from_pandas=True)
+
+def dataset_table(df: pd.DataFrame, rows: Optional[np.ndarray] = None) -> pa.Table:
+    """
+    Normalized row-level dataset as an Arrow table: text columns dictionary-encoded from the
+    cached factorized codes, quantity int64, revenue float64, reporting_month as a monthly date.
+    Unselected numeric columns are handed to Arrow without copying. The resolved entity keys
+    (track_key, release_key) are internal and left out; the report's own codes are kept.
+    """
+    internal = {key_col for key_col, _, _ in ENTITIES.values()}
+    arrays, names = [], []
+    for col in (c for c in df.columns if c not in internal):
+        series = df[col]
+        if col == "quantity":
+            values = series.to_numpy()
+            values = values if values.dtype == np.int64 else np.round(values.astype(np.float64)).astype(np.int64)
+            arr = pa.array(values if rows is None else values[rows])
+        elif col == "revenue" or pd.api.types.is_numeric_dtype(series.dtype):
+            values = series.to_numpy(dtype=np.float64 if col == "revenue" else None)
+            arr = pa.array(values if rows is None else values[rows], from_pandas=True)
+        else:
+            codes, uniques = column_codes(df, col)
+            codes = codes if rows is None else codes[rows]
+            arr = _month_column(codes, uniques) if col == "reporting_month" else _dictionary(codes, uniques.astype(str))
+        arrays.append(arr)
+        names.append(str(col))
+    return pa.Table.from_arrays(arrays, names=names)
+
+# ── Tab tables (CSV / Parquet / Arrow) ───────────────────
+CSV_DIM_NAMES = {"platform": "Platform", "country": "Country", "artist_name": "Artist",
+                 "release_title": "Release", "track_title": "Track", "isrc": "Track", "upc": "Release"}
+
+def summary_csv(view: dict, metric: str) -> bytes:
+    """A tab's rows as the dashboard's CSV download: label, streams, earnings, value per 1K, sorted by metric."""
+    label_col = view["label_col"]
+    agg = view["agg"].copy()
+    agg["Value per 1K Streams"] = agg["rpm"]
+    if metric == "Value per 1K Streams":
+        agg = agg[agg["quantity"] >= RPM_MIN_STREAMS]
+    dim_col_name = CSV_DIM_NAMES.get(label_col, label_col.title())
+    export_df = agg[["label","quantity","revenue","Value per 1K Streams"]].rename(
+        columns={"label": dim_col_name, "quantity":"Streams", "revenue":"Earnings"}
+    ).sort_values("Earnings" if metric=="Earnings" else ("Streams" if metric=="Streams" else "Value per 1K Streams"),
+                  ascending=False)
+
+    # SAFE: neutralize dangerous prefixes in dimension text to prevent CSV-formula execution in Excel
+    export_df[dim_col_name] = export_df[dim_col_name].map(lambda s: ("'" + s) if str(s).startswith(("+","-","=","@")) else s)
+    return export_df.to_csv(index=False).encode("utf-8-sig")
+
+def summary_table(view: dict, metric: str) -> pa.Table:
+    """A tab's rows as in the CSV export (same order and RPM threshold), with typed columns."""
+    agg = view["agg"]
+    if metric == "Value per 1K Streams":
+        agg = agg[agg["quantity"] >= RPM_MIN_STREAMS]
+    agg = agg.sort_values(METRIC_COLUMNS.get(metric, "revenue"), ascending=False, kind="stable")
+    labels, label_idx = np.unique(agg["label"].astype(str).to_numpy(), return_inverse=True)
+    revenue = agg["revenue"].to_numpy(np.float64)
+    columns = {view["label_col"]: pa.DictionaryArray.from_arrays(pa.array(label_idx.astype(np.int32)), pa.array(labels))}
+    code_col = next((code for code, spec in ENTITIES.items() if spec[0] == view["key_col"]), None)
+    if code_col:
+        keys = agg[view["key_col"]].astype("string")
+        columns[code_col] = pa.array(keys.where(~keys.str.startswith(FALLBACK_PREFIX).fillna(False)), type=pa.string(), from_pandas=True)
+    columns.update({
+        "streams": pa.array(np.round(agg["quantity"].to_numpy(np.float64)).astype(np.int64)),
+        "earnings": pa.array(revenue),
+        "value_per_1k_streams": pa.array(agg["rpm"].to_numpy(np.float64)),
+        "share_of_earnings": pa.array(revenue / (float(view["revenue"]) or 1.0)),
+    })
+    return pa.table(columns)
+
+def to_parquet(table: pa.Table) -> bytes:
+    buf = pa.BufferOutputStream()
+    pq.write_table(table, buf, compression="zstd")
+    return buf.getvalue().to_pybytes()
+
+def to_arrow_ipc(table: pa.Table) -> bytes:
+    """Arrow IPC file (Feather v2), readable with pyarrow.ipc.open_file / pandas.read_feather."""
+    buf = pa.BufferOutputStream()
+    with pa.ipc.new_file(buf, table.schema, options=pa.ipc.IpcWriteOptions(compression="zstd")) as writer:
+        writer.write_table(table)
+    return buf.getvalue().to_pybytes()
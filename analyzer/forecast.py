@@ -0,0 +1,269 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from analyzer.aggregate import MISSING_LABEL, _is_code_key, resolve_dim_keys
+from analyzer.drill import column_codes
+from analyzer.entities import ENTITIES, entity_labels, label_entities
+
+# ── Forecasting (projected earnings per entity) ──────────
+# Every entity of a tab is one row of a months × entities matrix; additive Holt-Winters
+# with a damped trend is fitted to all rows at once (numpy over entities × parameter
+# grid, one step per month). Fitted states are stored by a hash of the entity's history,
+# so a new version of a statement only refits the entities whose numbers changed.
+MONTH_COL = "reporting_month"
+FORECAST_TABS = ["Artists", "Releases", "Platforms"]
+MIN_MONTHS = 3                  # fewer months of history: no forecast
+MAX_HORIZON = 12                # months projected (the dashboard shows 3–12)
+MAX_HISTORY = 120               # only the latest months are fitted
+SEASON = 12                     # seasonal model once an entity has two full years
+DAMPING = 0.9                   # trend fades out instead of growing forever
+ALPHAS = (0.1, 0.3, 0.5, 0.8)   # level smoothing candidates
+BETAS = (0.0, 0.1, 0.3)         # trend smoothing candidates
+GAMMAS = (0.1, 0.3)             # seasonal smoothing candidates
+FIT_BATCH = 4096                # entities fitted per numpy batch (bounds memory)
+MAX_STORED_FITS = 100_000       # fitted entity states kept per server process
+
+# fitted state of one series: alpha, beta, gamma, level, trend, SEASON seasonal terms
+# (seasonal terms ordered by forecast step: [0] applies to the first projected month)
+_STATE = 5 + SEASON
+_HASH_KEY = hashlib.blake2b(repr((SEASON, DAMPING, ALPHAS, BETAS, GAMMAS)).encode(), digest_size=32).digest()
+
+class FitStore:
+    """Fitted states by series hash (LRU), shared by all sessions and datasets."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = int(max_entries)
+        self._items: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.fits = 0
+
+    def lookup(self, hashes: List[bytes]) -> Tuple[np.ndarray, np.ndarray]:
+        """(states, found mask) for a list of series hashes."""
+        states = np.zeros((len(hashes), _STATE))
+        found = np.zeros(len(hashes), dtype=bool)
+        with self._lock:
+            for i, h in enumerate(hashes):
+                row = self._items.get(h)
+                if row is not None:
+                    self._items.move_to_end(h)
+                    states[i], found[i] = row, True
+            self.hits += int(found.sum())
+        return states, found
+
+    def store(self, hashes: List[bytes], states: np.ndarray) -> None:
+        with self._lock:
+            self.fits += len(hashes)
+            for h, row in zip(hashes, states):
+                self._items[h] = row
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._items), "hits": self.hits, "fits": self.fits}
+
+_FITS = FitStore(MAX_STORED_FITS)
+
+def get_fit_store() -> FitStore:
+    return _FITS
+
+def _series_hashes(y: np.ndarray) -> List[bytes]:
+    """One hash per row of history (values only — the state is relative to the last month)."""
+    y = np.ascontiguousarray(y, dtype=np.float64)
+    return [hashlib.blake2b(row.tobytes(), digest_size=16, key=_HASH_KEY).digest() for row in y]
+
+# ── Model ────────────────────────────────────────────────
+def _fit_batch(y: np.ndarray, start: np.ndarray, m: int) -> np.ndarray:
+    """
+    Grid-searched damped Holt-Winters (m=1: no seasonality) for rows of y whose history
+    begins at start (leading zeros before a release are not part of its history).
+    Returns the fitted state of every row (see _STATE).
+    """
+    n, t_len = y.shape
+    gammas = GAMMAS if m > 1 else (0.0,)
+    grid = np.array([(a, b, g) for a in ALPHAS for b in BETAS for g in gammas])
+    alpha, beta, gamma = (grid[:, i][:, None] for i in range(3))
+    rows = np.arange(n)
+
+    # initial state from the first season (or the first few months) of each row's history
+    if m > 1:
+        first = y[rows[:, None], start[:, None] + np.arange(2 * m)]
+        mean0 = first[:, :m].mean(axis=1)
+        trend0 = (first[:, m:].mean(axis=1) - mean0) / m
+        # detrended first season; the level is carried to the season's last month
+        season0 = first[:, :m] - (mean0[:, None] + trend0[:, None] * (np.arange(m) - (m - 1) / 2))
+        level0 = mean0 + trend0 * (m - 1) / 2
+        begin = start + m
+    else:
+        k = np.minimum(3, t_len - 1 - start)
+        level0 = y[rows, start]
+        trend0 = np.divide(y[rows, start + k] - level0, k, out=np.zeros(n), where=k > 0)
+        season0 = np.zeros((n, 1))
+        begin = start + 1
+    g = len(grid)
+    level = np.repeat(level0[None], g, axis=0)
+    trend = np.repeat(trend0[None], g, axis=0)
+    season = np.repeat(season0[None], g, axis=0)
+    sse = np.zeros((g, n))
+
+    for t in range(int(begin.min()), t_len):
+        active = t >= begin
+        pos = (t - start) % m
+        s = season[:, rows, pos]
+        damped = DAMPING * trend
+        err = y[:, t] - (level + damped + s)
+        new_level = alpha * (y[:, t] - s) + (1 - alpha) * (level + damped)
+        new_trend = beta * (new_level - level) + (1 - beta) * damped
+        new_season = gamma * (y[:, t] - new_level) + (1 - gamma) * s
+        sse += np.where(active, err * err, 0.0)
+        level = np.where(active, new_level, level)
+        trend = np.where(active, new_trend, trend)
+        season[:, rows, pos] = np.where(active, new_season, s)
+
+    best = sse.argmin(axis=0)
+    out = np.zeros((n, _STATE))
+    out[:, :3] = grid[best]
+    out[:, 3] = level[best, rows]
+    out[:, 4] = trend[best, rows]
+    if m > 1:
+        # reorder the seasonal terms by forecast step: step 1 is month t_len
+        steps = (t_len - start[:, None] + np.arange(m)) % m
+        out[:, 5:] = season[best[:, None], rows[:, None], steps]
+    return out
+
+def fit_series(y: np.ndarray, store: Optional[FitStore] = None) -> np.ndarray:
+    """
+    Fitted state of every row of a (series × months) matrix. Rows found in the store
+    (same history seen before) are not refitted; rows without history stay all-zero.
+    """
+    store = store or _FITS
+    y = np.asarray(y, dtype=np.float64)
+    states = np.zeros((len(y), _STATE))
+    nonzero = y != 0
+    has = nonzero.any(axis=1)
+    if not has.any():
+        return states
+    idx = np.flatnonzero(has)
+    hashes = _series_hashes(y[idx])
+    cached, found = store.lookup(hashes)
+    states[idx[found]] = cached[found]
+
+    todo = idx[~found]
+    if len(todo):
+        start = nonzero[todo].argmax(axis=1)
+        seasonal = y.shape[1] - start >= 2 * SEASON
+        for mask, m in ((seasonal, SEASON), (~seasonal, 1)):
+            part = todo[mask]
+            for lo in range(0, len(part), FIT_BATCH):
+                batch = part[lo:lo + FIT_BATCH]
+                states[batch] = _fit_batch(y[batch], start[mask][lo:lo + FIT_BATCH], m)
+        todo_pos = np.flatnonzero(~found)
+        store.store([hashes[i] for i in todo_pos], states[todo])
+    return states
+
+def project(states: np.ndarray, horizon: int) -> np.ndarray:
+    """Projected values (series × horizon) from fitted states, never below zero."""
+    steps = np.arange(1, horizon + 1)
+    damp = np.cumsum(DAMPING ** steps)
+    season = states[:, 5:][:, (steps - 1) % SEASON]
+    return np.maximum(states[:, 3:4] + damp * states[:, 4:5] + season, 0.0)
+
+def model_names(states: np.ndarray) -> np.ndarray:
+    """'seasonal' or 'trend' per fitted series ('' without history)."""
+    return np.where(states[:, 0] > 0, np.where(states[:, 2] > 0, "seasonal", "trend"), "")
+
+# ── Monthly matrix per entity ────────────────────────────
+def month_calendar(df: pd.DataFrame) -> Tuple[np.ndarray, pd.PeriodIndex]:
+    """
+    (calendar position per distinct reporting_month value, -1 if not a date or older
+    than MAX_HISTORY months; consecutive calendar months up to the latest one).
+    """
+    _, uniques = column_codes(df, MONTH_COL)
+    periods = pd.to_datetime(pd.Series(uniques.astype(str)), errors="coerce").dt.to_period("M")
+    ordinals = periods.map(lambda p: p.ordinal if pd.notna(p) else -1).to_numpy(np.int64)
+    if (ordinals < 0).all():
+        return np.full(len(uniques), -1), pd.PeriodIndex([], freq="M")
+    hi = ordinals.max()
+    lo = max(ordinals[ordinals >= 0].min(), hi - MAX_HISTORY + 1)
+    pos = np.where(ordinals >= lo, ordinals - lo, -1)
+    return pos, pd.period_range(pd.Period(ordinal=lo, freq="M"), pd.Period(ordinal=hi, freq="M"), freq="M")
+
+def _entity_key(df: pd.DataFrame, tab_name: str, rows: Optional[np.ndarray]) -> Tuple[str, Optional[pd.Series]]:
+    """Grouping column of a tab (resolved entity key when available) and its label table."""
+    key_col, label_col, _ = resolve_dim_keys(tab_name, df)
+    labels = entity_labels(df, key_col)
+    if labels is not None:
+        return ENTITIES[key_col][0], labels
+    if _is_code_key(key_col):
+        codes = column_codes(df, key_col)[0]
+        if not ((codes if rows is None else codes[rows]) >= 0).any():
+            key_col = label_col
+    return key_col, None
+
+def forecast_view(df: pd.DataFrame, tab_name: str, rows: Optional[np.ndarray] = None) -> Optional[dict]:
+    """
+    History and MAX_HORIZON-month projection of earnings and streams for every entity of
+    a tab (rows: drill-down selection, None = whole dataset). None without enough months.
+    """
+    if MONTH_COL not in df.columns:
+        return None
+    month_pos, calendar = month_calendar(df)
+    if len(calendar) < MIN_MONTHS:
+        return None
+    key_col, labels = _entity_key(df, tab_name, rows)
+    key_codes, keys = column_codes(df, key_col)
+    m_codes = column_codes(df, MONTH_COL)[0]
+    sel = np.arange(len(df)) if rows is None else rows
+    t = np.where(m_codes[sel] >= 0, month_pos[np.maximum(m_codes[sel], 0)], -1)
+    ok = (t >= 0) & (key_codes[sel] >= 0)
+    sel, t = sel[ok], t[ok]
+    if len(sel) == 0:
+        return None
+    present, entity = np.unique(key_codes[sel], return_inverse=True)
+    n, t_len = len(present), len(calendar)
+    cell = entity.astype(np.int64) * t_len + t
+
+    history: Dict[str, np.ndarray] = {}
+    for col in ("revenue", "quantity"):
+        values = df[col].to_numpy("float64")[sel]
+        history[col] = np.bincount(cell, weights=values, minlength=n * t_len).reshape(n, t_len)
+    states = fit_series(np.vstack([history["revenue"], history["quantity"]]))
+    forecast = {"revenue": project(states[:n], MAX_HORIZON), "quantity": project(states[n:], MAX_HORIZON)}
+
+    agg = pd.DataFrame({key_col: np.asarray(keys, dtype=object)[present]})
+    if labels is not None:
+        label = label_entities(agg, key_col, labels)["label"]
+    else:
+        label = agg[key_col].astype("string").fillna(MISSING_LABEL)
+    return {
+        "key_col": key_col, "label": label.reset_index(drop=True),
+        "months": [str(p) for p in calendar],
+        "future": [str(p) for p in pd.period_range(calendar[-1] + 1, periods=MAX_HORIZON, freq="M")],
+        "history": history, "forecast": forecast,
+        "model": model_names(states[:n]),
+    }
+
+def recent_months(view: dict, horizon: int) -> int:
+    """Months of history compared with a projection of `horizon` months (fewer in short reports)."""
+    return min(horizon, len(view["months"]))
+
+def forecast_table(view: dict, metric_col: str, horizon: int) -> pd.DataFrame:
+    """
+    One row per entity: label, model, actual of the last recent_months() months, projected
+    next `horizon` months, change of the monthly average (fraction) and one column per projected month.
+    """
+    hist, proj = view["history"][metric_col], view["forecast"][metric_col][:, :horizon]
+    n_recent = recent_months(view, horizon)
+    recent = hist[:, -n_recent:].sum(axis=1)
+    projected = proj.sum(axis=1)
+    out = pd.DataFrame({"label": view["label"], "model": view["model"], "recent": recent, "projected": projected})
+    before, after = recent / n_recent, projected / horizon
+    out["change"] = np.divide(after - before, np.abs(before), out=np.full(len(out), np.nan), where=recent != 0)
+    for j, month in enumerate(view["future"][:horizon]):
+        out[month] = proj[:, j]
+    return out
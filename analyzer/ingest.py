@@ -0,0 +1,78 @@
+import io
+
+import pandas as pd
+
+from analyzer.cache import get_result_cache
+from analyzer.jobs import get_job_manager
+from analyzer.storage import CompressedFrame
+from analyzer.streaming import StreamSource, read_sample
+
+# --- Upload limits ---
+MAX_SIZE = 200 * 1024 * 1024  # 200 MB limit (file loaded as one table)
+STREAM_THRESHOLD = 150 * 1024 * 1024  # larger CSVs are aggregated chunk by chunk (streaming mode)
+MAX_STREAM_SIZE = 4 * 1024 * 1024 * 1024  # 4 GB limit in streaming mode (HTTP API: the body is spooled to disk)
+APP_MAX_SIZE = MAX_SIZE  # web app limit for every file: Streamlit holds an upload in memory (see .streamlit/config.toml)
+ALLOWED_EXT = (".csv", ".xlsx")
+
+def upload_mode(name: str, size: int, max_stream_size: int = MAX_STREAM_SIZE) -> str:
+    """'table', 'stream' (large CSV read in chunks) or the reason the file is rejected."""
+    name = (name or "").lower()
+    if not name.endswith(ALLOWED_EXT):
+        return "unsupported"
+    if size > (max_stream_size if name.endswith(".csv") else MAX_SIZE):
+        return "too_large"
+    return "stream" if name.endswith(".csv") and size > STREAM_THRESHOLD else "table"
+
+# --- Robust CSV reader ---
+def _read_counting(file, **kwargs) -> pd.DataFrame:
+    """read_csv that skips malformed lines and records how many in df.attrs['skipped_lines']."""
+    skipped = [0]
+
+    def _skip(_line):
+        skipped[0] += 1
+        return None
+
+    file.seek(0)
+    df = pd.read_csv(file, engine="python", on_bad_lines=_skip, **kwargs)
+    df.attrs["skipped_lines"] = skipped[0]
+    return df
+
+def robust_read_csv(file):
+    """CSV reader with auto-separator and encoding fallback"""
+    try:
+        return _read_counting(file, sep=None, encoding="utf-8")
+    except Exception:
+        pass
+
+    encodings = ["utf-8-sig", "utf-8", "cp1251", "latin-1"]
+    seps = [",", ";", "\t", "|"]
+    for enc in encodings:
+        for sep in seps:
+            try:
+                return _read_counting(file, sep=sep, encoding=enc)
+            except Exception:
+                continue
+
+    raise ValueError("Could not parse CSV: try another delimiter/encoding.")
+
+def read_report(data: bytes, name: str) -> pd.DataFrame:
+    """Parse an uploaded CSV/XLSX from its bytes (picklable, so it can run in a worker process)."""
+    buf = io.BytesIO(data)
+    if str(name).lower().endswith(".csv"):
+        return robust_read_csv(buf)
+    return pd.read_excel(buf)
+
+def read_compressed(data: bytes, name: str) -> CompressedFrame:
+    """Parse and compress in the worker process: only the compressed columns travel back."""
+    return CompressedFrame(read_report(data, name))
+
+def parse_upload(job, data: bytes, name: str, digest: str) -> CompressedFrame:
+    """Job: parse the upload in a worker process (once per file content across sessions)."""
+    job.update(0.1, "Reading file…")
+    key = ("parsed", digest, str(name).lower().endswith(".csv"))
+    return get_result_cache().get_or_compute(key, lambda: get_job_manager().run_in_process(job, read_compressed, data, name))
+
+def sample_upload(job, source: StreamSource) -> CompressedFrame:
+    """Job: first rows of a large CSV (streaming mode, spooled to disk) for preview and mapping."""
+    job.update(0.1, "Reading the first rows…")
+    return CompressedFrame(read_sample(source.path))
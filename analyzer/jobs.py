@@ -0,0 +1,185 @@
+import itertools
+import multiprocessing
+import os
+import struct
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from multiprocessing import shared_memory
+from typing import Any, Callable, Optional
+
+# Pool sizes (override with ROYALTY_JOB_THREADS / ROYALTY_JOB_PROCESSES; 0 processes = threads only)
+DEFAULT_THREADS = 4
+POLL_SECONDS = 0.2
+
+class JobCancelled(Exception):
+    """Raised inside a job when the user pressed Cancel."""
+
+class Job:
+    """
+    Handle of a background job: status, progress (0..1) and a short message
+    for the UI, plus cooperative cancellation checked at every update().
+    """
+    _ids = itertools.count(1)
+
+    def __init__(self, name: str):
+        self.id = next(Job._ids)
+        self.name = name
+        self.status = "queued"          # queued → running → done | failed | cancelled
+        self.progress = 0.0
+        self.message = "Waiting for a free worker…"
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._cancel = threading.Event()
+        self._done = threading.Event()
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def cancel(self) -> None:
+        self._cancel.set()
+
+    def update(self, progress: Optional[float] = None, message: Optional[str] = None) -> None:
+        if self._cancel.is_set():
+            raise JobCancelled(self.name)
+        if progress is not None:
+            self.progress = max(0.0, min(1.0, float(progress)))
+        if message is not None:
+            self.message = message
+
+    def wait(self, timeout: Optional[float] = None) -> Any:
+        """Block until the job ends and return its result (re-raises its error)."""
+        if not self._done.wait(timeout):
+            raise TimeoutError(self.name)
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+class ProgressSlot:
+    """
+    Job.update() inside a worker process. Progress, message and the cancel flag live in a
+    small shared-memory block that run_in_process copies to / from the parent's Job while it
+    waits, so a long step in a worker still moves the progress bar and honours Cancel.
+    """
+    _HEADER = struct.Struct("<d?H")     # progress (NaN = unchanged), cancelled, message length
+    SIZE = 512
+
+    def __init__(self):
+        self._shm = shared_memory.SharedMemory(create=True, size=self.SIZE)
+        self._HEADER.pack_into(self._shm.buf, 0, float("nan"), False, 0)
+
+    def __getstate__(self) -> dict:
+        return {"name": self._shm.name}
+
+    def __setstate__(self, state: dict) -> None:
+        self._shm = shared_memory.SharedMemory(name=state["name"])
+
+    def update(self, progress: Optional[float] = None, message: Optional[str] = None) -> None:
+        """Worker side, same contract as Job.update (raises JobCancelled)."""
+        current, cancelled, length = self._HEADER.unpack_from(self._shm.buf, 0)
+        if cancelled:
+            raise JobCancelled("worker")
+        if message is not None:
+            text = message.encode("utf-8")[:self.SIZE - self._HEADER.size]
+            self._shm.buf[self._HEADER.size:self._HEADER.size + len(text)] = text
+            length = len(text)
+        self._HEADER.pack_into(self._shm.buf, 0, current if progress is None else float(progress), False, length)
+
+    def sync(self, job: "Job") -> None:
+        """Parent side: copy progress / message to the job and the cancel flag to the worker."""
+        progress, _, length = self._HEADER.unpack_from(self._shm.buf, 0)
+        if progress == progress:
+            job.progress = max(0.0, min(1.0, progress))
+        if length:
+            job.message = bytes(self._shm.buf[self._HEADER.size:self._HEADER.size + length]).decode("utf-8", "ignore")
+        if job.cancelled:
+            struct.pack_into("<?", self._shm.buf, 8, True)
+
+    def close(self, unlink: bool = False) -> None:
+        self._shm.close()
+        if unlink:
+            self._shm.unlink()
+
+class JobManager:
+    """Thread pool for orchestration and I/O, process pool for CPU-heavy steps."""
+
+    def __init__(self, threads: int, processes: int):
+        self._threads = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="job")
+        self._processes = None
+        if processes > 0:
+            # spawn: forking a multi-threaded server process is unsafe
+            self._processes = ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context("spawn"))
+
+    @property
+    def process_pool(self) -> Optional[ProcessPoolExecutor]:
+        return self._processes
+
+    def submit(self, name: str, fn: Callable[..., Any], *args, **kwargs) -> Job:
+        """Queue fn(job, *args, **kwargs) on the thread pool and return its Job."""
+        job = Job(name)
+
+        def _run():
+            if job.cancelled:
+                job.status = "cancelled"
+                job._done.set()
+                return
+            job.status, job.started_at = "running", time.time()
+            try:
+                job.result = fn(job, *args, **kwargs)
+                job.status, job.progress = "done", 1.0
+            except JobCancelled:
+                job.status, job.message = "cancelled", "Cancelled"
+            except BaseException as exc:
+                job.status, job.error, job.message = "failed", exc, str(exc) or type(exc).__name__
+            finally:
+                job.finished_at = time.time()
+                job._done.set()
+
+        self._threads.submit(_run)
+        return job
+
+    def run_in_process(self, job: Optional[Job], fn: Callable[..., Any], *args, progress: bool = False) -> Any:
+        """
+        Run a picklable CPU-bound function in a worker process, honouring job cancellation.
+        progress: fn takes a job= argument and reports through it (a ProgressSlot in the worker).
+        """
+        if self._processes is None:
+            return fn(*args, job=job) if progress else fn(*args)
+        slot = ProgressSlot() if progress else None
+        try:
+            fut = self._processes.submit(fn, *args, job=slot) if progress else self._processes.submit(fn, *args)
+            while True:
+                try:
+                    return fut.result(timeout=POLL_SECONDS)
+                except FutureTimeout:
+                    if job is None:
+                        continue
+                    if slot is not None:
+                        slot.sync(job)      # a cancel reaches the worker at its next update()
+                    elif job.cancelled:
+                        fut.cancel()   # a task already running finishes in the worker; its result is dropped
+                        raise JobCancelled(job.name)
+        finally:
+            if slot is not None:
+                slot.close(unlink=True)
+
+_MANAGER: Optional[JobManager] = None
+_MANAGER_LOCK = threading.Lock()
+
+def get_job_manager() -> JobManager:
+    """Process-wide job manager shared by all sessions."""
+    global _MANAGER
+    with _MANAGER_LOCK:
+        if _MANAGER is None:
+            threads = int(os.environ.get("ROYALTY_JOB_THREADS") or DEFAULT_THREADS)
+            processes = int(os.environ.get("ROYALTY_JOB_PROCESSES") or (os.cpu_count() or 1))
+            _MANAGER = JobManager(threads, processes)
+        return _MANAGER
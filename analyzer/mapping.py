@@ -0,0 +1,376 @@
+import difflib
+import hashlib
+import json
+import os
+import re
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+# Canonical required fields
+REQUIRED_FIELDS = {
+    # Report info
+    "reporting_month": "Month of the statement/report (e.g., 2023-01)",
+    "country":         "Country / Territory",
+    "platform":        "Streaming/download platform",
+    # Content info
+    "artist_name":     "Artist name",
+    "release_title":   "Release/album title",
+    "track_title":     "Track title",
+    "isrc":            "ISRC (track id)",
+    "upc":             "UPC/EAN (release)",
+    # Performance
+    "quantity":        "Streams/units/downloads",
+    "revenue":         "Revenue/royalty amount",
+}
+
+# Optional segment fields (mapped when the report has them; see analyzer.views.SEGMENT_DIMS)
+OPTIONAL_FIELDS = {
+    "sales_type":   "Sales/transaction type (Stream, Download, …)",
+    "content_type": "Content type (Audio, Video, …)",
+    "label_name":   "Record label",
+}
+
+# Aliases for auto-detect (original + correction for country)
+EXACT_NAMES = {
+    "reporting_month": [
+        "reporting_month","transaction month","statement month","report month",
+        "sales month","accounted date","month","year_month","yyyymm",
+    ],
+    "platform": ["platform","store","service","partner","retailer"],
+    "country":  [
+        "country","territory","region","market",
+        "country region","country/region"
+    ],
+    "artist_name": ["artist_name","artists","artist"],
+    "release_title": ["release_title","album/channel","album","release","product","release name"],
+    "upc": ["upc","ean","barcode","catalog","catalog number","parent id"],
+    "track_title": ["track_title","title","song","track name","track"],
+    "isrc": ["isrc","id"],
+    "quantity": ["quantity","units","streams","downloads","qty","plays","play count","streams count"],
+    "revenue": ["revenue","net_revenue","gross_revenue","net","gross","amount","royalty","earnings","total usd","payout","gross amount","net amount"],
+    "sales_type": ["sales_type","sales type","sale type","transaction type","usage type","sales category"],
+    "content_type": ["content_type","content type","product type","media type","asset type"],
+    "label_name": ["label_name","label","record label","label name","imprint"],
+}
+
+# Russian aliases
+# Original headers found in file:
+# 'Месяц продаж','Магазин','Лейбл','Cтрана','Исполнитель','UPC','Альбом','ISRC','Трек',
+# 'Тип контента','Тип транзакции','Количество',
+# 'Доход Лицензиата, ... руб.','Ставка вознаграждения Лицензиара, %','Вознаграждение Лицензиара, руб.'
+RUSSIAN_ALIASES = {
+    "reporting_month": [
+        "Месяц продаж",
+    ],
+    "platform": [
+        "Магазин",
+    ],
+    "country": [
+        "Cтрана",   # Latin 'C'
+        "Страна",   # Cyrillic 'С'
+    ],
+    "artist_name": [
+        "Исполнитель",
+    ],
+    "release_title": [
+        "Альбом",
+    ],
+    "track_title": [
+        "Трек",
+    ],
+    "isrc": [
+        "ISRC",
+    ],
+    "upc": [
+        "UPC",
+    ],
+    "quantity": [
+        "Количество",
+    ],
+    "revenue": [
+        "Вознаграждение Лицензиара, руб.",
+        # The report also contains «Доход Лицензиата, ... руб.» — not mapped intentionally to avoid confusion.
+    ],
+    "sales_type": [
+        "Тип транзакции",
+    ],
+    "content_type": [
+        "Тип контента",
+    ],
+    "label_name": [
+        "Лейбл",
+    ],
+}
+
+# Merge: extend EXACT_NAMES with Russian aliases (no duplicates)
+for canon, aliases in RUSSIAN_ALIASES.items():
+    if canon in EXACT_NAMES:
+        merged = list(dict.fromkeys(list(EXACT_NAMES[canon]) + aliases))
+        EXACT_NAMES[canon] = merged
+    else:
+        EXACT_NAMES[canon] = list(dict.fromkeys(aliases))
+
+# Tokens that carry no field meaning ("Net Revenue (USD)", "Total Royalty EUR")
+NOISE_TOKENS = {
+    "usd", "eur", "gbp", "rub", "руб", "jpy", "brl", "cad", "aud",
+    "total", "sum", "of", "the", "in", "per", "local", "currency", "reporting",
+}
+
+# Score levels (higher wins; ties are broken by column order)
+SCORE_EXACT = 1.0
+SCORE_LEARNED = 0.98     # header confirmed for this field before (never beats a built-in exact alias)
+SCORE_CLEANED = 0.95     # exact after dropping noise tokens
+SCORE_TOKEN = 0.75       # all alias tokens present in the header
+SCORE_FUZZY = 0.7        # close spelling of an alias (scaled by similarity)
+SCORE_SNIFF = 0.6        # value pattern only (no name evidence)
+MIN_SCORE = 0.55
+
+def _norm(s: str) -> str:
+    """
+    Unicode normalization: lowercasing and removing non-alphanumeric,
+    including underscores. Ensures 'Net Revenue' and 'net_revenue' match.
+    """
+    return re.sub(r"[\W_]+", "", str(s).lower(), flags=re.UNICODE)
+
+def _tokens(s: str) -> List[str]:
+    """Lowercase word tokens of a header; camelCase is split too ('NetRevenue' → net, revenue)."""
+    s = re.sub(r"([a-z])([A-Z])", r"\1 \2", str(s))
+    return [t for t in re.split(r"[\W_]+", s.lower(), flags=re.UNICODE) if t]
+
+# ── Precompiled alias index (built once per process) ─────────────────────────
+def _build_alias_index() -> Tuple[Dict[str, str], Dict[str, List[Tuple[str, frozenset]]]]:
+    exact: Dict[str, str] = {}
+    by_token: Dict[str, List[Tuple[str, frozenset]]] = {}
+    for canon, aliases in EXACT_NAMES.items():
+        for alias in aliases:
+            exact.setdefault(_norm(alias), canon)   # first field listing an alias keeps it
+            toks = frozenset(t for t in _tokens(alias) if t not in NOISE_TOKENS)
+            for t in toks:
+                by_token.setdefault(t, []).append((canon, toks))
+    return exact, by_token
+
+ALIAS_INDEX, TOKEN_INDEX = _build_alias_index()
+_ALIAS_KEYS = list(ALIAS_INDEX)
+
+# ── Content sniffing ─────────────────────────────────────
+ISRC_RE = re.compile(r"^[A-Z]{2}[A-Z0-9]{3}\d{7}$")
+UPC_RE = re.compile(r"^\d{12,14}$")
+MONTH_RE = re.compile(r"^(\d{4})[-./]?(0[1-9]|1[0-2])([-./]\d{1,2})?$|^(0?[1-9]|1[0-2])[./-](\d{4})$")
+SNIFF_ROWS = 50
+
+_CODE_STRIP = re.compile(r"[^A-Z0-9]")
+
+def _as_number(v: str) -> Optional[float]:
+    try:
+        return float(v.replace(",", "."))
+    except ValueError:
+        return None
+
+def sniff_column(values: pd.Series) -> Dict[str, float]:
+    """
+    Share of sampled non-empty values matching each content pattern:
+    'isrc', 'upc', 'month', 'numeric' and 'integer'.
+    """
+    sample = [str(v).strip() for v in values.dropna().head(SNIFF_ROWS).tolist()]
+    sample = [v for v in sample if v]
+    if not sample:
+        return {}
+    hits = {"isrc": 0, "upc": 0, "month": 0, "numeric": 0, "integer": 0}
+    for v in sample:
+        code = _CODE_STRIP.sub("", v.upper())
+        if ISRC_RE.match(code):
+            hits["isrc"] += 1
+        if UPC_RE.match(code) and "." not in v and "," not in v:
+            hits["upc"] += 1
+        if MONTH_RE.match(v):
+            hits["month"] += 1
+        num = _as_number(v)
+        if num is not None:
+            hits["numeric"] += 1
+            if num == num and num % 1 == 0:
+                hits["integer"] += 1
+    return {k: n / len(sample) for k, n in hits.items()}
+
+def _sniff_ok(canon: str, sniff: Dict[str, float]) -> bool:
+    """Reject name matches that contradict the values (e.g. an 'ID' column that is not an ISRC)."""
+    if not sniff:
+        return True
+    if canon == "isrc":
+        return sniff["isrc"] >= 0.5
+    if canon == "upc":
+        return sniff["upc"] >= 0.5 or sniff["numeric"] >= 0.9
+    if canon in ("quantity", "revenue"):
+        return sniff["numeric"] >= 0.8
+    if canon in ("platform", "country", "artist_name", "release_title", "track_title") or canon in OPTIONAL_FIELDS:
+        return sniff["numeric"] < 0.9
+    return True
+
+def _sniff_only(sniff: Dict[str, float]) -> Optional[str]:
+    if not sniff:
+        return None
+    if sniff["isrc"] >= 0.9:
+        return "isrc"
+    if sniff["upc"] >= 0.9:
+        return "upc"
+    if sniff["month"] >= 0.9 and sniff["integer"] < 0.9:
+        return "reporting_month"
+    return None
+
+# ── Name scoring ─────────────────────────────────────────
+def score_header(col: str) -> Tuple[Optional[str], float]:
+    """Best (field, score) for a header name; cost does not depend on the number of columns."""
+    n = _norm(col)
+    if n in ALIAS_INDEX:
+        return ALIAS_INDEX[n], SCORE_EXACT
+
+    toks = [t for t in _tokens(col) if t not in NOISE_TOKENS]
+    if not toks:
+        return None, 0.0
+    cleaned = "".join(toks)
+    if cleaned in ALIAS_INDEX:
+        return ALIAS_INDEX[cleaned], SCORE_CLEANED
+
+    # token overlap: an alias whose tokens are all present in the header
+    tokset = set(toks)
+    best: Tuple[Optional[str], float] = (None, 0.0)
+    for t in toks:
+        for canon, alias_toks in TOKEN_INDEX.get(t, ()):
+            if alias_toks and alias_toks <= tokset:
+                score = SCORE_TOKEN * (0.8 + 0.2 * len(alias_toks) / len(tokset))
+                if score > best[1]:
+                    best = (canon, score)
+    if best[0] is not None:
+        return best
+
+    close = difflib.get_close_matches(cleaned, _ALIAS_KEYS, n=1, cutoff=0.8)
+    if close:
+        ratio = difflib.SequenceMatcher(None, cleaned, close[0]).ratio()
+        return ALIAS_INDEX[close[0]], SCORE_FUZZY * ratio
+    return None, 0.0
+
+def auto_map(frame: pd.DataFrame, learned: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """
+    Map canonical fields to columns by header name and sampled values.
+    Each field and each column is used at most once; stronger evidence wins.
+    learned: header → field aliases confirmed by users (shared by everyone using this
+    server), so they rank below the built-in exact aliases and need matching values.
+    """
+    candidates = []
+    for pos, col in enumerate(frame.columns):
+        sniff = sniff_column(frame[col]) if len(frame) else {}
+        canon, score = score_header(col)
+        alias = learned.get(_norm(col)) if learned else None
+        if alias is not None and score < SCORE_LEARNED and sniff and _sniff_ok(alias, sniff):
+            canon, score = alias, SCORE_LEARNED
+        if canon is not None and not _sniff_ok(canon, sniff):
+            canon, score = None, 0.0
+        if canon is None:
+            canon = _sniff_only(sniff)
+            score = SCORE_SNIFF if canon else 0.0
+        if canon is not None and score >= MIN_SCORE:
+            candidates.append((-score, pos, canon, col))
+
+    auto: Dict[str, str] = {}
+    used = set()
+    for _, _, canon, col in sorted(candidates):
+        if canon in auto or col in used:
+            continue
+        auto[canon] = col
+        used.add(col)
+    return auto
+
+def mapping_fits(frame: pd.DataFrame, mapping: Dict[str, str]) -> bool:
+    """Whether the sampled values of every mapped column agree with its field (see _sniff_ok)."""
+    by_name = {str(c): c for c in frame.columns}
+    return all(str(col) in by_name and _sniff_ok(canon, sniff_column(frame[by_name[str(col)]]))
+               for canon, col in mapping.items())
+
+# ── Learned mappings (persistent) ────────────────────────
+def header_fingerprint(columns: Iterable) -> str:
+    """Order-independent hash of the stripped header names."""
+    names = sorted(str(c).strip() for c in columns)
+    return hashlib.sha256("\x1f".join(names).encode("utf-8")).hexdigest()[:20]
+
+def _store_dir() -> Path:
+    return Path(os.environ.get("ROYALTY_ANALYZER_HOME") or Path.home() / ".streaming_royalty_analyzer")
+
+class MappingStore:
+    """
+    Confirmed mappings keyed by header fingerprint, plus header→field aliases
+    learned from them. Only column names are saved — never report values.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path) if path else _store_dir() / "mappings.json"
+        self._lock = threading.Lock()
+        self._data = {"profiles": {}, "aliases": {}}
+        try:
+            with open(self.path, encoding="utf-8") as fh:
+                loaded = json.load(fh)
+            self._data["profiles"].update(loaded.get("profiles", {}))
+            self._data["aliases"].update(loaded.get("aliases", {}))
+        except (OSError, ValueError):
+            pass
+
+    @property
+    def learned_aliases(self) -> Dict[str, str]:
+        return self._data["aliases"]
+
+    def lookup(self, columns: Iterable) -> Optional[Dict[str, str]]:
+        """Stored mapping for exactly this header set, if every mapped column still exists."""
+        cols = {str(c) for c in columns}
+        prof = self._data["profiles"].get(header_fingerprint(cols))
+        if not prof:
+            return None
+        mapping = prof.get("mapping") or {}
+        if not mapping or not set(mapping.values()) <= cols:
+            return None
+        return dict(mapping)
+
+    def remember(self, columns: Iterable, mapping: Dict[str, str]) -> None:
+        """Save a confirmed mapping and learn its header names as aliases."""
+        cols = [str(c) for c in columns]
+        with self._lock:
+            self._data["profiles"][header_fingerprint(cols)] = {
+                "columns": cols,
+                "mapping": {k: str(v) for k, v in mapping.items()},
+                "updated": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            }
+            for canon, col in mapping.items():
+                n = _norm(col)
+                if n and ALIAS_INDEX.get(n) != canon:
+                    self._data["aliases"][n] = canon
+            self._save()
+
+    def _save(self) -> None:
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            with open(tmp, "w", encoding="utf-8") as fh:
+                json.dump(self._data, fh, ensure_ascii=False, indent=1)
+            os.replace(tmp, self.path)
+        except OSError:
+            pass   # read-only hosting: keep the in-memory copy only
+
+_STORE: Optional[MappingStore] = None
+_STORE_LOCK = threading.Lock()
+
+def get_mapping_store() -> MappingStore:
+    """Process-wide store shared by all sessions."""
+    global _STORE
+    with _STORE_LOCK:
+        if _STORE is None:
+            _STORE = MappingStore()
+        return _STORE
+
+def suggest_mapping(frame: pd.DataFrame) -> Dict[str, str]:
+    """Confirmed mapping for a known header set whose values still fit it, otherwise the automatic guess."""
+    store = get_mapping_store()
+    known = store.lookup(frame.columns)
+    if known is not None and mapping_fits(frame, known):
+        return known
+    return auto_map(frame, store.learned_aliases)
@@ -0,0 +1,102 @@
+import os
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Row count from which dashboard groupbys are split across worker processes
+PARALLEL_MIN_ROWS = int(os.environ.get("ROYALTY_PARALLEL_MIN_ROWS") or 2_000_000)
+MIN_PARTITION_ROWS = 250_000
+
+def _partial_sums(shm_name: str, n_rows: int, n_values: int, n_groups: int, lo: int, hi: int) -> np.ndarray:
+    """Worker: per-group sums of rows [lo, hi) read from the shared block (codes + value columns)."""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        block = np.ndarray((n_values + 1, n_rows), dtype=np.float64, buffer=shm.buf)
+        codes = block[0, lo:hi].astype(np.intp)
+        out = np.empty((n_values, n_groups), dtype=np.float64)
+        for i in range(n_values):
+            out[i] = np.bincount(codes, weights=block[i + 1, lo:hi], minlength=n_groups)
+        del block, codes
+        return out
+    finally:
+        shm.close()
+
+def _partitions(n_rows: int, workers: int) -> List[tuple]:
+    parts = max(1, min(workers, n_rows // MIN_PARTITION_ROWS))
+    bounds = np.linspace(0, n_rows, parts + 1, dtype=np.int64)
+    return [(int(lo), int(hi)) for lo, hi in zip(bounds[:-1], bounds[1:]) if hi > lo]
+
+def _worker_count(pool) -> int:
+    return getattr(pool, "_max_workers", None) or os.cpu_count() or 1
+
+def partitioned_sums(codes: np.ndarray, n_groups: int, values: List[np.ndarray], pool) -> np.ndarray:
+    """
+    Sum each value column per group code: rows are split into partitions,
+    workers read them from one shared-memory block and the partial sums are added up.
+    Returns an array of shape (len(values), n_groups).
+    """
+    n_rows = len(codes)
+    parts = _partitions(n_rows, _worker_count(pool)) if pool is not None else [(0, n_rows)]
+    if len(parts) == 1:
+        return np.vstack([np.bincount(codes, weights=v, minlength=n_groups) for v in values])
+
+    shm = shared_memory.SharedMemory(create=True, size=8 * (len(values) + 1) * n_rows)
+    try:
+        block = np.ndarray((len(values) + 1, n_rows), dtype=np.float64, buffer=shm.buf)
+        block[0] = codes
+        for i, v in enumerate(values):
+            block[i + 1] = v
+        futures = [pool.submit(_partial_sums, shm.name, n_rows, len(values), n_groups, lo, hi) for lo, hi in parts]
+        total = np.zeros((len(values), n_groups), dtype=np.float64)
+        for fut in futures:
+            total += fut.result()
+        del block
+        return total
+    finally:
+        shm.close()
+        shm.unlink()
+
+def sorted_codes(codes: np.ndarray, uniques: pd.Index, dropna: bool) -> Tuple[np.ndarray, pd.Index]:
+    """
+    A factorization in first-seen order (-1 = missing, e.g. drill.column_codes) renumbered like
+    pd.factorize(sort=True, use_na_sentinel=dropna). Sorting touches the uniques only; the
+    rows are recoded with one lookup, instead of hashing every key again.
+    """
+    order = uniques.argsort()
+    rank = np.empty(len(order), dtype=np.int32 if len(order) < 2**31 else np.int64)
+    rank[order] = np.arange(len(order))
+    lookup = np.append(rank, -1 if dropna else len(order))     # code -1 → lookup[-1]
+    out = lookup[codes]
+    uniques = uniques.take(order)
+    if not dropna and (out == len(order)).any():
+        uniques = uniques.insert(len(uniques), np.nan)
+    return out, uniques
+
+def parallel_group_sums(keys: pd.Series, values: Dict[str, pd.Series], dropna: bool, pool,
+                        coded: Optional[Tuple[np.ndarray, pd.Index]] = None) -> pd.DataFrame:
+    """
+    Same result as frame.groupby(key, dropna=dropna, as_index=False).agg(col=(col, 'sum'), ...):
+    keys in sorted order, missing key last (or dropped), integer columns stay integer.
+    coded: (codes, uniques) of keys already factorized (see sorted_codes); otherwise keys are factorized here.
+    """
+    if coded is None:
+        codes, uniques = pd.factorize(keys, sort=True, use_na_sentinel=dropna)
+    else:
+        codes, uniques = sorted_codes(*coded, dropna)
+    if dropna:
+        keep = codes >= 0
+        codes = codes[keep]
+        arrays = [np.asarray(v, dtype=np.float64)[keep] for v in values.values()]
+    else:
+        arrays = [np.asarray(v, dtype=np.float64) for v in values.values()]
+    sums = partitioned_sums(codes, len(uniques), arrays, pool)
+
+    out = pd.DataFrame({keys.name: uniques})
+    for i, (col, src) in enumerate(values.items()):
+        out[col] = sums[i].round().astype(src.dtype) if pd.api.types.is_integer_dtype(src.dtype) else sums[i]
+    if coded is not None:
+        # the cached uniques cover the whole dataset: keep the keys present in these rows
+        out = out[np.bincount(codes[codes >= 0], minlength=len(uniques)) > 0].reset_index(drop=True)
+    return out
@@ -0,0 +1,265 @@
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from analyzer.drill import column_codes
+from analyzer.entities import ENTITIES, FALLBACK_PREFIX, entity_labels
+
+# ── Catalog sketches (built once per dataset) ────────────
+# A single dataset keeps its exact distinct counts and candidate earnings (the distinct
+# (group, key) pairs are counted anyway). HyperLogLog registers and a count-min sketch with
+# a short list of heavy-hitter candidates are kept for merging: values are hashed with
+# pandas' fixed-key hash, so sketches of different files (e.g. one statement per month)
+# merge exactly — registers by element-wise max, count-min tables by addition — and a
+# merged sketch answers from the estimates.
+HLL_PRECISION = 12              # 4,096 registers per group: ±1.6% standard error
+CM_WIDTH = 4096                 # count-min columns: overestimate ≤ e/width of the total
+CM_DEPTH = 4                    # count-min rows: bound holds with probability 1 - e^-depth
+HEAVY_CANDIDATES = 100          # top earners kept per sketch as candidates for merged top-k
+GROUP_DIMS = ("platform", "country")
+ALL = ("", "")                  # group of every row
+
+# distinct count → (column, resolved entity column)
+DISTINCT = {
+    "tracks": ("track_title", "isrc"),
+    "releases": ("release_title", "upc"),
+    "earning_isrcs": (None, "isrc"),
+}
+
+def _bit_length(w: np.ndarray) -> np.ndarray:
+    """Exact bit length of uint64 values (float log2 rounds above 2^53)."""
+    n = np.zeros(len(w), dtype=np.int64)
+    for s in (32, 16, 8, 4, 2, 1):
+        hit = (w >> np.uint64(s)) != 0
+        n += np.where(hit, s, 0)
+        w = np.where(hit, w >> np.uint64(s), w)
+    return n + (w != 0)
+
+class HyperLogLog:
+    """One HyperLogLog per group (rows of a uint8 register matrix)."""
+
+    def __init__(self, n_groups: int = 1, precision: int = HLL_PRECISION):
+        self.precision = precision
+        self.registers = np.zeros((n_groups, 1 << precision), dtype=np.uint8)
+
+    @property
+    def error(self) -> float:
+        """Relative standard error of an estimate."""
+        return float(1.04 / np.sqrt(self.registers.shape[1]))
+
+    def add(self, groups: np.ndarray, hashes: np.ndarray) -> None:
+        """Add 64-bit hashes to their groups (duplicates are harmless)."""
+        p = self.precision
+        idx = (hashes >> np.uint64(64 - p)).astype(np.int64)
+        rest = hashes & np.uint64((1 << (64 - p)) - 1)
+        rank = (64 - p) - _bit_length(rest) + 1
+        np.maximum.at(self.registers, (groups, idx), rank.astype(np.uint8))
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        out = HyperLogLog(len(self.registers), self.precision)
+        out.registers = np.maximum(self.registers, other.registers)
+        return out
+
+    def estimate(self) -> np.ndarray:
+        """Distinct count per group (linear counting while many registers are empty)."""
+        m = self.registers.shape[1]
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.exp2(-self.registers.astype(np.float64)).sum(axis=1)
+        zeros = (self.registers == 0).sum(axis=1)
+        small = m * np.log(m / np.maximum(zeros, 1))
+        return np.where((raw <= 2.5 * m) & (zeros > 0), small, raw)
+
+class CountMin:
+    """Count-min sketch of weights per hashed key (never underestimates)."""
+
+    def __init__(self, width: int = CM_WIDTH, depth: int = CM_DEPTH):
+        self.table = np.zeros((depth, width), dtype=np.float64)
+
+    def _cells(self, hashes: np.ndarray) -> np.ndarray:
+        # depth hash functions from one 64-bit hash: h1 + i·h2 (Kirsch–Mitzenmacher)
+        h1 = (hashes & np.uint64(0xFFFFFFFF)).astype(np.int64)
+        h2 = (hashes >> np.uint64(32)).astype(np.int64) | 1
+        return (h1[None, :] + np.arange(len(self.table))[:, None] * h2[None, :]) % self.table.shape[1]
+
+    def add(self, hashes: np.ndarray, weights: np.ndarray) -> None:
+        cells = self._cells(hashes)
+        for i, row in enumerate(self.table):
+            row += np.bincount(cells[i], weights=weights, minlength=len(row))
+
+    def query(self, hashes: np.ndarray) -> np.ndarray:
+        cells = self._cells(hashes)
+        return self.table[np.arange(len(self.table))[:, None], cells].min(axis=0)
+
+    def merge(self, other: "CountMin") -> "CountMin":
+        out = CountMin(self.table.shape[1], len(self.table))
+        out.table = self.table + other.table
+        return out
+
+    @property
+    def error_bound(self) -> float:
+        """Overestimate bound of any query (holds with probability 1 - e^-depth)."""
+        return float(np.e / self.table.shape[1] * self.table[0].sum())
+
+def value_hashes(values) -> np.ndarray:
+    """Stable 64-bit hashes of values (same value → same hash in every file and process)."""
+    return pd.util.hash_array(np.asarray(pd.Series(values, dtype=object).astype(str), dtype=object))
+
+def _key_column(df: pd.DataFrame, name: str) -> Optional[Tuple[str, bool]]:
+    """(column counted by a DISTINCT entry, whether only valid codes count), or None."""
+    title_col, code_col = DISTINCT[name]
+    if entity_labels(df, code_col) is not None:
+        return ENTITIES[code_col][0], title_col is None
+    if title_col is not None and title_col in df.columns:
+        return title_col, False
+    return None
+
+class CatalogSketches:
+    """
+    Distinct tracks / releases / earning ISRCs for all rows and per platform and country
+    value, plus track earnings for top-k. Exact for one dataset; mergeable across
+    datasets, where counts and earnings become estimates.
+    """
+
+    def __init__(self, groups: List[Tuple[str, str]]):
+        self.groups = list(groups)
+        self.distinct: Dict[str, HyperLogLog] = {}
+        self.earnings = CountMin()
+        self.candidates: Dict[int, str] = {}     # track hash → label
+        self.exact: Dict[str, np.ndarray] = {}   # distinct count per group (single dataset only)
+        self.earned: Dict[int, float] = {}       # track hash → earnings of the candidates (single dataset only)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(h.registers.nbytes for h in self.distinct.values()) + self.earnings.table.nbytes
+
+    def counts(self, group: Tuple[str, str] = ALL) -> Dict[str, Tuple[float, float]]:
+        """name → (count, relative standard error; 0.0 when exact) for one group; {} for an unknown group."""
+        if group not in self.groups:
+            return {}
+        pos = self.groups.index(group)
+        if self.exact:
+            return {name: (float(c[pos]), 0.0) for name, c in self.exact.items()}
+        return {name: (float(h.estimate()[pos]), h.error) for name, h in self.distinct.items()}
+
+    def group_counts(self, dim: str, name: str) -> pd.Series:
+        """Distinct count per value of a group dimension (estimated for merged sketches)."""
+        pos = [i for i, g in enumerate(self.groups) if g[0] == dim]
+        if name not in self.distinct or not pos:
+            return pd.Series(dtype="float64")
+        est = (self.exact[name] if name in self.exact else self.distinct[name].estimate())[pos]
+        return pd.Series(est, index=[self.groups[i][1] for i in pos])
+
+    def top_earners(self, k: int) -> List[Tuple[str, float]]:
+        """
+        (label, earnings) of the k largest candidates: exact for one dataset, else estimated
+        (overestimates ≤ earnings.error_bound).
+        """
+        if not self.candidates:
+            return []
+        keys = np.fromiter(self.candidates, dtype=np.uint64, count=len(self.candidates))
+        if self.earned:
+            est = np.array([self.earned[int(key)] for key in keys], dtype=np.float64)
+        else:
+            est = self.earnings.query(keys)
+        order = np.argsort(-est, kind="stable")[:k]
+        return [(self.candidates[int(keys[i])], float(est[i])) for i in order]
+
+    def merge(self, other: "CatalogSketches") -> "CatalogSketches":
+        """Sketches of both datasets together (groups are aligned by dimension and value; estimates only)."""
+        groups = self.groups + [g for g in other.groups if g not in self.groups]
+        out = CatalogSketches(groups)
+        for name in dict.fromkeys([*self.distinct, *other.distinct]):
+            hll = HyperLogLog(len(groups))
+            for part in (self, other):
+                if name in part.distinct:
+                    pos = [groups.index(g) for g in part.groups]
+                    hll.registers[pos] = np.maximum(hll.registers[pos], part.distinct[name].registers)
+            out.distinct[name] = hll
+        out.earnings = self.earnings.merge(other.earnings)
+        out.candidates = {**self.candidates, **other.candidates}
+        return out
+
+def _group_codes(df: pd.DataFrame, rows: np.ndarray) -> Tuple[List[Tuple[str, str]], List[np.ndarray]]:
+    """Groups present in the rows and, per dimension, each row's group position (-1 = none)."""
+    groups, per_dim = [ALL], []
+    for dim in GROUP_DIMS:
+        if dim not in df.columns:
+            continue
+        codes, uniques = column_codes(df, dim)
+        present = np.unique(codes[rows])
+        present = present[present >= 0]
+        slot = np.full(len(uniques) + 1, -1, dtype=np.int64)
+        slot[present] = len(groups) + np.arange(len(present))
+        groups += [(dim, str(v)) for v in uniques[present]]
+        per_dim.append(slot[codes[rows]])
+    return groups, per_dim
+
+def build_sketches(df: pd.DataFrame, rows: Optional[np.ndarray] = None) -> CatalogSketches:
+    """Sketches of a normalized dataset (rows: drill-down selection, None = all rows)."""
+    rows = np.arange(len(df)) if rows is None else rows
+    groups, per_dim = _group_codes(df, rows)
+    out = CatalogSketches(groups)
+    revenue = df["revenue"].to_numpy("float64")[rows] if "revenue" in df.columns else np.zeros(len(rows))
+
+    for name in DISTINCT:
+        spec = _key_column(df, name)
+        if spec is None:
+            continue
+        col, codes_only = spec
+        codes, uniques = column_codes(df, col)
+        keep = codes[rows] >= 0
+        if codes_only:
+            valid = ~pd.Series(uniques, dtype="string").str.startswith(FALLBACK_PREFIX).fillna(True).to_numpy(bool)
+            keep &= valid[np.maximum(codes[rows], 0)] & (revenue > 0)
+        hashes = value_hashes(uniques)
+        hll = HyperLogLog(len(groups))
+        exact = np.zeros(len(groups), dtype=np.int64)
+        n_keys = len(uniques)
+        for group in [np.zeros(len(rows), dtype=np.int64)] + per_dim:
+            ok = keep & (group >= 0)
+            # distinct (group, key) pairs: the exact counts, and one register update per pair
+            pairs = np.unique(group[ok] * n_keys + codes[rows][ok])
+            exact += np.bincount(pairs // n_keys, minlength=len(groups))
+            hll.add(pairs // n_keys, hashes[pairs % n_keys])
+        out.distinct[name] = hll
+        out.exact[name] = exact
+
+    spec = _key_column(df, "tracks")
+    if spec is not None and len(rows):
+        col = spec[0]
+        codes, uniques = column_codes(df, col)
+        ok = codes[rows] >= 0
+        sums = np.bincount(codes[rows][ok], weights=revenue[ok], minlength=len(uniques))
+        hashes = value_hashes(uniques)
+        present = np.flatnonzero(sums)
+        out.earnings.add(hashes[present], sums[present])
+        top = present[np.argsort(-sums[present], kind="stable")[:HEAVY_CANDIDATES]]
+        labels = entity_labels(df, "isrc") if col == ENTITIES["isrc"][0] else None
+        for pos in top:
+            key = uniques[pos]
+            label = labels.get(key) if labels is not None else None
+            if label is None or pd.isna(label):
+                label = str(key)[len(FALLBACK_PREFIX):] if str(key).startswith(FALLBACK_PREFIX) else str(key)
+            out.candidates[int(hashes[pos])] = str(label)
+            out.earned[int(hashes[pos])] = float(sums[pos])
+    return out
+
+def selection_group(selection: tuple) -> Optional[Tuple[str, str]]:
+    """Sketch group answering a drill path directly (all rows, one platform or one country), else None."""
+    if not selection:
+        return ALL
+    if len(selection) == 1 and selection[0][0] in GROUP_DIMS and not isinstance(selection[0][1], tuple):
+        return selection[0][0], str(selection[0][1])
+    return None
+
+def catalog_summary(sk: CatalogSketches, group: Tuple[str, str] = ALL, k: int = 3) -> dict:
+    """
+    Distinct counts of one group with 95% error bounds (±2 standard errors, relative; 0 when
+    exact), and the top k earning tracks with the absolute count-min bound (whole sketch only).
+    """
+    out = {name: {"estimate": round(est), "error_95": 2 * err} for name, (est, err) in sk.counts(group).items()}
+    if group == ALL:
+        out["top_tracks"] = [{"label": label, "earnings": value} for label, value in sk.top_earners(k)]
+        out["top_tracks_error"] = 0.0 if sk.earned else sk.earnings.error_bound
+    return out
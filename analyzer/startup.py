@@ -0,0 +1,132 @@
+import importlib
+import multiprocessing
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+# ── Startup pre-warming ──────────────────────────────────
+# The first session of a fresh server process pays for the dashboard's imports, Plotly's
+# figure validators and templates, the first pandas groupby / factorize calls and the
+# spawn of worker processes (every upload is parsed in one). prewarm() does that work
+# once per process on a background thread. Pages call it on their first run, so it
+# overlaps with the user picking a file; the API server calls it at start.
+# Turn it off with ROYALTY_PREWARM=0 (e.g. to measure cold starts). Worker processes never
+# pre-warm: a spawned worker re-runs the page script that was running when it started
+# (Streamlit sets it as __main__), and must not start workers of its own.
+PREWARM_WORKERS = 2             # worker processes started ahead of the first upload
+DASHBOARD_MODULES = (
+    "analyzer.views", "analyzer.compare", "analyzer.concentration", "analyzer.export",
+    "analyzer.forecast", "analyzer.sketches", "analyzer.validation",
+)
+
+_STARTED = False
+_LOCK = threading.Lock()
+_TIMINGS: Dict[str, float] = {}
+
+def prewarm_enabled() -> bool:
+    if multiprocessing.parent_process() is not None:
+        return False
+    return (os.environ.get("ROYALTY_PREWARM") or "1").strip().lower() not in ("0", "false", "no", "off")
+
+def prewarm() -> Optional[threading.Thread]:
+    """Start the warm-up thread (once per process); None when disabled or already started."""
+    global _STARTED
+    with _LOCK:
+        if _STARTED or not prewarm_enabled():
+            return None
+        _STARTED = True
+    thread = threading.Thread(target=_run, name="prewarm", daemon=True)
+    thread.start()
+    return thread
+
+def prewarm_timings() -> Dict[str, float]:
+    """Seconds spent per warm-up step so far."""
+    return dict(_TIMINGS)
+
+def _run() -> None:
+    _step("modules", lambda: [importlib.import_module(m) for m in DASHBOARD_MODULES])
+    _step("charts", _warm_charts)
+    _step("engine", _warm_engine)
+    _step("workers", _warm_workers)
+
+def _step(name: str, fn: Callable[[], object]) -> None:
+    start = time.perf_counter()
+    try:
+        fn()
+    except Exception:
+        pass    # best effort: a real first use reports real errors
+    _TIMINGS[name] = time.perf_counter() - start
+
+def _warm_charts() -> None:
+    """Plotly Express, the default template and figure serialization, as the dashboard uses them."""
+    try:
+        import plotly.express as px
+        import plotly.io as pio
+    except Exception:
+        return
+    pio.templates[pio.templates.default]
+    frame = pd.DataFrame({"x": [1.0, 2.0], "y": ["a", "b"], "s": ["A", "B"]})
+    figures = [
+        px.bar(frame, x="x", y="y", orientation="h", text="x"),
+        px.line(frame, x="y", y="x", color="s", line_dash="s"),
+        px.area(frame, x="x", y="x"),
+    ]
+    for fig in figures:
+        fig.update_layout(margin=dict(l=8, r=8, t=4, b=6), plot_bgcolor="white")
+        fig.update_traces(hovertemplate="%{x}<extra></extra>")
+        pio.to_json(fig, validate=False)
+
+def _sample_dataset() -> pd.DataFrame:
+    """A few rows shaped like a mapped statement (normalized column names)."""
+    n = 48
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        "reporting_month": [f"2024-{m:02d}" for m in np.arange(n) % 12 + 1],
+        "platform": np.array(["Spotify", "Apple Music", "YouTube Music"])[np.arange(n) % 3],
+        "country": np.array(["US", "DE", "BR", "JP"])[np.arange(n) % 4],
+        "artist_name": np.array(["Artist A", "Artist B"])[np.arange(n) % 2],
+        "release_title": np.array(["Release A", "Release B", "Release C"])[np.arange(n) % 3],
+        "upc": np.array(["123456789012", "123456789029", "123456789036"])[np.arange(n) % 3],
+        "track_title": [f"Track {i % 6}" for i in range(n)],
+        "isrc": [f"USAAA24{i % 6:05d}" for i in range(n)],
+        "quantity": rng.integers(1, 1000, n),
+        "revenue": rng.uniform(0.01, 5.0, n).round(2),
+    })
+
+def _warm_engine() -> None:
+    """Normalization, every tab view, KPIs, sketches and a forecast on a tiny dataset (no shared cache)."""
+    from analyzer.concentration import concentration
+    from analyzer.dataset import normalize_dataset
+    from analyzer.forecast import forecast_view
+    from analyzer.sketches import build_sketches
+    from analyzer.views import TABS, kpi_summary, tab_view
+
+    raw = _sample_dataset()
+    df = normalize_dataset(raw, {col: col for col in raw.columns})
+    kpi_summary(df)
+    for tab in TABS:
+        view = tab_view(df, tab, ())
+        if view is not None:
+            concentration(view["agg"], "revenue")
+    build_sketches(df)
+    forecast_view(df, "Artists")
+
+def _worker_ready() -> int:
+    """Runs in a worker process: import what uploads and partitioned sums need there."""
+    importlib.import_module("analyzer.ingest")
+    importlib.import_module("analyzer.parallel")
+    time.sleep(0.05)    # keep this worker busy so the next task starts another one
+    return os.getpid()
+
+def _warm_workers() -> None:
+    from analyzer.jobs import get_job_manager
+    pool = get_job_manager().process_pool
+    if pool is None:
+        return
+    count = min(PREWARM_WORKERS, getattr(pool, "_max_workers", 1) or 1)
+    for fut in [pool.submit(_worker_ready) for _ in range(count)]:
+        fut.result()
@@ -0,0 +1,210 @@
+import os
+import pickle
+import tempfile
+import threading
+import time
+import weakref
+from typing import Any, Callable, Hashable, Iterator, List, Optional, Tuple
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# ── Session storage ──────────────────────────────────────
+# The parsed upload is only needed again to build the normalized dataset (mapped columns)
+# and the data check, so sessions keep it as compressed column buffers and decompress
+# single columns on demand. Large derived objects held by a session (the normalized
+# dataset) are dropped after an idle timeout and rebuilt from the shared cache or the
+# compressed upload when the session comes back. An idle session also evicts its entries
+# from the shared cache and moves its compressed upload to a temporary file, so what stays
+# in memory is the preview.
+CODEC = "zstd"
+PREVIEW_ROWS = 1_000                 # rows kept uncompressed for preview and column mapping
+DICTIONARY_MAX_RATIO = 0.5           # dictionary-encode text columns with fewer distinct values than this share
+# Idle sessions release their dataset after this many minutes (override with ROYALTY_IDLE_MINUTES)
+DEFAULT_IDLE_MINUTES = 15
+
+_IPC_OPTIONS = pa.ipc.IpcWriteOptions(compression=CODEC)
+
+def _pack(series: pd.Series) -> Tuple[str, bytes]:
+    """One column as ("arrow", zstd IPC stream) or ("pickle", zstd pickle) for values Arrow cannot type."""
+    try:
+        table = pa.Table.from_pandas(series.to_frame(), preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        raw = pickle.dumps(series, protocol=pickle.HIGHEST_PROTOCOL)
+        return "pickle", pa.compress(raw, codec=CODEC, asbytes=True) + len(raw).to_bytes(8, "little")
+    col = table.column(0)
+    if pa.types.is_string(col.type) or pa.types.is_large_string(col.type):
+        if len(col) and pc.count_distinct(col).as_py() < DICTIONARY_MAX_RATIO * len(col):
+            table = table.set_column(0, table.field(0).with_type(pa.dictionary(pa.int32(), col.type)),
+                                     col.dictionary_encode())
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema, options=_IPC_OPTIONS) as writer:
+        writer.write_table(table)
+    return "arrow", sink.getvalue().to_pybytes()
+
+def _unpack(kind: str, payload: bytes, name) -> pd.Series:
+    if kind == "pickle":
+        size = int.from_bytes(payload[-8:], "little")
+        return pickle.loads(pa.decompress(payload[:-8], decompressed_size=size, codec=CODEC, asbytes=True))
+    table = pa.ipc.open_stream(payload).read_all()
+    field = table.field(0)
+    if pa.types.is_dictionary(field.type):
+        values = pa.chunked_array([c.dictionary_decode() for c in table.column(0).chunks], field.type.value_type)
+        table = pa.Table.from_arrays([values], schema=pa.schema([field.with_type(field.type.value_type)],
+                                                                metadata=table.schema.metadata))
+    return table.to_pandas().iloc[:, 0].rename(name)
+
+def _remove_file(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+class CompressedFrame:
+    """
+    Read-only, column-compressed copy of a DataFrame. frame[col] / frame[[cols]] decompress
+    only those columns; head() is served from an uncompressed preview. Picklable, so a
+    worker process can build it next to the parser. spill() moves the compressed columns
+    to a temporary file; they are then read back one at a time.
+    """
+
+    def __init__(self, df: pd.DataFrame, preview_rows: int = PREVIEW_ROWS):
+        self.columns = df.columns
+        self.attrs = dict(df.attrs)
+        self._len = len(df)
+        # (kind, payload bytes), or (kind, (offset, length)) in the spill file
+        self._columns: List[Tuple[str, Any]] = [_pack(df.iloc[:, i]) for i in range(df.shape[1])]
+        self._preview = df.head(preview_rows).copy()
+        self._spill_path: Optional[str] = None
+        self.nbytes = sum(len(p) for _, p in self._columns) + int(self._preview.memory_usage(deep=True).sum())
+
+    def __len__(self) -> int:
+        return self._len
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self._len, len(self.columns)
+
+    @property
+    def empty(self) -> bool:
+        return self._len == 0 or len(self.columns) == 0
+
+    def head(self, n: int = 5) -> pd.DataFrame:
+        if n <= len(self._preview) or len(self._preview) == self._len:
+            return self._preview.head(n)
+        return self.to_pandas().head(n)
+
+    def _payload(self, pos: int) -> Tuple[str, bytes]:
+        kind, payload = self._columns[pos]
+        if isinstance(payload, tuple):
+            with open(self._spill_path, "rb") as fh:
+                fh.seek(payload[0])
+                payload = fh.read(payload[1])
+        return kind, payload
+
+    def _column(self, pos: int) -> pd.Series:
+        return _unpack(*self._payload(pos), self.columns[pos])
+
+    @property
+    def spilled(self) -> bool:
+        return self._spill_path is not None
+
+    def spill(self) -> None:
+        """Move the compressed columns to a temporary file (removed with the frame); the preview stays."""
+        if self.spilled:
+            return
+        fd, path = tempfile.mkstemp(prefix="royalty-", suffix=".cols")
+        spilled, offset = [], 0
+        with os.fdopen(fd, "wb") as fh:
+            for kind, payload in self._columns:
+                fh.write(payload)
+                spilled.append((kind, (offset, len(payload))))
+                offset += len(payload)
+        weakref.finalize(self, _remove_file, path)
+        self._spill_path = path
+        self._columns = spilled         # one assignment: readers see either list
+        self.nbytes = int(self._preview.memory_usage(deep=True).sum())
+
+    def __getstate__(self) -> dict:
+        # a spilled frame travels to worker processes with its columns inline
+        state = dict(self.__dict__)
+        state["_columns"] = [self._payload(pos) for pos in range(len(self._columns))]
+        state["_spill_path"] = None
+        return state
+
+    def items(self) -> Iterator[Tuple[Any, pd.Series]]:
+        """(name, column) pairs, decompressed one at a time."""
+        for pos, name in enumerate(self.columns):
+            yield name, self._column(pos)
+
+    def __getitem__(self, key):
+        if isinstance(key, list):
+            return self.to_pandas(key)
+        return self._column(self.columns.get_loc(key))
+
+    def buffers(self) -> Iterator[bytes]:
+        """Compressed column payloads (deterministic for the same content)."""
+        for pos in range(len(self._columns)):
+            yield self._payload(pos)[1]
+
+    def to_pandas(self, columns: Optional[list] = None) -> pd.DataFrame:
+        names = list(self.columns) if columns is None else list(columns)
+        out = pd.concat([self[name] for name in names], axis=1) if names else pd.DataFrame(index=range(self._len))
+        out.columns = pd.Index(names)
+        out.attrs.update(self.attrs)
+        return out
+
+# ── Idle release ─────────────────────────────────────────
+def idle_seconds() -> float:
+    return float(os.environ.get("ROYALTY_IDLE_MINUTES") or DEFAULT_IDLE_MINUTES) * 60
+
+class IdleRef:
+    """
+    Session handle to a large object that is released after idle_seconds() without get().
+    Released handles return None; the caller rebuilds the object (see dataset.get_normalized).
+    on_release runs when the last live handle with the same key is released (it frees what
+    the object was built from and shares with other sessions).
+    """
+    _live: "weakref.WeakSet[IdleRef]" = weakref.WeakSet()
+    _lock = threading.Lock()
+    _sweeper: Optional[threading.Thread] = None
+
+    def __init__(self, value: Any, key: Hashable = None, on_release: Optional[Callable[[], None]] = None):
+        self._value = value
+        self._used = time.monotonic()
+        self.key = key
+        self._on_release = on_release
+        with IdleRef._lock:
+            IdleRef._live.add(self)
+            if IdleRef._sweeper is None:
+                IdleRef._sweeper = threading.Thread(target=IdleRef._sweep, name="idle-release", daemon=True)
+                IdleRef._sweeper.start()
+
+    def get(self) -> Any:
+        self._used = time.monotonic()
+        return self._value
+
+    def release(self) -> None:
+        self._value = None
+        if self._on_release is not None and not IdleRef.in_use(self.key):
+            self._on_release()
+
+    @classmethod
+    def in_use(cls, key: Hashable) -> bool:
+        """Whether a live, not yet released handle holds an object under key."""
+        with cls._lock:
+            refs = list(cls._live)
+        return key is not None and any(ref.key == key and ref._value is not None for ref in refs)
+
+    @classmethod
+    def _sweep(cls) -> None:
+        while True:
+            timeout = idle_seconds()
+            time.sleep(min(60.0, max(timeout / 4, 1.0)))
+            now = time.monotonic()
+            with cls._lock:
+                refs = list(cls._live)
+            for ref in refs:
+                if ref._value is not None and now - ref._used > timeout:
+                    ref.release()
@@ -0,0 +1,213 @@
+import csv
+import hashlib
+import io
+import os
+import tempfile
+import threading
+import warnings
+import weakref
+from typing import Dict, List, Optional, Union
+
+import pandas as pd
+
+from analyzer.entities import resolve_entities
+from analyzer.jobs import get_job_manager
+from analyzer.storage import CompressedFrame, _remove_file
+from analyzer.validation import RpmHistogram, check_rows, coerced_count, empty_report
+
+# Text columns kept in the cube; every dashboard view is a sum over these groups
+CUBE_DIMS = (
+    "reporting_month", "platform", "country", "artist_name",
+    "release_title", "upc", "track_title", "isrc", "currency",
+    "sales_type", "content_type", "label_name",
+)
+MEASURES = ("quantity", "revenue")
+STREAM_CHUNK_ROWS = 250_000
+MERGE_EVERY_ROWS = 1_000_000        # fold pending partial cubes once they hold this many groups
+SAMPLE_ROWS = 1_000
+SPOOL_CHUNK_BYTES = 1 << 20         # upload → temporary file copy size
+_ENCODINGS = ("utf-8-sig", "utf-8", "cp1251", "latin-1")
+
+Source = Union[str, bytes]
+
+def _open(source: Source):
+    return open(source, "rb") if isinstance(source, str) else io.BytesIO(source)
+
+def sniff_csv_format(source: Source) -> tuple:
+    """(encoding, separator) detected from the head of the file."""
+    with _open(source) as fh:
+        head = fh.read(1 << 20)
+    text, encoding = None, "latin-1"
+    for enc in _ENCODINGS:
+        try:
+            text = head.decode(enc)
+            encoding = enc
+            break
+        except UnicodeDecodeError:
+            continue
+    if text is None:
+        text = head.decode("latin-1", errors="replace")
+    sample = "\n".join(text.splitlines()[:50])
+    try:
+        sep = csv.Sniffer().sniff(sample, delimiters=",;\t|").delimiter
+    except csv.Error:
+        sep = ","
+    return encoding, sep
+
+def read_sample(source: Source, rows: int = SAMPLE_ROWS) -> pd.DataFrame:
+    """First rows of a large CSV — used for preview and column mapping."""
+    encoding, sep = sniff_csv_format(source)
+    with _open(source) as fh:
+        return pd.read_csv(fh, sep=sep, encoding=encoding, nrows=rows, on_bad_lines="skip")
+
+def _fold(parts: List[pd.DataFrame], dims: List[str]) -> pd.DataFrame:
+    merged = pd.concat(parts, ignore_index=True)
+    return merged.groupby(dims, dropna=False, sort=False, as_index=False)[list(MEASURES)].sum()
+
+def _next_chunk(reader) -> tuple:
+    """(next chunk or None, malformed lines the parser skipped while reading it)."""
+    # the C parser only reports skipped lines as a ParserWarning per chunk
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always", pd.errors.ParserWarning)
+        chunk = next(reader, None)
+    skipped = sum(str(w.message).count("Skipping line") for w in caught
+                  if issubclass(w.category, pd.errors.ParserWarning))
+    return chunk, skipped
+
+def stream_cube(source: Source, mapping: Dict[str, str], job=None,
+                chunk_rows: int = STREAM_CHUNK_ROWS, report: Optional[dict] = None) -> pd.DataFrame:
+    """
+    Read a CSV in chunks and fold every chunk into running (quantity, revenue)
+    sums per combination of the mapped text columns. Raw rows are dropped after
+    each chunk, so peak memory follows the number of groups, not the file size.
+    The result has the canonical columns of a normalized dataset, so the
+    dashboard aggregations run on it unchanged.
+    report: counters from analyzer.validation.empty_report(), filled chunk by chunk
+    (duplicate rows are not checked in streaming mode); RPM outliers are counted after
+    the last chunk, against the medians of the whole file.
+    """
+    encoding, sep = sniff_csv_format(source)
+    header = read_sample(source, rows=0).columns
+    stripped = {str(c).strip(): c for c in header}
+    rename = {stripped[str(orig).strip()]: canon for canon, orig in mapping.items() if str(orig).strip() in stripped}
+    if "currency" not in rename.values() and "currency" in stripped:
+        rename[stripped["currency"]] = "currency"
+    dims = [c for c in CUBE_DIMS if c in rename.values()]
+    text_cols = [orig for orig, canon in rename.items() if canon in dims]
+
+    total = os.path.getsize(source) if isinstance(source, str) else len(source)
+    parts: List[pd.DataFrame] = []
+    pending_rows = 0
+    rpm = RpmHistogram()
+    with _open(source) as fh:
+        reader = pd.read_csv(
+            fh, sep=sep, encoding=encoding, usecols=list(rename), dtype={c: str for c in text_cols},
+            chunksize=chunk_rows, on_bad_lines="warn",
+        )
+        if report is not None:
+            report["duplicate_rows"] = None
+        while True:
+            chunk, skipped = _next_chunk(reader)
+            if chunk is None:
+                break
+            chunk = chunk.rename(columns=rename)
+            for col in MEASURES:
+                if report is not None and col in chunk.columns:
+                    report[f"coerced_{col}"] += coerced_count(chunk[col])
+                chunk[col] = pd.to_numeric(chunk[col], errors="coerce").fillna(0) if col in chunk.columns else 0
+            if report is not None:
+                report["skipped_lines"] += skipped
+                check_rows(report, chunk, rpm)
+            part = chunk.groupby(dims, dropna=False, sort=False, as_index=False)[list(MEASURES)].sum()
+            parts.append(part)
+            pending_rows += len(part)
+            if pending_rows > MERGE_EVERY_ROWS and len(parts) > 1:
+                parts = [_fold(parts, dims)]
+                pending_rows = 0        # only groups added after this fold count towards the next one
+            if job is not None:
+                job.update(0.05 + 0.85 * fh.tell() / max(total, 1), "Reading file in chunks…")
+    if report is not None:
+        report["rpm_outliers"] = rpm.outliers()
+
+    if not parts:
+        return pd.DataFrame(columns=dims + list(MEASURES))
+    return _fold(parts, dims) if len(parts) > 1 else parts[0]
+
+def read_cube(source: Source, mapping: Dict[str, str], job=None) -> tuple:
+    """(cube with resolved entities, data check) of a CSV — picklable, runs in a worker process."""
+    report = empty_report()
+    return resolve_entities(stream_cube(source, mapping, job=job, report=report)), report
+
+# ── Upload spooled to disk (streaming mode) ──────────────
+class StreamSource:
+    """
+    A large CSV upload written to a temporary file as it arrives, so its bytes are never
+    held in memory. The file is read once, into the cube of the confirmed mapping, and
+    deleted right after; the cube (compressed) and its data check stay with the source.
+    The file is also removed when the source is garbage-collected (session ended), and an
+    idle session moves the compressed cube to a temporary file as well (spill()).
+    """
+
+    def __init__(self):
+        fd, self.path = tempfile.mkstemp(prefix="royalty-", suffix=".csv")
+        self._fh = os.fdopen(fd, "wb")
+        self._hash = hashlib.blake2b(digest_size=16)
+        self._remove = weakref.finalize(self, _remove_file, self.path)
+        self._lock = threading.Lock()
+        self._cube: Optional[CompressedFrame] = None
+        self.size = 0
+        self.digest: Optional[str] = None       # same as dataset.content_digest() of the bytes
+        self.mapping: Optional[Dict[str, str]] = None
+        self.report: Optional[dict] = None
+
+    @classmethod
+    def from_file(cls, fileobj) -> "StreamSource":
+        """Copy a file-like upload (Streamlit UploadedFile) in chunks."""
+        source = cls()
+        fileobj.seek(0)
+        for chunk in iter(lambda: fileobj.read(SPOOL_CHUNK_BYTES), b""):
+            source.write(chunk)
+        return source.close()
+
+    def write(self, chunk: bytes) -> None:
+        self._fh.write(chunk)
+        self._hash.update(chunk)
+        self.size += len(chunk)
+
+    def close(self) -> "StreamSource":
+        self._fh.close()
+        self.digest = self._hash.hexdigest()
+        return self
+
+    def read_bytes(self) -> bytes:
+        with open(self.path, "rb") as fh:
+            return fh.read()
+
+    def discard(self) -> None:
+        """Delete the temporary file (idempotent)."""
+        self._fh.close()
+        self._remove()
+
+    def spill(self) -> None:
+        """Idle session: keep the built cube on disk until it is needed again."""
+        if self._cube is not None:
+            self._cube.spill()
+
+    def cube(self, mapping: Dict[str, str], job=None) -> pd.DataFrame:
+        """
+        Cube of the file for this mapping with resolved entities; the file is read on the
+        first call only, in a worker process. Its data check is left in .report. A file that
+        was already read (and deleted) cannot be read again with another mapping.
+        """
+        with self._lock:
+            if self._cube is None:
+                if not os.path.exists(self.path):
+                    raise ValueError("The uploaded file is no longer available. Please upload it again.")
+                cube, report = get_job_manager().run_in_process(job, read_cube, self.path, dict(mapping), progress=True)
+                self._cube, self.mapping, self.report = CompressedFrame(cube), dict(mapping), report
+                self.discard()
+                return cube
+            if self.mapping != dict(mapping):
+                raise ValueError("This large file was already read with another column mapping. "
+                                 "Please upload it again to change the mapping.")
+            return self._cube.to_pandas()
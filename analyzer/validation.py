@@ -0,0 +1,160 @@
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from analyzer.drill import column_codes
+from analyzer.entities import ENTITIES, _clean_codes, _valid_codes
+
+# ── Data quality checks (run once at ingestion) ──────────
+# Every check is a vectorized count over the rows (or over the distinct values of a
+# column), so the report costs a few column scans on top of normalization.
+NUMERIC_FIELDS = ("revenue", "quantity")
+RPM_OUTLIER_FACTOR = 100      # payout per 1K streams 100× above/below the platform's median
+RPM_MIN_ROWS = 20             # platforms with fewer priced rows are not checked
+RPM_BINS_PER_DECADE = 20      # resolution of the log-RPM histogram used for medians (~12%)
+RPM_LOG_RANGE = (-6.0, 9.0)   # log10 RPM values outside are clipped into the histogram
+
+# check → (title, explanation) in the order shown on the dashboard
+CHECKS = {
+    "skipped_lines":    ("Unreadable lines", "lines with the wrong number of fields were skipped while reading"),
+    "duplicate_rows":   ("Duplicate rows", "rows identical to an earlier row — they are counted twice in totals"),
+    "coerced_revenue":  ("Non-numeric revenue", "values that are not numbers were counted as 0"),
+    "coerced_quantity": ("Non-numeric streams", "values that are not numbers were counted as 0"),
+    "negative_revenue": ("Negative revenue", "rows with revenue below zero (refunds or corrections)"),
+    "invalid_isrc":     ("Invalid ISRC", "rows whose ISRC does not match the ISRC format; grouped by track title"),
+    "invalid_upc":      ("Invalid UPC", "rows whose UPC does not match the UPC/EAN format; grouped by release title"),
+    "rpm_outliers":     ("Implausible payout per 1K", f"rows paying over {RPM_OUTLIER_FACTOR}× more or less per stream "
+                                                      "than the platform's typical rate"),
+}
+
+def empty_report() -> Dict[str, Optional[int]]:
+    """Counters of every check (None = not checked for this dataset)."""
+    report: Dict[str, Optional[int]] = {"rows": 0}
+    report.update({check: 0 for check in CHECKS})
+    return report
+
+def coerced_count(s: pd.Series) -> int:
+    """Non-empty values that pd.to_numeric(errors='coerce') turns into NaN (checked once per distinct value)."""
+    if pd.api.types.is_numeric_dtype(s):
+        return 0
+    codes, uniques = pd.factorize(s)
+    values = pd.Series(uniques, dtype=object)
+    bad = pd.to_numeric(values, errors="coerce").isna() & values.astype(str).str.strip().ne("")
+    return int(np.bincount(codes[codes >= 0], minlength=len(values))[bad.to_numpy()].sum())
+
+def invalid_code_rows(df: pd.DataFrame, code_col: str) -> int:
+    """Rows whose ISRC/UPC is present but malformed (see analyzer.entities)."""
+    if code_col not in df.columns:
+        return 0
+    codes, uniques = column_codes(df, code_col)
+    cleaned = _clean_codes(pd.Series(uniques, dtype="string"), code_col)
+    bad = cleaned.notna() & ~_valid_codes(cleaned, code_col)
+    return int(np.bincount(codes[codes >= 0], minlength=len(uniques))[bad.to_numpy(bool)].sum())
+
+def _group_medians(hist: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """(median bin, row count) per group (row) of a 2-D histogram instead of a sort."""
+    cum = hist.cumsum(axis=1)
+    sizes = cum[:, -1]
+    return (cum >= ((sizes + 1) // 2)[:, None]).argmax(axis=1), sizes
+
+class RpmHistogram:
+    """
+    Log-RPM histogram per platform, added to frame by frame (the chunks of a streamed file).
+    Medians are taken over everything added, so every row is compared with its platform's
+    rate in the whole report. Half-bin resolution keeps the outlier threshold on a bin edge.
+    """
+    _LO = RPM_LOG_RANGE[0]
+    _HALF_BINS = 2 * (int((RPM_LOG_RANGE[1] - RPM_LOG_RANGE[0]) * RPM_BINS_PER_DECADE) + 1)
+
+    def __init__(self):
+        self.platforms: Dict[object, int] = {}      # platform (None = missing) → histogram row
+        self.hist = np.zeros((0, self._HALF_BINS), dtype=np.int64)
+
+    def _ids(self, values) -> np.ndarray:
+        return np.array([self.platforms.setdefault(v, len(self.platforms)) for v in values], dtype=np.int64)
+
+    def add(self, df: pd.DataFrame) -> "RpmHistogram":
+        q = df["quantity"].to_numpy("float64")
+        r = df["revenue"].to_numpy("float64")
+        priced = np.flatnonzero((q > 0) & (r > 0))
+        if len(priced) == 0:
+            return self
+        log_rpm = np.clip(np.log10(r[priced] * 1000 / q[priced]), *RPM_LOG_RANGE)
+        half = ((log_rpm - self._LO) * (2 * RPM_BINS_PER_DECADE)).astype(np.int64)
+        if "platform" in df.columns:
+            codes, uniques = column_codes(df, "platform")
+            groups = self._ids(list(uniques) + [None])[codes[priced]]     # code -1 → the missing platform
+        else:
+            groups = np.full(len(priced), self._ids([None])[0])
+        n = len(self.platforms)
+        if n > len(self.hist):
+            self.hist = np.vstack([self.hist, np.zeros((n - len(self.hist), self._HALF_BINS), dtype=np.int64)])
+        self.hist += np.bincount(groups * self._HALF_BINS + half, minlength=n * self._HALF_BINS).reshape(n, -1)
+        return self
+
+    def outliers(self) -> int:
+        """Rows RPM_OUTLIER_FACTOR× off the median of their platform (platforms with RPM_MIN_ROWS priced rows)."""
+        if not len(self.hist):
+            return 0
+        median_bin, sizes = _group_medians(self.hist.reshape(len(self.hist), -1, 2).sum(axis=2))
+        # distance of each half-bin's centre from the median bin's centre, in half-bins
+        offset = np.abs(np.arange(self._HALF_BINS) + 0.5 - (2 * median_bin + 1)[:, None])
+        off = offset > np.log10(RPM_OUTLIER_FACTOR) * 2 * RPM_BINS_PER_DECADE
+        return int((self.hist * off)[sizes >= RPM_MIN_ROWS].sum())
+
+def rpm_outlier_rows(df: pd.DataFrame) -> int:
+    """Rows whose payout per 1K streams is RPM_OUTLIER_FACTOR× off the median of their platform."""
+    return RpmHistogram().add(df).outliers()
+
+def duplicate_rows(raw_df: pd.DataFrame) -> int:
+    """Rows identical (in every column of the original file) to an earlier row."""
+    if raw_df.empty:
+        return 0
+    # one exact row id from the factorized columns (mixed radix, re-compressed before it overflows)
+    row_id, n_ids = np.zeros(len(raw_df), dtype=np.int64), 1
+    for _, values in raw_df.items():
+        codes, uniques = pd.factorize(values, use_na_sentinel=False)
+        if n_ids * len(uniques) >= 2**62:
+            row_id, ids = pd.factorize(row_id)
+            n_ids = len(ids)
+        row_id = row_id * len(uniques) + codes
+        n_ids *= max(len(uniques), 1)
+    return len(raw_df) - len(pd.unique(row_id))
+
+def check_rows(report: dict, df: pd.DataFrame, rpm: Optional[RpmHistogram] = None) -> dict:
+    """
+    Add the row-level checks of a normalized frame (or one chunk of a streamed file) to report.
+    rpm: histogram collecting the chunks of a streamed file; its outliers are counted once the
+    whole file is read (report["rpm_outliers"] = rpm.outliers()).
+    """
+    report["rows"] += len(df)
+    report["negative_revenue"] += int((df["revenue"].to_numpy("float64") < 0).sum()) if "revenue" in df.columns else 0
+    for code_col in ENTITIES:
+        report[f"invalid_{code_col}"] += invalid_code_rows(df, code_col)
+    if "quantity" in df.columns and "revenue" in df.columns:
+        if rpm is None:
+            report["rpm_outliers"] += rpm_outlier_rows(df)
+        else:
+            rpm.add(df)
+    return report
+
+def validate_dataset(raw_df, df: pd.DataFrame, mapping: Dict[str, str]) -> dict:
+    """
+    Data quality report of an uploaded file: raw_df as parsed, a DataFrame or a
+    CompressedFrame (skipped lines are in raw_df.attrs, see analyzer.ingest), and
+    df the normalized dataset built from it.
+    """
+    report = empty_report()
+    report["skipped_lines"] = raw_df.attrs.get("skipped_lines", 0)
+    raw_cols = {str(c).strip(): c for c in raw_df.columns}
+    for field in NUMERIC_FIELDS:
+        col = raw_cols.get(str(mapping.get(field, "")).strip())
+        if col is not None:
+            report[f"coerced_{field}"] = coerced_count(raw_df[col])
+    report["duplicate_rows"] = duplicate_rows(raw_df)
+    return check_rows(report, df)
+
+def quality_issues(report: dict) -> List[Tuple[str, int, str]]:
+    """(title, rows, explanation) of every check that found something."""
+    return [(title, int(report[check]), text) for check, (title, text) in CHECKS.items() if report.get(check)]
@@ -0,0 +1,130 @@
+import numpy as np
+import pandas as pd
+
+from analyzer.aggregate import (
+    MISSING_LABEL, _disambiguate_labels, _is_code_key, apply_filters, detect_currency_hint,
+    period_label_from_reporting_month, resolve_dim_keys, top3_labels_by_revenue, top_k,
+)
+from analyzer.backends import get_backend
+from analyzer.drill import column_codes, select_rows
+from analyzer.entities import ENTITIES, entity_labels, label_entities
+
+# ── KPI header ───────────────────────────────────────────
+def kpi_summary(df: pd.DataFrame) -> dict:
+    """Values for the KPI header of the Dashboard."""
+    # KPI by tracks: key only isrc or title (without track_id)
+    track_key = "isrc" if "isrc" in df.columns and df["isrc"].notna().any() else "track_title"
+    labels = entity_labels(df, track_key)
+    if labels is not None:
+        top_tracks = top3_labels_by_revenue(df, ENTITIES[track_key][0], ENTITIES[track_key][0], labels)
+    else:
+        top_tracks = top3_labels_by_revenue(df, track_key, "track_title")
+    return {
+        "period": period_label_from_reporting_month(df),
+        "streams": float(df["quantity"].sum()) if not df.empty else 0.0,
+        "revenue": float(df["revenue"].sum()) if not df.empty else 0.0,
+        "currency_hint": detect_currency_hint(df),
+        "top_platforms": top3_labels_by_revenue(df, "platform", "platform"),
+        "top_countries": top3_labels_by_revenue(df, "country", "country"),
+        "top_tracks": top_tracks,
+    }
+
+# ── Tab views (filters → labelled aggregate) ─────────────
+TABS = ["Platforms", "Countries", "Artists", "Releases", "Tracks"]
+
+def filter_options(df: pd.DataFrame, filters: tuple, col: str, rows: np.ndarray | None = None) -> list:
+    """Distinct values of col in the selected rows (rows: drill-down selection, None = all)."""
+    if col not in df.columns:
+        return []
+    if filters:
+        return sorted(apply_filters(select_rows(df, rows, [col] + [c for c, _ in filters]), filters)[col].dropna().unique().tolist())
+    codes, uniques = column_codes(df, col)
+    present = np.unique(codes if rows is None else codes[rows])
+    return sorted(uniques[present[present >= 0]].tolist())
+
+def tab_view(df: pd.DataFrame, tab_name: str, filters: tuple, rows: np.ndarray | None = None) -> dict | None:
+    """
+    Filtered, labelled aggregate for one tab (cached per dataset + selection).
+    rows: drill-down row selection from analyzer.drill (None = whole dataset).
+    """
+    backend = get_backend()
+    key_col, label_col, default_title = resolve_dim_keys(tab_name, df)
+    labels = entity_labels(df, key_col)
+    if labels is not None:
+        # resolved entities: group by the entity key, labels come from the dataset's lookup table
+        key_col = ENTITIES[key_col][0]
+        agg = backend.aggregate(df, key_col, key_col, filters, rows)
+        if agg.empty:
+            return None
+        agg = label_entities(agg, key_col, labels)
+    else:
+        # codes exist in the report but not in this slice → group by title
+        if _is_code_key(key_col) and not backend.any_notna(df, key_col, filters, rows):
+            key_col = label_col
+        agg = backend.aggregate(df, key_col, label_col, filters, rows)
+        if agg.empty:
+            return None
+        agg = _disambiguate_labels(agg, key_col, "label")
+    return {
+        "key_col": key_col, "label_col": label_col, "title": default_title, "agg": agg,
+        "streams": float(agg["quantity"].sum()), "revenue": float(agg["revenue"].sum()),
+    }
+
+def tab_top(df: pd.DataFrame, tab_name: str, metric_col: str, n: int,
+            rows: np.ndarray | None = None, min_quantity: float = 0) -> pd.DataFrame:
+    """
+    The n largest entries of a tab by metric_col (the chart), labelled as in tab_view.
+    Filter, group and rank run as one backend query (Backend.top_n).
+    """
+    backend = get_backend()
+    key_col, label_col, _ = resolve_dim_keys(tab_name, df)
+    labels = entity_labels(df, key_col)
+    if labels is not None:
+        key_col = ENTITIES[key_col][0]
+        top = backend.top_n(df, key_col, key_col, metric_col, n, (), min_quantity, rows)
+        # a title shared with an entity outside the top n still gets its code appended:
+        # label every entity of the selection (distinct keys only, from the cached codes)
+        codes, uniques = column_codes(df, key_col)
+        present = np.unique(codes if rows is None else codes[rows])
+        keys = pd.Series(uniques[present[present >= 0]], dtype="string")
+        if len(present) and present[0] < 0:
+            keys = pd.concat([keys, pd.Series([pd.NA], dtype="string")], ignore_index=True)
+        named = label_entities(pd.DataFrame({key_col: keys}), key_col, labels)
+        label = dict(zip(named[key_col].fillna(MISSING_LABEL), named["label"]))
+        return top.assign(label=top[key_col].astype("string").fillna(MISSING_LABEL).map(label).astype("string"))
+    if _is_code_key(key_col) and not backend.any_notna(df, key_col, (), rows):
+        key_col = label_col
+    if key_col != label_col:
+        # titles are disambiguated across the whole aggregate
+        agg = _disambiguate_labels(backend.aggregate(df, key_col, label_col, (), rows), key_col, "label")
+        return top_k(agg, metric_col, n, min_quantity).reset_index(drop=True)
+    return backend.top_n(df, key_col, label_col, metric_col, n, (), min_quantity, rows)
+
+# ── Segments (sales type, content type, label) ───────────
+# Optional dimensions from the mapping. Filtering by a segment is a drill step like
+# platform/country (factorized codes, see analyzer.drill); segments with few values
+# also get every tab pre-built per value at ingestion (analyzer.dataset).
+SEGMENT_DIMS = ("sales_type", "content_type", "label_name")
+SEGMENT_SLICE_MAX = 8           # pre-build tab slices only for segments with at most this many values
+
+def segment_columns(df: pd.DataFrame) -> list:
+    """Segment dimensions mapped in this dataset that have at least one value."""
+    return [col for col in SEGMENT_DIMS if col in df.columns and df[col].notna().any()]
+
+def segment_summary(df: pd.DataFrame, col: str, rows: np.ndarray | None = None) -> pd.DataFrame:
+    """Streams, earnings and value per 1K streams for every value of a segment (largest earnings first)."""
+    codes, uniques = column_codes(df, col)
+    q = df["quantity"].to_numpy(np.float64)
+    r = df["revenue"].to_numpy(np.float64)
+    if rows is not None:
+        codes, q, r = codes[rows], q[rows], r[rows]
+    keep = codes >= 0
+    n = len(uniques)
+    out = pd.DataFrame({
+        col: np.asarray(uniques, dtype=object),
+        "quantity": np.bincount(codes[keep], weights=q[keep], minlength=n),
+        "revenue": np.bincount(codes[keep], weights=r[keep], minlength=n),
+    })[np.bincount(codes[keep], minlength=n) > 0]
+    qs, rs = out["quantity"].to_numpy(), out["revenue"].to_numpy()
+    out["rpm"] = np.divide(rs * 1000, qs, out=np.zeros_like(rs), where=qs > 0)
+    return out.sort_values("revenue", ascending=False, kind="stable").reset_index(drop=True)
@@ -1,7 +1,16 @@
 import streamlit as st
 import pandas as pd
 
+from analyzer.dataset import content_digest, prepare_in_background
+from analyzer.ingest import APP_MAX_SIZE, parse_upload, sample_upload, upload_mode
+from analyzer.jobs import get_job_manager
+from analyzer.mapping import REQUIRED_FIELDS, get_mapping_store, mapping_fits
+from analyzer.startup import prewarm
+from analyzer.storage import PREVIEW_ROWS, CompressedFrame
+from analyzer.streaming import StreamSource
+
 st.set_page_config(page_title="Streaming Analytics", layout="wide")
+prewarm()   # once per server process: warms the dashboard while the user picks a file
 
 # Apply custom CSS to reduce the top whitespace (make it consistent with Dashboard page)
 st.markdown("""
@@ -62,26 +71,15 @@ if "uploaded_file_name" not in st.session_state:
 if "uploaded_signature" not in st.session_state:
     st.session_state["uploaded_signature"] = None  # (name, size)
 
-# --- Robust CSV reader ---
-def robust_read_csv(file):
-    """CSV reader with auto-separator and encoding fallback"""
-    try:
-        file.seek(0)
-        return pd.read_csv(file, sep=None, engine="python", encoding="utf-8", on_bad_lines="skip")
-    except Exception:
-        pass
-
-    encodings = ["utf-8-sig", "utf-8", "cp1251", "latin-1"]
-    seps = [",", ";", "\t", "|"]
-    for enc in encodings:
-        for sep in seps:
-            try:
-                file.seek(0)
-                return pd.read_csv(file, sep=sep, engine="python", encoding=enc, on_bad_lines="skip")
-            except Exception:
-                continue
-
-    raise ValueError("Could not parse CSV: try another delimiter/encoding.")
+# --- Background job progress (polls without rerunning the whole page) ---
+@st.fragment(run_every=0.5)
+def job_progress(job_key: str):
+    job = st.session_state.get(job_key)
+    if job is None or job.done:
+        st.rerun()
+    st.progress(job.progress, text=job.message)
+    if st.button("Cancel", key=f"{job_key}_cancel"):
+        job.cancel()
 
 # --- Upload UI ---
 st.header("Upload report file")
@@ -92,46 +90,107 @@ uploaded = st.file_uploader(
     label_visibility="collapsed"   
 )
 
-MAX_SIZE = 200 * 1024 * 1024  # 200 MB limit
-ALLOWED_EXT = (".csv", ".xlsx")
-
 if uploaded:
     try:
-        # --- Size check ---
-        if getattr(uploaded, "size", None) and uploaded.size > MAX_SIZE:
-            st.error("❌ File too large. Maximum allowed size is 200 MB.")
-            st.stop()
-
-        # --- Extension check ---
+        # --- Extension and size check ---
         name = (uploaded.name or "").lower()
-        if not name.endswith(ALLOWED_EXT):
+        size = getattr(uploaded, "size", None) or 0
+        mode = upload_mode(name, size, APP_MAX_SIZE)
+        if mode == "unsupported":
             st.error("❌ Unsupported file type. Please upload a .csv or .xlsx file.")
             st.stop()
+        if mode == "too_large":
+            st.error("❌ File too large. Maximum allowed size is 200 MB. Larger CSV statements can be "
+                     "loaded through the HTTP API, which streams them to disk (see README).")
+            st.stop()
+        stream_mode = mode == "stream"
 
         current_signature = (uploaded.name, getattr(uploaded, "size", None))
 
-        # Reset session state if a new file is uploaded
+        # New file: reset session state and parse it in a worker process
+        # (identical statements opened by several people are parsed once per server)
         if st.session_state.get("uploaded_signature") != current_signature:
-            for key in ("mapped_fields", "mapping", "df_norm"):
+            previous = st.session_state.get("stream_source")
+            if isinstance(previous, StreamSource):
+                previous.discard()
+            for key in ("df", "mapped_fields", "mapping", "df_norm", "df_norm_mapping", "profile_applied",
+                        "dataset_digest", "dataset_key", "stream_source", "upload_error"):
                 st.session_state.pop(key, None)
+            if stream_mode:
+                # the file goes to a temporary file (deleted once its cube is built) and only the
+                # first rows are parsed now; the dashboard reads the file chunk by chunk. Streamlit
+                # already holds the upload in memory (at most APP_MAX_SIZE) — larger statements go
+                # through the HTTP API, which spools the request body as it arrives
+                source = StreamSource.from_file(uploaded)
+                digest = source.digest
+                st.session_state["stream_source"] = source
+                st.session_state["upload_job"] = get_job_manager().submit("sample", sample_upload, source)
+            else:
+                data = uploaded.getvalue()
+                digest = content_digest(data)
+                st.session_state["upload_job"] = get_job_manager().submit("parse", parse_upload, data, name, digest)
+            st.session_state["dataset_digest"] = digest
+            st.session_state["uploaded_file_name"] = uploaded.name
+            st.session_state["uploaded_signature"] = current_signature
+
+        job = st.session_state.get("upload_job")
+        if job is not None:
+            if not job.done:
+                job_progress("upload_job")
+                st.stop()
+            st.session_state.pop("upload_job")
+            if job.status == "failed":
+                # kept until the user uploads another file or retries (not just this run)
+                st.session_state["upload_error"] = job.message
+            if job.status == "done":
+                df = job.result
+                st.session_state["df"] = df
+
+                # Known header layout whose values still fit → apply the saved mapping and start normalizing
+                profile = get_mapping_store().lookup(df.columns)
+                if (profile is not None and all(k in profile for k in REQUIRED_FIELDS)
+                        and mapping_fits(df.head(PREVIEW_ROWS), profile)):
+                    st.session_state["mapped_fields"] = profile
+                    st.session_state["mapping"] = profile
+                    st.session_state["df_norm"] = prepare_in_background(
+                        df, profile, st.session_state["dataset_digest"], st.session_state.get("stream_source"))
+                    st.session_state["df_norm_mapping"] = profile
+                    st.session_state["profile_applied"] = True
+
+        error = st.session_state.get("upload_error")
+        if error:
+            st.error(f"❌ Failed to read file: {error}  \nPlease upload a valid UTF-8 CSV or .xlsx.")
+            if st.button("Try again"):
+                st.session_state.pop("upload_error", None)
+                st.session_state["uploaded_signature"] = None
+                st.rerun()
+            st.stop()
 
-        # Try to read the file
-        if name.endswith(".csv"):
-            df = robust_read_csv(uploaded)
-        else:
-            uploaded.seek(0)
-            df = pd.read_excel(uploaded)
-
-        st.session_state["df"] = df
-        st.session_state["uploaded_file_name"] = uploaded.name
-        st.session_state["uploaded_signature"] = current_signature
+        df = st.session_state.get("df")
+        if not isinstance(df, (pd.DataFrame, CompressedFrame)):
+            st.info("Upload cancelled.")
+            if st.button("Load file again"):
+                st.session_state["uploaded_signature"] = None
+                st.rerun()
+            st.stop()
 
         st.success("✅ File successfully loaded")
+        if st.session_state.get("stream_source") is not None:
+            st.info("📦 Large file — streaming mode: the dashboard is built from running totals "
+                    "while the file is read in chunks, so rows are never loaded all at once. "
+                    "The preview and column check use the first rows.")
 
         # Show preview
         st.dataframe(df.head(5), use_container_width=True)
 
-        if st.button("Continue", type="primary"):
+        if st.session_state.get("profile_applied"):
+            st.info("🔁 Known report layout — your saved column mapping was applied.")
+            c1, c2 = st.columns([1, 1])
+            if c1.button("Review columns", use_container_width=True):
+                st.switch_page("pages/1_📊_Overview.py")
+            if c2.button("Go to dashboard", type="primary", use_container_width=True):
+                st.switch_page("pages/2_📈_Dashboard.py")
+        elif st.button("Continue", type="primary"):
             st.switch_page("pages/1_📊_Overview.py")
 
     except Exception:
@@ -141,8 +200,8 @@ else:
 
 # --- Short privacy note under uploader ---
 st.caption(
-    "🔒 Uploaded files are processed in memory only during your session, "
-    "never stored on disk, not shared with third parties, and automatically discarded when the session ends. [Read full Privacy Policy](https://github.com/eugkoos/streaming-royalty-analyzer/blob/main/PRIVACY.md)"
+    "🔒 Uploaded files are processed in memory only during your session (very large CSVs are spooled to a "
+    "temporary file until they are read), never stored, not shared with third parties, and automatically discarded when the session ends. [Read full Privacy Policy](https://github.com/eugkoos/streaming-royalty-analyzer/blob/main/PRIVACY.md)"
 )
 # --- Outro text ---
 st.markdown(
@@ -0,0 +1,194 @@
+"""
+The dashboard's aggregation code before any optimization (baseline commit e165491,
+pages/2_📈_Dashboard.py), kept verbatim as the source of the golden outputs in
+benchmarks/regression.py. Only what produces numbers is copied — the page's data
+preparation, its sequential tab filters, the chart ranking and the KPI header; the
+Streamlit calls around them are left out. Do not optimize this file.
+"""
+from typing import List, Tuple
+
+import pandas as pd
+
+# ── Aggregation helpers (verbatim) ───────────────────────
+CODE_KEYS = {"isrc", "upc"}                 # only codes (without *_id)
+MISSING_LABEL = "NaN"                       # label for empty code
+DISAMBIG_MODE = "full"                      # "full" - show full code; "tail"  only tail
+DISAMBIG_TAIL_LEN = 6
+RPM_MIN_STREAMS = 1000
+
+def _is_code_key(name: str) -> bool:
+    return str(name).lower() in CODE_KEYS
+
+def _normalize_code_series(s: pd.Series) -> pd.Series:
+    # keep true missing values, empty strings -> <NA>
+    s = pd.Series(s, dtype="string")
+    s = s.str.strip().str.upper().str.replace(r"[^A-Z0-9]", "", regex=True)
+    s = s.replace("", pd.NA)
+    return s
+
+def resolve_dim_keys(analysis_type: str, frame: pd.DataFrame) -> Tuple[str, str, str]:
+    if analysis_type == "Platforms": return "platform", "platform", "Top Platforms"
+    if analysis_type == "Countries": return "country", "country", "Top Countries"
+    if analysis_type == "Artists":   return "artist_name", "artist_name", "Top Artists"
+    if analysis_type == "Releases":
+        if "upc" in frame.columns and frame["upc"].notna().any():
+            return "upc", "release_title", "Top Releases"
+        return "release_title", "release_title", "Top Releases"
+    # Tracks
+    if "isrc" in frame.columns and frame["isrc"].notna().any():
+        return "isrc", "track_title", "Top Tracks"
+    return "track_title", "track_title", "Top Tracks"
+
+def aggregate_with_labels(df_src: pd.DataFrame, key_col: str, label_col: str) -> pd.DataFrame:
+    if key_col not in df_src.columns: key_col = label_col
+    tmp = df_src.copy()
+    group_key = key_col
+
+    # code key → normalize and group with dropna=False (to keep NaN group)
+    if _is_code_key(key_col):
+        tmp["_key_norm"] = _normalize_code_series(tmp[key_col])
+        group_key = "_key_norm"
+
+    agg = tmp.groupby(group_key, dropna=False, as_index=False).agg(
+        quantity=('quantity','sum'),
+        revenue=('revenue','sum')
+    )
+    if group_key != key_col:
+        agg = agg.rename(columns={group_key: key_col})
+
+    # labels
+    if key_col == label_col or label_col not in tmp.columns:
+        agg["label"] = agg[key_col].astype("string").fillna(MISSING_LABEL)
+    else:
+        labels = tmp[[group_key, label_col]].copy()
+        if group_key != key_col:
+            labels = labels.rename(columns={group_key: key_col})
+        labels = (
+            labels
+            .dropna(subset=[key_col, label_col])
+            .drop_duplicates(subset=[key_col])
+            .rename(columns={label_col: "label"})
+        )
+        agg = agg.merge(labels, on=key_col, how="left")
+        agg["label"] = agg["label"].astype("string")
+        agg.loc[agg["label"].isna(), "label"] = agg[key_col].astype("string")
+        agg["label"] = agg["label"].fillna(MISSING_LABEL)
+
+    # rpm
+    agg["rpm"] = agg.apply(lambda r: (r["revenue"]/r["quantity"]*1000) if r["quantity"] > 0 else 0, axis=1)
+    return agg
+
+def top3_labels_by_revenue(frame: pd.DataFrame, key_col: str, label_col: str) -> List[str]:
+    if key_col not in frame.columns: key_col = label_col
+    tmp = frame.copy()
+    group_key = key_col
+
+    if _is_code_key(key_col):
+        tmp["_key_norm"] = _normalize_code_series(tmp[key_col])
+        group_key = "_key_norm"
+
+    agg = tmp.groupby(group_key, dropna=False, as_index=False).agg(revenue=('revenue','sum'))
+    if agg.empty: return []
+
+    total = float(agg["revenue"].sum()) or 1.0
+
+    if key_col == label_col or label_col not in tmp.columns:
+        agg["label"] = agg[group_key].astype("string").fillna(MISSING_LABEL)
+    else:
+        labels = (
+            tmp[[group_key, label_col]]
+            .dropna(subset=[group_key, label_col])
+            .drop_duplicates(subset=[group_key])
+            .rename(columns={label_col: "label"})
+        )
+        agg = agg.merge(labels, on=group_key, how="left")
+        agg["label"] = agg["label"].astype("string")
+        agg.loc[agg["label"].isna(), "label"] = agg[group_key].astype("string")
+        agg["label"] = agg["label"].fillna(MISSING_LABEL)
+
+    agg = agg.sort_values("revenue", ascending=False).head(3)
+    return [f'{row["label"]} ({row["revenue"]/total:.0%})' for _, row in agg.iterrows()]
+
+def _disambiguate_labels(frame: pd.DataFrame, key_col: str, label_col: str = "label") -> pd.DataFrame:
+    df2 = frame.copy()
+    if key_col not in df2.columns or label_col not in df2.columns: return df2
+    dup_mask = df2[label_col].astype("string").duplicated(keep=False)
+    if dup_mask.any():
+        raw = df2[key_col].astype("string")
+        clean = raw.fillna("").str.replace(r"[^A-Za-z0-9]", "", regex=True).str.upper()
+        if DISAMBIG_MODE == "full":
+            code_show = clean
+        else:
+            code_show = clean.str[-max(1, int(DISAMBIG_TAIL_LEN)):]
+        # add tail only where key is not empty
+        add_mask = dup_mask & raw.notna() & (clean != "")
+        df2.loc[add_mask, label_col] = df2.loc[add_mask, label_col].astype("string") + " • " + code_show[add_mask]
+    return df2
+
+# ── Report-level helpers (verbatim) ──────────────────────
+def period_label_from_reporting_month(frame: pd.DataFrame) -> str:
+    if "reporting_month" not in frame.columns:
+        return "—"
+    ser = pd.to_datetime(frame["reporting_month"], errors="coerce").dropna()
+    if ser.empty:
+        return "—"
+    start, end = ser.min(), ser.max()
+    fmt = "%m.%Y"
+    return start.strftime(fmt) if start.to_period("M") == end.to_period("M") else f"{start.strftime(fmt)}–{end.strftime(fmt)}"
+
+def detect_currency_hint(frame: pd.DataFrame) -> str:
+    if "currency" in frame.columns:
+        vals = [str(x).upper() for x in frame["currency"].dropna().unique().tolist()]
+        if len(vals) == 1: return f"currency: {vals[0]}"
+        elif len(vals) > 1:
+            preview = ", ".join(sorted(vals[:3])); suffix = "…" if len(vals) > 3 else ""
+            return f"mixed currencies ({preview}{suffix})"
+    return "in report currency (e.g., $ € £)"
+
+
+# ── The page around them ─────────────────────────────────
+def prepare(raw_df: pd.DataFrame, mapping: dict) -> pd.DataFrame:
+    """The page's guard: canonical column names, numeric revenue/quantity."""
+    df = raw_df.copy()
+    df.columns = df.columns.map(lambda c: str(c).strip())
+    rename_map = {orig: canon for canon, orig in mapping.items() if orig in df.columns}
+    df = df.rename(columns=rename_map)
+
+    for col in ("revenue", "quantity"):
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0)
+    return df
+
+def kpi_summary(df: pd.DataFrame) -> dict:
+    """The KPI header, in the layout of analyzer.views.kpi_summary."""
+    _track_key_for_kpi = "isrc" if "isrc" in df.columns and df["isrc"].notna().any() else "track_title"
+    return {
+        "period": period_label_from_reporting_month(df),
+        "streams": float(df["quantity"].sum()) if not df.empty else 0.0,
+        "revenue": float(df["revenue"].sum()) if not df.empty else 0.0,
+        "currency_hint": detect_currency_hint(df),
+        "top_platforms": top3_labels_by_revenue(df, "platform", "platform"),
+        "top_countries": top3_labels_by_revenue(df, "country", "country"),
+        "top_tracks": top3_labels_by_revenue(df, _track_key_for_kpi, "track_title"),
+    }
+
+def tab_view(df: pd.DataFrame, tab_name: str, filters: tuple) -> dict | None:
+    """render_tab up to the chart: filters one after another, then the labelled aggregate and totals."""
+    df_filt = df
+    for col, value in filters:
+        if col in df_filt.columns:
+            df_filt = df_filt[df_filt[col] == value]
+    if df_filt.empty:
+        return None
+    key_col, label_col, _ = resolve_dim_keys(tab_name, df_filt)
+    agg = aggregate_with_labels(df_filt, key_col, label_col)
+    agg = _disambiguate_labels(agg, key_col, "label")
+    return {"key_col": key_col if key_col in df_filt.columns else label_col, "agg": agg,
+            "streams": float(df_filt["quantity"].sum()), "revenue": float(df_filt["revenue"].sum())}
+
+def top_index(agg: pd.DataFrame, metric_col: str, top_n: int) -> pd.Index:
+    """Rows of the chart, as make_top_barplot ranks them."""
+    data = agg.assign(metric_value=agg[metric_col])
+    if metric_col == "rpm":
+        data = data[data["quantity"] >= RPM_MIN_STREAMS]
+    return data.sort_values("metric_value", ascending=False).head(top_n).index
@@ -0,0 +1,47 @@
+"""
+pandas vs Polars vs DuckDB on the dashboard's filter → group → top-n path.
+
+    python -m benchmarks.bench_backends --rows 5000000
+"""
+import argparse
+import time
+
+from analyzer.backends import available_backends, get_backend
+from analyzer.dataset import normalize_dataset
+from benchmarks.synthetic import MAPPING, make_report
+
+QUERIES = [
+    ("platform", "platform", ()),
+    ("isrc", "track_title", ()),
+    ("isrc", "track_title", (("platform", "Spotify"),)),
+    ("country", "country", (("platform", "Apple Music"),)),
+]
+
+def _best(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t)
+    return min(times)
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=2_000_000)
+    ap.add_argument("--top", type=int, default=10)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    df = normalize_dataset(make_report(args.rows), MAPPING)
+    print(f"{args.rows:,} rows; backends: {', '.join(available_backends())}")
+    for name in available_backends():
+        backend = get_backend(name)
+        t = time.perf_counter()
+        backend.aggregate(df, "platform", "platform")          # includes the one-off conversion
+        first = time.perf_counter() - t
+        print(f"\n{name}  (first call {first:.3f}s)")
+        for key_col, label_col, filters in QUERIES:
+            full = _best(lambda: backend.aggregate(df, key_col, label_col, filters), args.repeat)
+            top = _best(lambda: backend.top_n(df, key_col, label_col, "revenue", args.top, filters), args.repeat)
+            where = ", ".join(f"{c}={v}" for c, v in filters) or "—"
+            print(f"  {key_col:<10} {where:<24} aggregate {full:7.3f}s   top-{args.top} {top:7.3f}s")
@@ -0,0 +1,34 @@
+"""
+Full-report workbook: one shared aggregation pass vs five separate tab views.
+
+    python -m benchmarks.bench_export --rows 10000000
+"""
+import argparse
+import time
+
+from analyzer.dataset import normalize_dataset
+from analyzer.export import build_workbook, dimension_sums
+from analyzer.views import TABS, tab_view
+from benchmarks.synthetic import MAPPING, make_report
+
+def _timed(fn):
+    t = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - t
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=2_000_000)
+    args = ap.parse_args()
+
+    df = normalize_dataset(make_report(args.rows), MAPPING)
+    dimension_sums(df)      # per-dataset column codes and entity labels, shared by both paths
+    _, one = _timed(lambda: tab_view(df, "Tracks", ()))
+    _, five = _timed(lambda: [tab_view(df, tab, ()) for tab in TABS])
+    sheets, shared = _timed(lambda: dimension_sums(df))
+    data, total = _timed(lambda: build_workbook(df))
+    print(f"{args.rows:,} rows; sheet sizes: " + ", ".join(f"{k} {len(v):,}" for k, v in sheets.items()))
+    print(f"one tab view (Tracks)       {one:7.3f}s")
+    print(f"five tab views              {five:7.3f}s")
+    print(f"shared pass, all sheets     {shared:7.3f}s")
+    print(f"workbook incl. XLSX writing {total:7.3f}s   ({len(data) / 2**20:.1f} MB)")
@@ -0,0 +1,89 @@
+"""
+Serial pandas groupby vs partitioned process-pool sums on a synthetic report, and end to
+end what the dashboard runs on top of them (aggregate_with_labels and the Tracks tab view:
+normalization, labels and RPM included).
+
+    python -m benchmarks.bench_parallel --rows 20000000 --workers 1 2 4 8 16 32
+    python -m benchmarks.bench_parallel --rows 2000000 --tracks 500000
+"""
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from analyzer import aggregate, backends, jobs
+from analyzer.aggregate import aggregate_with_labels
+from analyzer.dataset import normalize_dataset
+from analyzer.drill import column_codes
+from analyzer.parallel import parallel_group_sums, partitioned_sums, sorted_codes
+from analyzer.views import tab_view
+from benchmarks.synthetic import MAPPING, make_report
+
+def _best(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t)
+    return min(times)
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=5_000_000)
+    ap.add_argument("--key", default="isrc")
+    ap.add_argument("--tracks", type=int, default=50_000)
+    ap.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    df = normalize_dataset(make_report(args.rows, tracks=args.tracks), MAPPING)
+    codes, uniques = pd.factorize(df[args.key], sort=True, use_na_sentinel=False)
+    values = [df["quantity"].to_numpy("float64"), df["revenue"].to_numpy("float64")]
+    print(f"{args.rows:,} rows, {len(uniques):,} groups on {args.key!r}")
+
+    serial = _best(lambda: df.groupby(args.key, dropna=False).agg(quantity=("quantity", "sum"), revenue=("revenue", "sum")), args.repeat)
+    print(f"pandas groupby (1 core)     {serial:8.3f}s")
+    # parent-side work before the workers start: hashing the keys vs recoding the dataset's cached codes
+    cached = column_codes(df, args.key)
+    factorize = _best(lambda: pd.factorize(df[args.key], sort=True, use_na_sentinel=False), args.repeat)
+    recode = _best(lambda: sorted_codes(*cached, False), args.repeat)
+    print(f"factorize(sort=True)        {factorize:8.3f}s")
+    print(f"cached codes → sorted codes {recode:8.3f}s")
+    sums = {"quantity": df["quantity"], "revenue": df["revenue"]}
+    base = None
+    for w in args.workers:
+        with ProcessPoolExecutor(max_workers=w) as pool:
+            partitioned_sums(codes, len(uniques), values, pool)   # warm the workers
+            t = _best(lambda: partitioned_sums(codes, len(uniques), values, pool), args.repeat)
+            full = _best(lambda: parallel_group_sums(df[args.key], sums, False, pool), args.repeat)
+            reuse = _best(lambda: parallel_group_sums(df[args.key], sums, False, pool, cached), args.repeat)
+        base = base or t
+        print(f"partitioned sums, {w:>2} workers {t:8.3f}s   speed-up x{base / t:4.1f}   "
+              f"(end to end: factorizing {full:.3f}s, cached codes {reuse:.3f}s)")
+
+    # end to end: the serial path (parallel threshold out of reach) vs the job manager's pool of w workers
+    label_col = {"isrc": "track_title", "upc": "release_title"}.get(args.key, args.key)
+    dashboard = {
+        "aggregate_with_labels": lambda: aggregate_with_labels(df, args.key, label_col, cached),
+        "tab_view(Tracks)": lambda: tab_view(df, "Tracks", ()),
+    }
+    threshold = aggregate.PARALLEL_MIN_ROWS
+    aggregate.PARALLEL_MIN_ROWS = backends.PARALLEL_MIN_ROWS = len(df) + 1
+    try:
+        for fn in dashboard.values():
+            fn()                                                # the dataset's cached codes and entity labels
+        serial = {name: _best(fn, args.repeat) for name, fn in dashboard.items()}
+    finally:
+        aggregate.PARALLEL_MIN_ROWS = backends.PARALLEL_MIN_ROWS = threshold
+    print("  ".join(f"{name} serial {t:.3f}s" for name, t in serial.items()))
+    for w in args.workers:
+        jobs._MANAGER = jobs.JobManager(1, w)
+        try:
+            for fn in dashboard.values():
+                fn()                                            # warm the workers
+            times = {name: _best(fn, args.repeat) for name, fn in dashboard.items()}
+        finally:
+            jobs._MANAGER.process_pool.shutdown()
+            jobs._MANAGER = None
+        print(f"{w:>2} workers  " + "  ".join(f"{name} {t:.3f}s (x{serial[name] / t:4.1f})" for name, t in times.items()))
@@ -0,0 +1,121 @@
+"""
+Cold-start benchmark: first page runs of a freshly started Streamlit server.
+
+For each setting of ROYALTY_PREWARM it starts a new `streamlit run app.py`, then one
+browser session opens the upload page, waits like a user picking a file, uploads a small
+report and goes through the mapping page to the dashboard. A second session on the same
+server repeats the visit warm. A fresh interpreter also times each page's module imports.
+
+    python -m benchmarks.cold_start
+    python -m benchmarks.cold_start --repeats 5 --pick 3 --rows 20000
+"""
+import argparse
+import ast
+import asyncio
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+from benchmarks.load_test import DEFAULT_PORT, ROOT, BrowserSession, _descendants, start_server
+from benchmarks.synthetic import make_report
+
+PAGES = ["app.py", "pages/1_📊_Overview.py", "pages/2_📈_Dashboard.py"]
+STEPS = ["server", "upload page", "upload", "mapping page", "dashboard"]
+
+# ── Imports of each page in a fresh interpreter ──────────
+def page_imports(page: str) -> str:
+    """The page's top-level import statements as one script."""
+    tree = ast.parse((ROOT / page).read_text(encoding="utf-8"))
+    return "\n".join(ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom)))
+
+def import_seconds(page: str) -> float:
+    code = f"import time\nt = time.perf_counter()\n{page_imports(page)}\nprint(time.perf_counter() - t)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+# ── First visit on a new server ──────────────────────────
+async def visit(url: str, name: str, data: bytes, pick: float) -> Dict[str, float]:
+    """Seconds per step of one session: upload page, upload, mapping page, dashboard."""
+    out = {}
+    s = BrowserSession(url)
+    await s.connect()
+    try:
+        t = time.perf_counter()
+        await s.rerun([], lambda: s.has(""))
+        out["upload page"] = time.perf_counter() - t
+        await asyncio.sleep(pick)           # the user choosing a file
+        loaded = lambda: s.has("Continue") or s.has("Review columns")
+        t = time.perf_counter()
+        await s.upload("", name, data, loaded)
+        out["upload"] = time.perf_counter() - t
+        t = time.perf_counter()
+        await s.click("Continue" if s.has("Continue") else "Review columns", lambda: s.has("Go to dashboard"))
+        out["mapping page"] = time.perf_counter() - t
+        t = time.perf_counter()
+        await s.click("Go to dashboard", lambda: s.has("Platforms__metric"))
+        out["dashboard"] = time.perf_counter() - t
+    finally:
+        await s.close()
+    return out
+
+def cold_run(port: int, prewarm: bool, name: str, data: bytes, pick: float) -> tuple:
+    """(first session, second session) step timings on a newly started server."""
+    env = {"ROYALTY_PREWARM": "1" if prewarm else "0",
+           "ROYALTY_ANALYZER_HOME": tempfile.mkdtemp(prefix="royalty_cold_")}
+    t = time.perf_counter()
+    server = start_server(port, env)
+    started = time.perf_counter() - t
+    try:
+        first = asyncio.run(visit(f"http://127.0.0.1:{port}", name, data, pick))
+        second = asyncio.run(visit(f"http://127.0.0.1:{port}", name, data, pick))
+    finally:
+        workers = _descendants(server.pid)[1:]
+        server.terminate()
+        server.wait()
+        for pid in workers:     # the next server must start without warm workers around
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+    return {"server": started, **first}, second
+
+def _row(label: str, runs: List[Dict[str, float]]) -> str:
+    cells = []
+    for step in STEPS:
+        values = [r[step] for r in runs if step in r]
+        cells.append(f"{statistics.median(values) * 1000:12.0f}" if values else f"{'—':>12}")
+    return f"{label:<22}" + "".join(cells)
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Measure first page runs of a freshly started server.")
+    ap.add_argument("--repeats", type=int, default=3, help="fresh servers per setting (medians are shown)")
+    ap.add_argument("--rows", type=int, default=20_000, help="rows of the uploaded synthetic report")
+    ap.add_argument("--pick", type=float, default=2.0, help="seconds between opening the page and uploading")
+    ap.add_argument("--port", type=int, default=DEFAULT_PORT)
+    args = ap.parse_args()
+
+    print("Module imports per page (fresh interpreter, ms):")
+    for page in PAGES:
+        print(f"  {page:<28}{statistics.median(import_seconds(page) for _ in range(args.repeats)) * 1000:8.0f}")
+
+    report = make_report(args.rows, tracks=2_000)
+    name, data = "synthetic.csv", report.to_csv(index=False).encode("utf-8")
+    runs: Dict[str, List[Dict[str, float]]] = defaultdict(list)
+    for _ in range(args.repeats):
+        for prewarm in (False, True):
+            first, second = cold_run(args.port, prewarm, name, data, args.pick)
+            label = "prewarm" if prewarm else "no prewarm"
+            runs[f"{label}: first"].append(first)
+            runs[f"{label}: second"].append(second)
+
+    print(f"\nFirst page runs after server start ({args.rows:,}-row upload, {args.pick:.0f} s to pick the file; "
+          f"median of {args.repeats}, ms):")
+    print(f"{'':<22}" + "".join(f"{step:>12}" for step in STEPS))
+    for label, values in runs.items():
+        print(_row(label, values))
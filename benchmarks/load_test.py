@@ -0,0 +1,396 @@
+"""
+Load test: N simulated analysts against a local Streamlit server.
+
+Each session speaks the browser's protocol (WebSocket + protobuf messages, HTTP file
+upload) and goes through upload → mapping confirm → tab / filter changes, rerunning
+the real page scripts on the server, including the progress fragments' auto-reruns.
+Reports per-interaction latency percentiles, throughput and the server's RSS over time
+(server process plus its worker processes).
+
+    python -m benchmarks.load_test --sessions 16 --rows 200000 --reports 2
+    python -m benchmarks.load_test --url http://127.0.0.1:8501 --sessions 4    # already running server
+"""
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+import uuid
+from collections import defaultdict
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import websockets
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.Common_pb2 import FileUploaderState, FileURLsRequest, UploadedFileInfo
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+from streamlit.runtime.state.common import user_key_from_element_id
+
+from benchmarks.synthetic import make_report
+
+ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_PORT = 8599
+TABS = ["Platforms", "Countries", "Artists", "Releases", "Tracks"]
+FILTER_KEYS = ["platform", "country", "artist", "release", "track"]
+INTERACTIONS = ["open", "upload", "mapping", "dashboard", "metric", "top_n", "filter"]
+RUN_TIMEOUT = 600            # seconds to wait for one page run (or background job) under load
+STARTUP_TIMEOUT = 60
+RSS_INTERVAL = 0.5           # seconds between RSS samples
+FINISHED = ForwardMsg.ScriptFinishedStatus.FINISHED_SUCCESSFULLY
+
+# ── Server ───────────────────────────────────────────────
+def start_server(port: int, env: Optional[dict] = None) -> subprocess.Popen:
+    """`streamlit run app.py` in headless mode (no XSRF token, so the simulated clients need no cookies)."""
+    cmd = [sys.executable, "-m", "streamlit", "run", str(ROOT / "app.py"),
+           "--server.headless", "true", "--server.port", str(port),
+           "--server.enableXsrfProtection", "false", "--server.fileWatcherType", "none",
+           "--browser.gatherUsageStats", "false"]
+    proc = subprocess.Popen(cmd, cwd=ROOT, env={**os.environ, **(env or {})},
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1):
+                return proc
+        except OSError:
+            if proc.poll() is not None:
+                raise RuntimeError("streamlit server exited during startup")
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("streamlit server did not start")
+
+def _descendants(pid: int) -> List[int]:
+    out, todo = [], [pid]
+    while todo:
+        p = todo.pop()
+        out.append(p)
+        try:
+            for task in os.listdir(f"/proc/{p}/task"):
+                with open(f"/proc/{p}/task/{task}/children") as fh:
+                    todo.extend(int(c) for c in fh.read().split())
+        except OSError:
+            pass
+    return out
+
+def tree_rss_mb(pid: int) -> float:
+    """RSS of a process and its children (job worker processes); Linux /proc only."""
+    total = 0
+    for p in _descendants(pid):
+        try:
+            with open(f"/proc/{p}/statm") as fh:
+                total += int(fh.read().split()[1])
+        except (OSError, ValueError, IndexError):
+            pass
+    return total * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+class RssSampler(threading.Thread):
+    def __init__(self, pid: int):
+        super().__init__(name="rss-sampler", daemon=True)
+        self.pid = pid
+        self.samples: List[tuple] = []          # (seconds since start, MB)
+        self._halt = threading.Event()
+        self._t0 = time.perf_counter()
+
+    def run(self):
+        while not self._halt.is_set():
+            self.samples.append((time.perf_counter() - self._t0, tree_rss_mb(self.pid)))
+            self._halt.wait(RSS_INTERVAL)
+
+    def stop(self):
+        self._halt.set()
+        self.join()
+
+# ── Browser session ──────────────────────────────────────
+class BrowserSession:
+    """
+    Minimal Streamlit client: keeps the widgets of the last run (by key, or by label
+    for widgets without one), sends widget changes as reruns like the browser does and
+    re-triggers fragments that asked for auto-reruns (the pages' job progress polling).
+    """
+
+    def __init__(self, url: str):
+        self.url = url.rstrip("/")
+        self.ws = None
+        self.session_id = ""
+        self.page_hash = ""
+        self.widgets: Dict[str, object] = {}    # key (or label when it has none) → widget proto of the last run
+        self.labels: Dict[str, object] = {}     # label → widget proto (form buttons have generated keys)
+        self.values: Dict[str, WidgetState] = {}
+        self.errors: List[str] = []
+        self.runs = 0                           # full runs finished
+        self._changed = asyncio.Condition()
+        self._pollers: Dict[str, asyncio.Task] = {}
+        self._file_urls: Dict[str, asyncio.Future] = {}
+        self._reader: Optional[asyncio.Task] = None
+
+    async def connect(self):
+        ws_url = "ws" + self.url[len("http"):] + "/_stcore/stream"
+        self.ws = await websockets.connect(ws_url, subprotocols=["streamlit"], max_size=None)
+        self._reader = asyncio.create_task(self._read())
+
+    async def close(self):
+        self._stop_pollers()
+        if self._reader:
+            self._reader.cancel()
+        if self.ws:
+            await self.ws.close()
+
+    # incoming messages
+    async def _read(self):
+        async for data in self.ws:
+            msg = ForwardMsg.FromString(data)
+            kind = msg.WhichOneof("type")
+            if kind == "new_session":
+                ns = msg.new_session
+                if ns.initialize.session_id:
+                    self.session_id = ns.initialize.session_id
+                if not ns.fragment_ids_this_run:        # full run: forget the previous run's widgets
+                    if ns.page_script_hash != self.page_hash:
+                        self.values.clear()
+                    self.page_hash = ns.page_script_hash
+                    self.widgets.clear()
+                    self.labels.clear()
+                    self._stop_pollers()
+            elif kind == "delta" and msg.delta.WhichOneof("type") == "new_element":
+                self._on_element(msg.delta.new_element)
+            elif kind == "auto_rerun":
+                self._poll(msg.auto_rerun.fragment_id, msg.auto_rerun.interval)
+            elif kind == "file_urls_response":
+                fut = self._file_urls.pop(msg.file_urls_response.response_id, None)
+                if fut is not None and not fut.done():
+                    fut.set_result(msg.file_urls_response.file_urls[0])
+            elif kind == "script_finished" and msg.script_finished == FINISHED:
+                async with self._changed:
+                    self.runs += 1
+                    self._changed.notify_all()
+
+    def _on_element(self, element):
+        kind = element.WhichOneof("type")
+        if kind == "exception":
+            self.errors.append(element.exception.message)
+            return
+        proto = getattr(element, kind)
+        widget_id = getattr(proto, "id", "")
+        if widget_id.startswith("$$"):
+            label = getattr(proto, "label", "")
+            self.widgets[user_key_from_element_id(widget_id) or label] = proto
+            self.labels[label] = proto
+
+    def _stop_pollers(self):
+        for task in self._pollers.values():
+            task.cancel()
+        self._pollers.clear()
+
+    def _poll(self, fragment_id: str, interval: float):
+        if fragment_id in self._pollers:
+            self._pollers[fragment_id].cancel()
+
+        async def _loop():
+            while True:
+                await asyncio.sleep(interval)
+                await self._send_rerun([], fragment_id=fragment_id, auto=True)
+        self._pollers[fragment_id] = asyncio.create_task(_loop())
+
+    # outgoing messages
+    async def _send_rerun(self, changes: List[WidgetState], fragment_id: str = "", auto: bool = False):
+        triggers = [s for s in changes if s.HasField("trigger_value")]
+        for state in changes:
+            if not state.HasField("trigger_value"):
+                self.values[state.id] = state
+        msg = BackMsg()
+        cs = msg.rerun_script
+        cs.page_script_hash = self.page_hash
+        cs.fragment_id = fragment_id
+        cs.is_auto_rerun = auto
+        cs.widget_states.widgets.extend(list(self.values.values()) + triggers)
+        await self.ws.send(msg.SerializeToString())
+
+    async def until(self, done: Callable[[], bool], after: int):
+        """Wait for a full run after run number `after` whose page satisfies done()."""
+        async with self._changed:
+            await asyncio.wait_for(self._changed.wait_for(lambda: self.runs > after and done()), RUN_TIMEOUT)
+        if self.errors:
+            raise RuntimeError(self.errors[0])
+
+    async def rerun(self, changes: List[WidgetState], done: Callable[[], bool] = lambda: True):
+        after = self.runs
+        await self._send_rerun(changes)
+        await self.until(done, after)
+
+    def has(self, name: str) -> bool:
+        return name in self.widgets or name in self.labels
+
+    def widget(self, name: str):
+        """Widget of the last run by key, else by label."""
+        return self.widgets.get(name) or self.labels[name]
+
+    async def click(self, name: str, done: Callable[[], bool] = lambda: True):
+        await self.rerun([WidgetState(id=self.widget(name).id, trigger_value=True)], done)
+
+    async def select(self, name: str, value: str, done: Callable[[], bool] = lambda: True):
+        await self.rerun([WidgetState(id=self.widget(name).id, string_value=value)], done)
+
+    async def upload(self, label: str, name: str, data: bytes, done: Callable[[], bool]):
+        """Upload a file the way the browser does: ask for an upload URL, PUT the file, then rerun."""
+        request_id = uuid.uuid4().hex
+        fut = asyncio.get_running_loop().create_future()
+        self._file_urls[request_id] = fut
+        msg = BackMsg(file_urls_request=FileURLsRequest(request_id=request_id, file_names=[name],
+                                                        session_id=self.session_id))
+        await self.ws.send(msg.SerializeToString())
+        urls = await asyncio.wait_for(fut, RUN_TIMEOUT)
+        await asyncio.to_thread(_put_file, self.url + urls.upload_url, name, data)
+        info = UploadedFileInfo(name=name, size=len(data), file_id=urls.file_id, file_urls=urls)
+        state = WidgetState(id=self.widget(label).id,
+                            file_uploader_state_value=FileUploaderState(uploaded_file_info=[info]))
+        await self.rerun([state], done)
+
+def _put_file(url: str, name: str, data: bytes) -> None:
+    boundary = uuid.uuid4().hex
+    head = (f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{name}"\r\n'
+            f"Content-Type: text/csv\r\n\r\n").encode()
+    req = urllib.request.Request(url, data=head + data + f"\r\n--{boundary}--\r\n".encode(), method="PUT",
+                                 headers={"Content-Type": f"multipart/form-data; boundary={boundary}"})
+    with urllib.request.urlopen(req, timeout=RUN_TIMEOUT):
+        pass
+
+# ── One simulated analyst ────────────────────────────────
+class Analyst:
+    """Scripted visit of one user; timings recorded per interaction kind."""
+
+    def __init__(self, idx: int, url: str, report: tuple, actions: int, think: float, seed: int):
+        self.idx = idx
+        self.url = url
+        self.name, self.data = report
+        self.actions = actions
+        self.think = think
+        self.rng = random.Random(seed + idx)
+        self.timings: Dict[str, List[float]] = defaultdict(list)
+        self.error: Optional[str] = None
+
+    async def _timed(self, kind: str, coro):
+        t = time.perf_counter()
+        await coro
+        self.timings[kind].append(time.perf_counter() - t)
+
+    async def _interact(self, s: BrowserSession):
+        tab = self.rng.choice(TABS)
+        kind = self.rng.choice(["metric", "top_n", "filter", "filter"])
+        if kind == "filter":
+            keys = [f"{tab}__flt_{f}" for f in FILTER_KEYS if s.has(f"{tab}__flt_{f}")]
+            if not keys:
+                return
+            key = self.rng.choice(keys)
+        else:
+            key = f"{tab}__{'metric' if kind == 'metric' else 'topn'}"
+        value = self.rng.choice(list(s.widget(key).options))
+        await self._timed(kind, s.select(key, value, lambda: s.has(key)))
+
+    async def run(self):
+        s = BrowserSession(self.url)
+        try:
+            await s.connect()
+            await self._timed("open", s.rerun([], lambda: s.has("")))        # the unlabelled file uploader
+            # parsed in the background; the page polls the job until the file is loaded
+            loaded = lambda: s.has("Continue") or s.has("Review columns")
+            await self._timed("upload", s.upload("", self.name, self.data, loaded))
+            # known layouts offer "Review columns" instead of "Continue"; both open the mapping page
+            review = "Continue" if s.has("Continue") else "Review columns"
+            await self._timed("mapping", s.click(review, lambda: s.has("Go to dashboard")))
+            # confirm → the dashboard polls the background preparation, then renders the tabs
+            await self._timed("dashboard", s.click("Go to dashboard", lambda: s.has("Platforms__metric")))
+            for _ in range(self.actions):
+                if self.think:
+                    await asyncio.sleep(self.rng.expovariate(1 / self.think))
+                await self._interact(s)
+        except Exception as exc:
+            self.error = f"{type(exc).__name__}: {exc}"
+        finally:
+            await s.close()
+
+# ── Report ───────────────────────────────────────────────
+def _reports(count: int, rows: int, tracks: int) -> List[tuple]:
+    """Distinct synthetic CSVs (same layout, different data) shared round-robin by the sessions."""
+    out = []
+    for i in range(count):
+        df = make_report(rows, tracks=tracks, seed=7 + i)
+        out.append((f"synthetic_{i}.csv", df.to_csv(index=False).encode("utf-8")))
+    return out
+
+def _percentiles(values: List[float]) -> str:
+    p50, p90, p99 = np.percentile(values, [50, 90, 99])
+    return f"{len(values):6d} {p50 * 1000:9.0f} {p90 * 1000:9.0f} {p99 * 1000:9.0f} {max(values) * 1000:9.0f}"
+
+def print_report(analysts: List[Analyst], sampler: Optional[RssSampler], elapsed: float) -> None:
+    timings: Dict[str, List[float]] = defaultdict(list)
+    for a in analysts:
+        for kind, values in a.timings.items():
+            timings[kind].extend(values)
+    print(f"\n{'interaction':<12} {'count':>6} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for kind in INTERACTIONS:
+        if timings.get(kind):
+            print(f"{kind:<12} {_percentiles(timings[kind])}")
+    changes = sum(len(timings[k]) for k in ("metric", "top_n", "filter"))
+    print(f"\n{len(analysts)} sessions in {elapsed:.1f}s — {changes / elapsed:.2f} tab/filter changes/s, "
+          f"{sum(len(v) for v in timings.values()) / elapsed:.2f} interactions/s")
+    failed = [a for a in analysts if a.error]
+    if failed:
+        print(f"{len(failed)} sessions failed, e.g. #{failed[0].idx}: {failed[0].error}")
+    if sampler is not None and sampler.samples:
+        mb = [m for _, m in sampler.samples]
+        print(f"\nServer RSS: start {mb[0]:.0f} MB, peak {max(mb):.0f} MB, end {mb[-1]:.0f} MB")
+        step = max(1, len(sampler.samples) // 10)
+        print("  " + "  ".join(f"{t:5.1f}s {m:5.0f}MB" for t, m in sampler.samples[::step]))
+
+async def _run_all(analysts: List[Analyst], ramp: float):
+    tasks = []
+    for a in analysts:
+        tasks.append(asyncio.create_task(a.run()))
+        if ramp:
+            await asyncio.sleep(ramp / len(analysts))
+    await asyncio.gather(*tasks)
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Simulate concurrent dashboard sessions against a Streamlit server.")
+    ap.add_argument("--sessions", type=int, default=8)
+    ap.add_argument("--rows", type=int, default=200_000, help="rows per synthetic report")
+    ap.add_argument("--tracks", type=int, default=5_000)
+    ap.add_argument("--reports", type=int, default=2, help="distinct reports shared by the sessions")
+    ap.add_argument("--actions", type=int, default=10, help="tab / filter changes per session")
+    ap.add_argument("--think", type=float, default=0.0, help="mean pause between actions (seconds)")
+    ap.add_argument("--ramp", type=float, default=0.0, help="seconds over which sessions start")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--url", help="test a running server instead of starting one (RSS is not sampled)")
+    ap.add_argument("--port", type=int, default=DEFAULT_PORT)
+    args = ap.parse_args()
+
+    reports = _reports(args.reports, args.rows, args.tracks)
+    print(f"{args.sessions} sessions, {args.reports} reports × {args.rows:,} rows "
+          f"({sum(len(d) for _, d in reports) / 2**20:.0f} MB of CSV), {args.actions} actions each")
+    server, sampler, url = None, None, args.url
+    if url is None:
+        # own mapping store, so the simulated users' mappings do not end up in the real one
+        server = start_server(args.port, {"ROYALTY_ANALYZER_HOME": tempfile.mkdtemp(prefix="royalty_load_")})
+        url = f"http://127.0.0.1:{args.port}"
+        sampler = RssSampler(server.pid)
+        sampler.start()
+    try:
+        analysts = [Analyst(i, url, reports[i % len(reports)], args.actions, args.think, args.seed)
+                    for i in range(args.sessions)]
+        t0 = time.perf_counter()
+        asyncio.run(_run_all(analysts, args.ramp))
+        elapsed = time.perf_counter() - t0
+    finally:
+        if sampler is not None:
+            sampler.stop()
+        if server is not None:
+            server.terminate()
+            server.wait()
+    print_report(analysts, sampler, elapsed)
@@ -0,0 +1,519 @@
+"""
+Correctness checks for the aggregation layer, to run before and after any optimization.
+
+Golden outputs: every tab × metric × filter value of SampleData/sample_distributor_report.csv,
+and combinations of two or three filters (the dashboard's Top-25 tables and totals, plus
+the KPI header), compared with benchmarks/golden/sample_distributor_report.json. The golden
+file is written by the baseline code (benchmarks/baseline.py, the page before any
+optimization). Intended differences from it, allowed by the check:
+  - Tracks / Releases group by the resolved entity key (track_key / release_key), which the
+    golden file knows under the baseline's code column (isrc / upc). On the sample every row
+    has a valid code with one title, so the keys, labels and sums are the baseline's. On
+    reports with missing or malformed codes they are not: those rows are split by title
+    instead of forming one "NaN" group, UPCs that differ only in leading zeros are one
+    release and labels are the most frequent title rather than the first one seen — the
+    randomized reports check that part.
+  - Equal values keep the aggregate's row order in a ranking (stable top-k); the baseline's
+    sort left their order undefined, so only the set of rows tied on one value is compared.
+
+Randomized reports (NaN / malformed / lowercase codes, duplicate titles, zero quantities,
+Unicode names): every optimized path — aggregate_with_labels, the pandas / Polars / DuckDB
+backends, top-k selection, drill-down rows, the one-pass workbook sums, worker-process
+group sums, streamed cubes and their data check, segment totals, catalog counts — is
+compared with a slow row-by-row reference. Keys, labels and stream counts must match
+exactly; money may differ only by float summation order (1e-9 relative).
+
+    python -m benchmarks.regression
+    python -m benchmarks.regression --seeds 500 --rows 5000
+    python -m benchmarks.regression --update-golden     # rewrite the golden file from the baseline code
+"""
+import argparse
+import io
+import json
+import math
+import os
+import re
+import sys
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from analyzer import parallel
+from analyzer.aggregate import (
+    CODE_KEYS, MISSING_LABEL, RPM_MIN_STREAMS, _disambiguate_labels, _normalize_code_series,
+    aggregate_with_labels, top3_labels_by_revenue, top_k,
+)
+from analyzer.backends import available_backends, get_backend
+from analyzer.dataset import normalize_dataset
+from analyzer.drill import column_codes, drill_rows
+from analyzer.entities import resolve_entities
+from analyzer.export import METRIC_COLUMNS, dimension_sums
+from analyzer.jobs import get_job_manager
+from analyzer.mapping import REQUIRED_FIELDS
+from analyzer.sketches import ALL, GROUP_DIMS, _key_column, build_sketches
+from analyzer.streaming import stream_cube
+from analyzer.validation import empty_report, validate_dataset
+from analyzer.views import SEGMENT_DIMS, TABS, filter_options, kpi_summary, segment_summary, tab_top, tab_view
+from benchmarks import baseline
+
+ROOT = Path(__file__).resolve().parents[1]
+SAMPLE = ROOT / "SampleData" / "sample_distributor_report.csv"
+GOLDEN = ROOT / "benchmarks" / "golden" / "sample_distributor_report.json"
+MAPPING = {**{k: k for k in REQUIRED_FIELDS}, "sales_type": "sales_type"}
+
+# Filters of each tab, as in FILTER_SET of the Dashboard page (segments are added when mapped)
+TAB_FILTERS = {
+    "Platforms": ["artist_name", "country"],
+    "Countries": ["platform", "artist_name"],
+    "Artists":   ["platform", "country"],
+    "Releases":  ["platform", "country"],
+    "Tracks":    ["platform", "country"],
+}
+TOP_N = 25                      # largest Top-N offered by the dashboard
+COMBO_VALUES = 2                # combinations: each value of a tab's first filter × this many of the second
+BASELINE_KEY_COLS = {"track_key": "isrc", "release_key": "upc"}   # entity keys → the baseline's code columns
+REL_TOL, ABS_TOL = 1e-9, 1e-9   # money: float sums in another order
+MAX_REPORTED = 20
+
+def _isna(v) -> bool:
+    return v is None or v is pd.NA or (isinstance(v, float) and math.isnan(v))
+
+def _close(a, b) -> bool:
+    if _isna(a) or _isna(b):
+        return _isna(a) and _isna(b)
+    return math.isclose(float(a), float(b), rel_tol=REL_TOL, abs_tol=ABS_TOL)
+
+# ── Golden outputs of the sample report ──────────────────
+def sample_report() -> pd.DataFrame:
+    return pd.read_csv(SAMPLE)
+
+def _selections(df: pd.DataFrame, tab: str) -> List[tuple]:
+    """
+    No filter, every value of each of the tab's filters (one at a time), then each value of
+    the first filter with the first COMBO_VALUES values of the second one under it, alone
+    and with every segment value (filters one after another, as the dashboard offers them).
+    """
+    cols = [c for c in TAB_FILTERS[tab] + [c for c in SEGMENT_DIMS if c in df.columns] if c in df.columns]
+    out = [()] + [((col, value),) for col in cols for value in filter_options(df, (), col)]
+    first, second, segments = cols[0], cols[1], cols[2:]
+    for value in filter_options(df, (), first):
+        for other in filter_options(df, ((first, value),), second)[:COMBO_VALUES]:
+            pair = ((first, value), (second, other))
+            out.append(pair)
+            out += [pair + ((seg, s),) for seg in segments for s in filter_options(df, pair, seg)]
+    return out
+
+def _view_entry(view: Optional[dict], rank) -> Optional[dict]:
+    """
+    Totals, the rows shown by any metric's Top-N (key, label, streams, earnings, rpm) and each
+    metric's ranking; rank(agg, metric column) → index of the Top-N rows, largest first.
+    """
+    if view is None:
+        return None
+    agg, key_col = view["agg"], view["key_col"]
+    ranked = {metric: rank(agg, col) for metric, col in METRIC_COLUMNS.items()}
+    shown = list(dict.fromkeys(i for index in ranked.values() for i in index))
+    top = agg.loc[shown]
+    rows = [[None if _isna(k) else str(k), str(lbl), float(q), float(r), float(m)]
+            for k, lbl, q, r, m in zip(top[key_col].tolist(), top["label"].tolist(), top["quantity"].tolist(),
+                                       top["revenue"].tolist(), top["rpm"].tolist())]
+    position = {i: n for n, i in enumerate(shown)}
+    return {"key_col": BASELINE_KEY_COLS.get(key_col, key_col), "entries": len(agg), "streams": view["streams"],
+            "earnings": view["revenue"], "rows": rows, **{metric: [position[i] for i in index] for metric, index in ranked.items()}}
+
+def _name(tab: str, sel: tuple) -> str:
+    return tab + "".join(f" | {col}={value}" for col, value in sel)
+
+def golden_outputs(raw: pd.DataFrame) -> Dict[str, object]:
+    """Name → result for the KPI header and every tab / selection (all metrics), from the current code."""
+    df = normalize_dataset(raw, MAPPING)
+    rank = lambda agg, col: top_k(agg, col, TOP_N, RPM_MIN_STREAMS if col == "rpm" else 0).index
+    out: Dict[str, object] = {"KPI": kpi_summary(df)}
+    for tab in TABS:
+        for sel in _selections(df, tab):
+            out[_name(tab, sel)] = _view_entry(tab_view(df, tab, (), drill_rows(df, sel)), rank)
+    return out
+
+def baseline_outputs(raw: pd.DataFrame) -> Dict[str, object]:
+    """The same results from the baseline code (benchmarks/baseline.py): the golden file."""
+    df = baseline.prepare(raw, MAPPING)
+    rank = lambda agg, col: baseline.top_index(agg, col, TOP_N)
+    out: Dict[str, object] = {"KPI": baseline.kpi_summary(df)}
+    norm = normalize_dataset(raw, MAPPING)      # only for the list of selections
+    for tab in TABS:
+        for sel in _selections(norm, tab):
+            out[_name(tab, sel)] = _view_entry(baseline.tab_view(df, tab, sel), rank)
+    return out
+
+def write_golden(outputs: Dict[str, object]) -> None:
+    """One entry per line, so a changed result shows up as a readable diff."""
+    GOLDEN.parent.mkdir(parents=True, exist_ok=True)
+    lines = [f"{json.dumps(k, ensure_ascii=False)}: {json.dumps(v, ensure_ascii=False)}" for k, v in outputs.items()]
+    GOLDEN.write_text("{\n" + ",\n".join(lines) + "\n}\n", encoding="utf-8")
+
+def _diff(path: str, expected, actual, errors: List[str]) -> None:
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        for k in expected.keys() | actual.keys():
+            if k not in actual or k not in expected:
+                errors.append(f"{path}/{k}: {'missing' if k not in actual else 'unexpected'}")
+            else:
+                _diff(f"{path}/{k}", expected[k], actual[k], errors)
+    elif isinstance(expected, list) and isinstance(actual, list):
+        if len(expected) != len(actual):
+            errors.append(f"{path}: {len(actual)} items, expected {len(expected)}")
+        for i, (e, a) in enumerate(zip(expected, actual)):
+            _diff(f"{path}[{i}]", e, a, errors)
+    elif isinstance(expected, float) or isinstance(actual, float):
+        if not (isinstance(actual, (int, float)) and isinstance(expected, (int, float)) and _close(expected, actual)):
+            errors.append(f"{path}: {actual!r}, expected {expected!r}")
+    elif expected != actual:
+        errors.append(f"{path}: {actual!r}, expected {expected!r}")
+
+def _ranking_runs(entry: dict, metric: str) -> List[list]:
+    """A metric's Top-N as [value, rows tied on it]; the rows of a run are sorted (their order is undefined)."""
+    pos = {"Earnings": 3, "Streams": 2, "Value per 1K Streams": 4}[metric]
+    runs: List[list] = []
+    for row in (entry["rows"][i] for i in entry[metric]):
+        if runs and _close(runs[-1][0], row[pos]):
+            runs[-1][1].append(row)
+        else:
+            runs.append([row[pos], [row]])
+    for run in runs:
+        run[1].sort(key=lambda r: (r[0] is None, r[0] or "", r[1]))
+    if len(entry[metric]) == TOP_N and runs:
+        runs[-1][1] = len(runs[-1][1])      # a tie cut off at the Top-N: which of its rows made it is undefined too
+    return runs
+
+def _diff_entry(path: str, expected: dict, actual: dict, errors: List[str]) -> None:
+    """Totals and entry counts as stored; rankings up to the order of tied rows."""
+    totals = [k for k in expected.keys() | actual.keys() if k != "rows" and k not in METRIC_COLUMNS]
+    _diff(path, {k: expected.get(k) for k in totals}, {k: actual.get(k) for k in totals}, errors)
+    for metric in METRIC_COLUMNS:
+        _diff(f"{path}/{metric}", _ranking_runs(expected, metric), _ranking_runs(actual, metric), errors)
+
+def check_golden(outputs: Dict[str, object]) -> List[str]:
+    expected = json.loads(GOLDEN.read_text(encoding="utf-8"))
+    actual = json.loads(json.dumps(outputs, ensure_ascii=False))    # same types as the stored file
+    errors: List[str] = []
+    for name in expected.keys() | actual.keys():
+        if name not in actual or name not in expected:
+            errors.append(f"golden/{name}: {'missing' if name not in actual else 'unexpected'}")
+        elif isinstance(expected[name], dict) and isinstance(actual[name], dict) and "rows" in expected[name]:
+            _diff_entry(f"golden/{name}", expected[name], actual[name], errors)
+        else:
+            _diff(f"golden/{name}", expected[name], actual[name], errors)
+    return errors
+
+# ── Randomized reports ───────────────────────────────────
+TITLES = ["Intro", "Трек", "Canción", "夜の曲", "Straße", "Café", "Café", "Emoji 🎵", "Ｆｕｌｌｗｉｄｔｈ",
+          "  Padded  ", "=SUM(A1)", "Intro"]
+ARTISTS = ["Wild Horizon", "Земфира", "Björk", "坂本龍一", "Sigur Rós", "wild horizon", "Ω"]
+PLATFORMS = ["Spotify", "Apple Music", "YouTube Music", "Яндекс Музыка", "Deezer"]
+COUNTRIES = ["US", "DE", "BR", "Côte d’Ivoire", "Россия", "日本"]
+
+def _pick(rng, values: list, n: int, nan_share: float) -> np.ndarray:
+    out = np.asarray(values, dtype=object)[rng.integers(0, len(values), n)]
+    out[rng.random(n) < nan_share] = np.nan
+    return out
+
+def _messy_isrc(rng, i: int) -> object:
+    code = f"USAMR24{i:05d}"
+    return [code, code.lower(), f"US-AMR-24-{i:05d}", f" {code} ", "XX123", "", np.nan][rng.integers(0, 7)]
+
+def _messy_upc(rng, i: int) -> object:
+    code = f"{1_000_000_000 + i:012d}"
+    return [code, code.lstrip("0"), "0" + code, f"{code[:6]}-{code[6:]}", "000000000000", np.nan][rng.integers(0, 6)]
+
+def random_report(rng, rows: int) -> pd.DataFrame:
+    """Raw report with the mapped columns; tracks share titles across different codes."""
+    tracks = max(1, rows // 15)
+    track = rng.integers(0, tracks, rows)
+    release = track // 3
+    quantity = rng.integers(0, 2_000, rows)
+    quantity[rng.random(rows) < 0.2] = 0
+    revenue = np.round(quantity * rng.uniform(0.0, 0.01, rows), 2)
+    revenue[rng.random(rows) < 0.05] *= -1                      # adjustments
+    title_of = np.asarray(TITLES, dtype=object)[rng.integers(0, len(TITLES), tracks)]
+    report = pd.DataFrame({
+        "reporting_month": _pick(rng, ["2024-01", "2024-02", "2024-03"], rows, 0.0),
+        "platform": _pick(rng, PLATFORMS, rows, 0.03),
+        "country": _pick(rng, COUNTRIES, rows, 0.03),
+        "artist_name": _pick(rng, ARTISTS, rows, 0.03),
+        "release_title": np.asarray([f"{title_of[r * 3 % tracks]} EP" for r in release], dtype=object),
+        "upc": np.asarray([_messy_upc(rng, r) for r in release], dtype=object),
+        "track_title": title_of[track].copy(),
+        "isrc": np.asarray([_messy_isrc(rng, t) for t in track], dtype=object),
+        "quantity": quantity,
+        "revenue": revenue,
+        "sales_type": _pick(rng, ["Stream", "Download", "Creation"], rows, 0.02),
+    })
+    report.loc[rng.random(rows) < 0.03, "track_title"] = np.nan
+    if rng.random() < 0.5:      # codes read as numbers, like a CSV column with gaps
+        report["upc"] = pd.to_numeric(report["upc"], errors="coerce")
+    return report
+
+# Reference implementation: one pass over the rows with plain Python values
+def ref_code(v) -> Optional[str]:
+    if _isna(v):
+        return None
+    return re.sub(r"[^A-Z0-9]", "", str(v).strip().upper()) or None
+
+def ref_aggregate(df: pd.DataFrame, key_col: str, label_col: str, filters: tuple = (),
+                  rows: Optional[np.ndarray] = None) -> Dict[Optional[str], tuple]:
+    """key (None = missing) → (quantity, revenue, label, rpm), as aggregate_with_labels defines them."""
+    if key_col not in df.columns:
+        key_col = label_col
+    frame = df if rows is None else df.iloc[rows]
+    with_label = key_col != label_col and label_col in frame.columns
+    groups: Dict[Optional[str], list] = {}
+    cols = [frame[key_col], frame[label_col] if with_label else frame[key_col], frame["quantity"], frame["revenue"]]
+    for key, label, q, r, *values in zip(*cols, *(frame[c] for c, _ in filters)):
+        if any(_isna(v) or v != want for v, (_, want) in zip(values, filters)):
+            continue
+        key = ref_code(key) if key_col in CODE_KEYS else (None if _isna(key) else str(key))
+        g = groups.setdefault(key, [0, 0.0, None])
+        g[0] += q
+        g[1] += r
+        if with_label and g[2] is None and key is not None and not _isna(label):
+            g[2] = str(label)
+    out = {}
+    for key, (q, r, label) in groups.items():
+        label = label if label is not None else (MISSING_LABEL if key is None else key)
+        out[key] = (q, r, label, r / q * 1000 if q > 0 else 0.0)
+    return out
+
+def ref_disambiguate(keys: list, labels: list) -> list:
+    counts = Counter(None if _isna(lbl) else str(lbl) for lbl in labels)
+    out = []
+    for key, label in zip(keys, labels):
+        label = None if _isna(label) else str(label)
+        clean = "" if _isna(key) else re.sub(r"[^A-Za-z0-9]", "", str(key)).upper()
+        out.append(f"{label} • {clean}" if counts[label] > 1 and clean and label is not None else label)
+    return out
+
+def ref_top_k(values: list, quantity: list, k: int, min_quantity: float = 0) -> list:
+    """Positions of the k largest values, ties in row order (stable descending sort)."""
+    v = [-math.inf if _isna(x) else float(x) for x in values]
+    eligible = [i for i in range(len(v)) if not min_quantity or quantity[i] >= min_quantity]
+    return sorted(eligible, key=lambda i: -v[i])[:k]
+
+def _frame_groups(agg: pd.DataFrame, key_col: str) -> Dict[Optional[str], tuple]:
+    out = {}
+    for k, q, r, lbl, m in zip(agg[key_col], agg["quantity"], agg["revenue"], agg["label"], agg["rpm"]):
+        out[None if _isna(k) else str(k)] = (q, r, None if _isna(lbl) else str(lbl), m)
+    return out
+
+def _compare(name: str, expected: Dict, actual: Dict, errors: List[str], labels: bool = True) -> None:
+    for key in expected.keys() | actual.keys():
+        if key not in actual or key not in expected:
+            errors.append(f"{name}: group {key!r} {'missing' if key not in actual else 'unexpected'}")
+            continue
+        (eq, er, el, em), (aq, ar, al, am) = expected[key], actual[key]
+        if float(eq) != float(aq):
+            errors.append(f"{name}: {key!r} streams {aq!r}, expected {eq!r}")
+        if not (_close(er, ar) and _close(em, am)):
+            errors.append(f"{name}: {key!r} earnings/rpm {ar!r}/{am!r}, expected {er!r}/{em!r}")
+        if labels and el != al:
+            errors.append(f"{name}: {key!r} label {al!r}, expected {el!r}")
+
+KEY_PAIRS = [("platform", "platform"), ("country", "country"), ("artist_name", "artist_name"),
+             ("upc", "release_title"), ("isrc", "track_title"), ("track_title", "track_title")]
+
+def _common_value(df: pd.DataFrame, col: str):
+    counts = df[col].value_counts()
+    return counts.index[0]
+
+def check_report(df: pd.DataFrame, raw: pd.DataFrame, pool) -> List[str]:
+    """Every optimized path against the reference (or, for entity-resolved tabs, against each other)."""
+    errors: List[str] = []
+    platform, country = _common_value(df, "platform"), _common_value(df, "country")
+    selections = [(), (("platform", platform),), (("platform", platform), ("country", country))]
+
+    # code normalization
+    for col in ("isrc", "upc"):
+        got = [None if _isna(v) else v for v in _normalize_code_series(df[col]).tolist()]
+        want = [ref_code(v) for v in df[col].tolist()]
+        if got != want:
+            bad = next(i for i, (g, w) in enumerate(zip(got, want)) if g != w)
+            errors.append(f"_normalize_code_series({col}): {df[col].iloc[bad]!r} → {got[bad]!r}, expected {want[bad]!r}")
+
+    # grouped sums with first-seen labels: reference vs aggregate_with_labels vs every backend
+    for key_col, label_col in KEY_PAIRS:
+        for sel in selections:
+            want = ref_aggregate(df, key_col, label_col, sel)
+            frame = df
+            for col, value in sel:
+                frame = frame[frame[col] == value]
+            _compare(f"aggregate_with_labels({key_col}, {sel})", want,
+                     _frame_groups(aggregate_with_labels(frame, key_col, label_col), key_col), errors)
+            rows = drill_rows(df, sel)
+            for name in available_backends():
+                backend = get_backend(name)
+                _compare(f"{name}.aggregate({key_col}, {sel})", want,
+                         _frame_groups(backend.aggregate(df, key_col, label_col, sel), key_col), errors)
+                _compare(f"{name}.aggregate({key_col}, rows of {sel})", want,
+                         _frame_groups(backend.aggregate(df, key_col, label_col, (), rows), key_col), errors)
+                for metric, pos in (("revenue", 1), ("quantity", 0), ("rpm", 3)):
+                    min_q = RPM_MIN_STREAMS if metric == "rpm" else 0
+                    got = backend.top_n(df, key_col, label_col, metric, 10, sel, min_q)[metric].tolist()
+                    ranked = sorted((g[pos] for g in want.values() if not min_q or g[0] >= min_q), reverse=True)[:10]
+                    if len(got) != len(ranked) or not all(_close(g, w) for g, w in zip(got, ranked)):
+                        errors.append(f"{name}.top_n({key_col}, {metric}, {sel}): {got[:3]}…, expected {ranked[:3]}…")
+
+    # top-k selection and the KPI top 3
+    for key_col, label_col in KEY_PAIRS:
+        agg = aggregate_with_labels(df, key_col, label_col)
+        agg["ties"] = (agg["quantity"] // 5_000).astype("float64")     # many equal values: row order decides
+        for metric, min_q in (("revenue", 0), ("quantity", 0), ("rpm", RPM_MIN_STREAMS), ("ties", 0)):
+            for k in (1, 3, 25, len(agg) + 1):
+                got = [int(i) for i in agg.index.get_indexer(top_k(agg, metric, k, min_q).index)]
+                want = ref_top_k(agg[metric].tolist(), agg["quantity"].tolist(), k, min_q)
+                if got != want:
+                    errors.append(f"top_k({key_col}, {metric}, {k}): {got[:5]}…, expected {want[:5]}…")
+        groups = ref_aggregate(df, key_col, label_col)
+        order = sorted(groups, key=lambda k: (k is None, k or ""))          # groupby order, missing last
+        total = sum(g[1] for g in groups.values()) or 1.0
+        winners = [order[i] for i in ref_top_k([groups[k][1] for k in order], [], 3)]
+        want = [f"{groups[k][2]} ({groups[k][1] / total:.0%})" for k in winners]
+        got = top3_labels_by_revenue(df, key_col, label_col)
+        if got != want:
+            errors.append(f"top3_labels_by_revenue({key_col}): {got}, expected {want}")
+
+    # duplicate labels get their code appended
+    for key_col, label_col in (("isrc", "track_title"), ("upc", "release_title")):
+        agg = aggregate_with_labels(df, key_col, label_col)
+        got = [None if _isna(v) else v for v in _disambiguate_labels(agg, key_col)["label"].tolist()]
+        want = ref_disambiguate(agg[key_col].tolist(), agg["label"].tolist())
+        if got != want:
+            errors.append(f"_disambiguate_labels({key_col}): differs at {next(i for i, (g, w) in enumerate(zip(got, want)) if g != w)}")
+
+    # dashboard tabs: filter path, drill rows, one-pass workbook sums and every backend agree
+    for sel in selections:
+        rows = drill_rows(df, sel)
+        sums = dimension_sums(df, rows)
+        for tab in TABS:
+            base = tab_view(df, tab, sel)
+            if base is None:
+                continue
+            want = _frame_groups(base["agg"], base["key_col"])
+            _compare(f"tab_view({tab}, rows of {sel})", want,
+                     _frame_groups(tab_view(df, tab, (), rows)["agg"], base["key_col"]), errors)
+            _compare(f"dimension_sums({tab}, {sel})", want, _frame_groups(sums[tab], base["key_col"]), errors)
+            for name in available_backends():
+                os.environ["ROYALTY_BACKEND"] = name
+                try:
+                    view = tab_view(df, tab, sel)
+                finally:
+                    os.environ.pop("ROYALTY_BACKEND", None)
+                _compare(f"tab_view({tab}, {sel}) on {name}", want, _frame_groups(view["agg"], view["key_col"]), errors)
+                # the chart: one top-n query, labelled like the whole view
+                for metric, min_q in (("revenue", 0), ("rpm", RPM_MIN_STREAMS)):
+                    os.environ["ROYALTY_BACKEND"] = name
+                    try:
+                        top = tab_top(df, tab, metric, 10, rows, min_q)
+                    finally:
+                        os.environ.pop("ROYALTY_BACKEND", None)
+                    full = top_k(base["agg"], metric, 10, min_q)
+                    got = list(zip(top["label"].tolist(), top[metric].tolist()))
+                    expected = list(zip(full["label"].tolist(), full[metric].tolist()))
+                    if len(got) != len(expected) or not all(g[0] == w[0] and _close(g[1], w[1]) for g, w in zip(got, expected)):
+                        errors.append(f"tab_top({tab}, {metric}, {sel}) on {name}: {got[:3]}…, expected {expected[:3]}…")
+
+    # group sums split across worker processes (keys factorized here, or the dataset's cached codes)
+    limit = parallel.MIN_PARTITION_ROWS
+    parallel.MIN_PARTITION_ROWS = max(1, len(df) // 4)
+    try:
+        rows = drill_rows(df, selections[1])
+        for col in ("platform", "country", "track_key", "isrc"):
+            codes, uniques = column_codes(df, col)
+            for dropna in (True, False):
+                for name, sel, coded in (("", None, None), (", cached codes", None, (codes, uniques)),
+                                         (", cached codes of a selection", rows, (codes[rows], uniques))):
+                    frame = df if sel is None else df.take(sel)
+                    got = parallel.parallel_group_sums(frame[col], {"quantity": frame["quantity"],
+                                                                    "revenue": frame["revenue"]}, dropna, pool, coded)
+                    want = frame.groupby(col, dropna=dropna, as_index=False).agg(quantity=("quantity", "sum"),
+                                                                                 revenue=("revenue", "sum"))
+                    if (got[col].astype("string").fillna("\0").tolist() != want[col].astype("string").fillna("\0").tolist()
+                            or got["quantity"].tolist() != want["quantity"].tolist()
+                            or not all(_close(a, b) for a, b in zip(got["revenue"], want["revenue"]))):
+                        errors.append(f"parallel_group_sums({col}, dropna={dropna}{name}) differs from groupby")
+    finally:
+        parallel.MIN_PARTITION_ROWS = limit
+
+    # segment totals
+    for col in SEGMENT_DIMS:
+        if col not in df.columns:
+            continue
+        seg = segment_summary(df, col)
+        want = {str(k): (q, r, str(k), r / q * 1000 if q > 0 else 0.0)
+                for k, (q, r) in df.groupby(col)[["quantity", "revenue"]].sum().iterrows()}
+        got = {str(k): (q, r, str(k), m) for k, q, r, m in zip(seg[col], seg["quantity"], seg["revenue"], seg["rpm"])}
+        _compare(f"segment_summary({col})", want, got, errors)
+
+    # exact catalog counts of one dataset: distinct keys per group
+    sk = build_sketches(df)
+    for name in ("tracks", "releases"):
+        spec = _key_column(df, name)
+        if spec is None:
+            continue
+        want = {ALL: df[spec[0]].nunique()}
+        for dim in GROUP_DIMS:
+            want.update({(dim, str(v)): n for v, n in df.groupby(dim)[spec[0]].nunique().items()})
+        got = {group: sk.counts(group)[name][0] for group in want}
+        if got != {group: float(n) for group, n in want.items()}:
+            errors.append(f"build_sketches({name}): exact counts differ from nunique")
+
+    # a streamed cube gives the same tab sums (labels may differ: titles are counted per cube row)
+    data = raw.to_csv(index=False).encode("utf-8")
+    parsed_raw = pd.read_csv(io.BytesIO(data))
+    parsed = normalize_dataset(parsed_raw, MAPPING)
+    report = empty_report()
+    cube = resolve_entities(stream_cube(data, MAPPING, chunk_rows=max(1, len(raw) // 3), report=report))
+    for tab in TABS:
+        a, b = tab_view(parsed, tab, ()), tab_view(cube, tab, ())
+        _compare(f"stream_cube({tab})", _frame_groups(a["agg"], a["key_col"]), _frame_groups(b["agg"], b["key_col"]),
+                 errors, labels=False)
+    # and the same data check, chunk by chunk (RPM outliers against whole-file medians)
+    for check, want in validate_dataset(parsed_raw, parsed, MAPPING).items():
+        if check != "duplicate_rows" and report[check] != want:
+            errors.append(f"stream_cube data check {check}: {report[check]}, expected {want}")
+    return errors
+
+# ─────────────────────────────────────────────────────────
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Check aggregation results against golden outputs and a reference.")
+    ap.add_argument("--seeds", type=int, default=25, help="randomized reports to check")
+    ap.add_argument("--rows", type=int, default=2_000, help="rows per randomized report")
+    ap.add_argument("--update-golden", action="store_true", help="rewrite the golden file from the baseline code")
+    args = ap.parse_args()
+
+    failures: List[str] = []
+    if args.update_golden or not GOLDEN.exists():
+        outputs = baseline_outputs(sample_report())
+        write_golden(outputs)
+        print(f"golden: wrote {len(outputs)} baseline results to {GOLDEN.relative_to(ROOT)}")
+    outputs = golden_outputs(sample_report())
+    errors = check_golden(outputs)
+    failures += errors
+    print(f"golden: {len(outputs)} results, {len(errors)} differences")
+
+    pool = get_job_manager().process_pool
+    bad_seeds = 0
+    for seed in range(args.seeds):
+        raw = random_report(np.random.default_rng(seed), args.rows)
+        errors = check_report(normalize_dataset(raw.copy(), MAPPING), raw, pool)
+        if errors:
+            bad_seeds += 1
+            failures += [f"seed {seed}: {e}" for e in errors]
+    print(f"random reports: {args.seeds} × {args.rows:,} rows, {bad_seeds} with differences "
+          f"(backends: {', '.join(available_backends())})")
+
+    for line in failures[:MAX_REPORTED]:
+        print("  " + line)
+    if len(failures) > MAX_REPORTED:
+        print(f"  … and {len(failures) - MAX_REPORTED} more")
+    sys.exit(1 if failures else 0)
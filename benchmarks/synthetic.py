@@ -0,0 +1,44 @@
+"""Synthetic distributor reports for benchmarks (same columns as SampleData/sample_distributor_report.csv)."""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+PLATFORMS = ["Spotify", "Apple Music", "YouTube Music", "Amazon Music", "Deezer", "Tidal", "Pandora",
+             "TikTok", "Boomplay", "Anghami", "Yandex Music", "VK Music", "SoundCloud", "Napster"]
+MAPPING = {k: k for k in ["reporting_month", "country", "platform", "artist_name", "release_title",
+                          "track_title", "isrc", "upc", "quantity", "revenue"]}
+
+def make_report(rows: int, tracks: int = 50_000, countries: int = 180, months: int = 12, seed: int = 7) -> pd.DataFrame:
+    """Raw report with Zipf-like popularity (a few tracks earn most of the revenue)."""
+    rng = np.random.default_rng(seed)
+    releases = max(1, tracks // 4)
+    artists = max(1, tracks // 20)
+    track_idx = np.minimum(rng.zipf(1.3, rows) - 1, tracks - 1)
+    release_idx = track_idx // 4
+    quantity = rng.integers(1, 5_000, rows)
+    rate = rng.uniform(0.002, 0.012, rows)
+    return pd.DataFrame({
+        "reporting_month": pd.Series([f"2024-{m:02d}" for m in range(1, months + 1)]).take(rng.integers(0, months, rows)).to_numpy(),
+        "sales_month": "2024-01",
+        "platform": np.asarray(PLATFORMS)[rng.integers(0, len(PLATFORMS), rows)],
+        "country": pd.Series([f"Country {i:03d}" for i in range(countries)]).take(rng.integers(0, countries, rows)).to_numpy(),
+        "artist_name": pd.Series([f"Artist {i}" for i in range(artists)]).take(release_idx % artists).to_numpy(),
+        "release_title": pd.Series([f"Release {i}" for i in range(releases)]).take(release_idx).to_numpy(),
+        "upc": (1_000_000_000_000 + release_idx).astype(np.int64),
+        "track_title": pd.Series([f"Track {i}" for i in range(tracks)]).take(track_idx).to_numpy(),
+        "isrc": pd.Series([f"USAMR24{i:05d}" for i in range(tracks)]).take(track_idx).to_numpy(),
+        "quantity": quantity,
+        "unit_price": rate.round(4),
+        "revenue": (quantity * rate).round(2),
+        "currency": "USD",
+        "sales_type": np.where(rng.random(rows) < 0.95, "Stream", "Download"),
+    })
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Write a synthetic royalty report CSV.")
+    ap.add_argument("rows", type=int)
+    ap.add_argument("out")
+    ap.add_argument("--tracks", type=int, default=50_000)
+    args = ap.parse_args()
+    make_report(args.rows, tracks=args.tracks).to_csv(args.out, index=False)
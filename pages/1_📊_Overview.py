@@ -1,6 +1,13 @@
 import streamlit as st
 import pandas as pd
-import re
+
+from analyzer.dataset import frame_digest, prepare_in_background, preview_quality
+from analyzer.mapping import REQUIRED_FIELDS, get_mapping_store, suggest_mapping
+from analyzer.startup import prewarm
+from analyzer.storage import PREVIEW_ROWS, CompressedFrame
+from analyzer.validation import quality_issues
+
+prewarm()
 
 # Unified container 1200px with top padding
 st.markdown("""
@@ -62,9 +69,9 @@ Please review the matches below and confirm — so your dashboard shows the righ
 
 # Take df from session
 df = st.session_state.get("df")
-if not isinstance(df, pd.DataFrame):
+if not isinstance(df, (pd.DataFrame, CompressedFrame)):
     df = st.session_state.get("df_raw")
-if not isinstance(df, pd.DataFrame):
+if not isinstance(df, (pd.DataFrame, CompressedFrame)):
     st.error("No data found. Please upload a file first.")
     st.stop()
 
@@ -72,112 +79,8 @@ if not isinstance(df, pd.DataFrame):
 st.dataframe(df.head(5), use_container_width=True)
 # st.divider()  # removed extra line
 
-# Canonical required fields
-REQUIRED_FIELDS = {
-    # Report info
-    "reporting_month": "Month of the statement/report (e.g., 2023-01)",
-    "country":         "Country / Territory",
-    "platform":        "Streaming/download platform",
-    # Content info
-    "artist_name":     "Artist name",
-    "release_title":   "Release/album title",
-    "track_title":     "Track title",
-    "isrc":            "ISRC (track id)",
-    "upc":             "UPC/EAN (release)",
-    # Performance
-    "quantity":        "Streams/units/downloads",
-    "revenue":         "Revenue/royalty amount",
-}
-
-# Aliases for auto-detect (original + correction for country)
-EXACT_NAMES = {
-    "reporting_month": [
-        "reporting_month","transaction month","statement month","report month",
-        "sales month","accounted date","month","year_month","yyyymm",
-    ],
-    "platform": ["platform","store","service","partner","retailer"],
-    "country":  [
-        "country","territory","region","market",
-        "country region","country/region"
-    ],
-    "artist_name": ["artist_name","artists","artist"],
-    "release_title": ["release_title","album/channel","album","release","product","release name"],
-    "upc": ["upc","ean","barcode","catalog","catalog number","parent id"],
-    "track_title": ["track_title","title","song","track name","track"],
-    "isrc": ["isrc","id"],
-    "quantity": ["quantity","units","streams","downloads","qty","plays","play count","streams count"],
-    "revenue": ["revenue","net_revenue","gross_revenue","net","gross","amount","royalty","earnings","total usd","payout","gross amount","net amount"],
-}
-
-def _norm(s: str) -> str:
-    """
-    Unicode normalization: lowercasing and removing non-alphanumeric,
-    including underscores. Ensures 'Net Revenue' and 'net_revenue' match.
-    """
-    return re.sub(r"[\W_]+", "", str(s).lower(), flags=re.UNICODE)
-
-def auto_map_exact(columns):
-    """Auto-mapping based on exact normalized names."""
-    cols = list(columns)
-    col_norm = {c: _norm(c) for c in cols}
-    auto = {}
-    for canon, exact_list in EXACT_NAMES.items():
-        targets = [_norm(x) for x in exact_list]
-        match = next((c for c in cols if col_norm[c] in targets), None)
-        if match is not None:
-            auto[canon] = match
-    return auto
-
-# Russian aliases
-# Original headers found in file:
-# 'Месяц продаж','Магазин','Лейбл','Cтрана','Исполнитель','UPC','Альбом','ISRC','Трек',
-# 'Тип контента','Тип транзакции','Количество',
-# 'Доход Лицензиата, ... руб.','Ставка вознаграждения Лицензиара, %','Вознаграждение Лицензиара, руб.'
-RUSSIAN_ALIASES = {
-    "reporting_month": [
-        "Месяц продаж",
-    ],
-    "platform": [
-        "Магазин",
-    ],
-    "country": [
-        "Cтрана",   # Latin 'C'
-        "Страна",   # Cyrillic 'С'
-    ],
-    "artist_name": [
-        "Исполнитель",
-    ],
-    "release_title": [
-        "Альбом",
-    ],
-    "track_title": [
-        "Трек",
-    ],
-    "isrc": [
-        "ISRC",
-    ],
-    "upc": [
-        "UPC",
-    ],
-    "quantity": [
-        "Количество",
-    ],
-    "revenue": [
-        "Вознаграждение Лицензиара, руб.",
-        # The report also contains «Доход Лицензиата, ... руб.» — not mapped intentionally to avoid confusion.
-    ],
-}
-
-# Merge: extend EXACT_NAMES with Russian aliases (no duplicates)
-for canon, aliases in RUSSIAN_ALIASES.items():
-    if canon in EXACT_NAMES:
-        merged = list(dict.fromkeys(list(EXACT_NAMES[canon]) + aliases))
-        EXACT_NAMES[canon] = merged
-    else:
-        EXACT_NAMES[canon] = list(dict.fromkeys(aliases))
-
-# Auto-detect + check existing mapping from session
-auto_map = auto_map_exact(df.columns)
+# Auto-detect (learned profile → alias index → value sniffing) + existing mapping from session
+auto_map = suggest_mapping(df.head(PREVIEW_ROWS))
 existing = st.session_state.get("mapped_fields") or st.session_state.get("mapping") or {}
 initial = {**auto_map, **existing}
 
@@ -189,7 +92,8 @@ with st.form("mapping_form", clear_on_submit=False):
     order = [
         "reporting_month", "country", "platform",      # row 1 (Report)
         "artist_name", "release_title", "track_title", # row 2 (Content)
-        "isrc", "upc", "quantity", "revenue"          # row 3 (Performance)
+        "isrc", "upc", "quantity", "revenue",         # row 3 (Performance)
+        "sales_type", "content_type", "label_name",   # row 4 (Segments, optional)
     ]
 
     nice_label = {
@@ -203,6 +107,9 @@ with st.form("mapping_form", clear_on_submit=False):
         "upc":             "UPC",
         "quantity":        "Quantity (streams/units)",
         "revenue":         "Revenue",
+        "sales_type":      "Sales Type (optional)",
+        "content_type":    "Content Type (optional)",
+        "label_name":      "Label (optional)",
     }
 
     help_text = {
@@ -216,6 +123,9 @@ with st.form("mapping_form", clear_on_submit=False):
         "upc":             "Release identifier (UPC/EAN)",
         "quantity":        "Streams / Units",
         "revenue":         "Net/Gross amount",
+        "sales_type":      "Stream / Download / … — lets the dashboard compare like with like",
+        "content_type":    "Audio / Video / …",
+        "label_name":      "Record label / imprint",
     }
 
     all_cols = list(df.columns)
@@ -253,7 +163,7 @@ with st.form("mapping_form", clear_on_submit=False):
 
     # Row 3 — Performance
     r3 = st.columns(4)
-    for i, key in enumerate(order[6:]):
+    for i, key in enumerate(order[6:10]):
         default = initial.get(key)
         idx = base_options.index(default) if default in all_cols else 0
         with r3[i]:
@@ -265,16 +175,43 @@ with st.form("mapping_form", clear_on_submit=False):
             selections[key] = pick
             chosen.add(pick)
 
+    # Row 4 — Segments (optional: left empty when the report has no such column)
+    r4 = st.columns(3)
+    for i, key in enumerate(order[10:]):
+        default = initial.get(key)
+        idx = base_options.index(default) if default in all_cols else 0
+        with r4[i]:
+            pick = st.selectbox(nice_label[key], base_options, index=idx, help=help_text[key], key=f"sel_{key}")
+        if pick != "-- Select column --":
+            if pick in chosen: dup = True
+            selections[key] = pick
+            chosen.add(pick)
+
     # Validation messages
     if missing:
         st.warning("Missing fields: " + ", ".join(nice_label[k] for k in missing))
     if dup:
         st.error("Please make sure each field has a unique column. Please fix duplicates.")
+    if not missing and not dup:
+        # data check of these columns on the first rows: a wrong column shows up before the dashboard is built
+        check = preview_quality(df, selections)
+        issues = quality_issues(check)
+        if not issues:
+            st.caption(f"✅ Data check of the first {check['rows']:,} rows: no issues found with these columns.")
+        else:
+            with st.expander(f"⚠️ Data check of the first {check['rows']:,} rows: {len(issues)} potential issue(s) "
+                             "— please review the columns above", expanded=True):
+                st.dataframe(
+                    pd.DataFrame([{"Check": title, "Rows": f"{n:,}", "What it means": text} for title, n, text in issues]),
+                    hide_index=True, use_container_width=True,
+                )
+                st.caption("Changed a column? Press “Check data” to run the check again.")
 
     # Navigation
-    c1, c2 = st.columns([1, 1])
+    c1, c2, c3 = st.columns([1, 1, 1])
     back_btn    = c1.form_submit_button("⬅️ Back to Upload File", use_container_width=True)
-    confirm_btn = c2.form_submit_button("Go to dashboard", type="primary", use_container_width=True)
+    c2.form_submit_button("Check data", use_container_width=True)     # submits the form: the check above re-runs
+    confirm_btn = c3.form_submit_button("Go to dashboard", type="primary", use_container_width=True)
 
 # Button handling
 if back_btn:
@@ -283,14 +220,26 @@ if back_btn:
 if confirm_btn:
     missing_now = [k for k in REQUIRED_FIELDS if k not in selections]
     dup_now = len(selections.values()) != len(set(selections.values()))
-    if missing_now or dup_now:
+    # a large file is read once (then its temporary copy is deleted) — remapping needs a new upload
+    source = st.session_state.get("stream_source")
+    reread_now = source is not None and source.mapping not in (None, selections)
+    if missing_now or dup_now or reread_now:
         if missing_now:
             st.warning("Missing fields: " + ", ".join(nice_label[k] for k in missing_now))
         if dup_now:
             st.error("Some columns are assigned to multiple fields. Please fix duplicates.")
+        if reread_now:
+            st.error("This large file was already read with another column mapping. "
+                     "Please upload it again to change the mapping.")
     else:
         st.session_state["mapped_fields"] = selections
         st.session_state["mapping"] = selections
+        # remember confirmed headers so the next report with the same layout maps instantly
+        get_mapping_store().remember(df.columns, selections)
+        digest = st.session_state.get("dataset_digest") or frame_digest(df)
+        st.session_state["dataset_digest"] = digest
+        st.session_state["df_norm"] = prepare_in_background(df, selections, digest, st.session_state.get("stream_source"))
+        st.session_state["df_norm_mapping"] = selections
         st.success("Mapping confirmed!")
         st.switch_page("pages/2_📈_Dashboard.py")
 
@@ -1,18 +1,39 @@
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
+import numpy as np
 import re
-from typing import List, Tuple
+from typing import List
 import textwrap as _tw
 import streamlit.components.v1 as components  # JS-fallback
 
+from analyzer.aggregate import RPM_MIN_STREAMS, top_k, top_k_indices
+from analyzer.cache import get_result_cache
+from analyzer.compare import compare_views, default_periods, metric_deltas, month_order, period_step
+from analyzer.concentration import TARGET_SHARE, concentration
+from analyzer.dataset import get_normalized, quality_report
+from analyzer.drill import drill_rows
+from analyzer.export import (
+    ARROW_MIME, METRIC_COLUMNS, PARQUET_MIME, XLSX_MIME, build_workbook, dataset_table, summary_csv, summary_table,
+    to_arrow_ipc, to_parquet,
+)
+from analyzer.forecast import FORECAST_TABS, MAX_HORIZON, MIN_MONTHS, forecast_table, forecast_view, recent_months
+from analyzer.jobs import Job
+from analyzer.sketches import ALL, build_sketches, catalog_summary, selection_group
+from analyzer.startup import prewarm
+from analyzer.validation import quality_issues
+from analyzer.views import TABS, filter_options, kpi_summary, segment_columns, segment_summary, tab_top, tab_view
+
 # Try Plotly; fallback to Matplotlib if not available
 try:
     import plotly.express as px
 except Exception:
     px = None
 
+def _pyplot():
+    """Matplotlib is only used without Plotly, so it is imported on first use (~0.5 s at startup)."""
+    import matplotlib.pyplot as plt
+    return plt
+
 import html  # HTML-escaping to prevent XSS in dynamic HTML
 def _safe_str(x) -> str:
     """Convert to string and escape HTML special chars (None -> '')."""
@@ -26,6 +47,7 @@ DEFAULT_SHOW_PCT = True       # show share of total (no checkbox)
 SHOW_CHART_TITLE = False      # chart title hidden
 
 st.set_page_config(layout="wide")
+prewarm()
 st.markdown(
     """
     <style>
@@ -146,14 +168,26 @@ if raw_df is None or mapping is None:
     st.warning("Please upload and map your report first.")
     st.stop()
 
-df = raw_df.copy()
-df.columns = df.columns.map(lambda c: str(c).strip())
-rename_map = {orig: canon for canon, orig in mapping.items() if orig in df.columns}
-df = df.rename(columns=rename_map)
+# Background preparation (started by app.py / mapping page) — poll it, allow cancel
+@st.fragment(run_every=0.5)
+def _wait_for_prepare():
+    job = st.session_state.get("df_norm")
+    if not isinstance(job, Job) or job.done:
+        st.rerun()
+    st.info(f"⏳ Preparing your dashboard — {job.message} ({job.progress:.0%})")
+    if st.button("Cancel", key="prepare_cancel"):
+        job.cancel()
+        st.session_state.pop("df_norm", None)
+        st.switch_page("app.py")
+
+_pending = st.session_state.get("df_norm")
+if isinstance(_pending, Job) and not _pending.done:
+    _wait_for_prepare()
+    st.stop()
 
-for col in ("revenue", "quantity"):
-    if col in df.columns:
-        df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0)
+# normalized once per upload/mapping (usually already prepared in the background)
+df = get_normalized(st.session_state, raw_df, mapping)
+DATASET_KEY = st.session_state["dataset_key"]
 
 required_for_page = ["platform", "country", "artist_name", "release_title", "track_title", "quantity", "revenue"]
 missing_now = [c for c in required_for_page if c not in df.columns]
@@ -167,15 +201,9 @@ st.title("📈 Music Streaming Royalty Analyzer")
 
 # ─────────────────────────────────────────────────────────
 # Helpers
-def period_label_from_reporting_month(frame: pd.DataFrame) -> str:
-    if "reporting_month" not in frame.columns:
-        return "—"
-    ser = pd.to_datetime(frame["reporting_month"], errors="coerce").dropna()
-    if ser.empty:
-        return "—"
-    start, end = ser.min(), ser.max()
-    fmt = "%m.%Y"
-    return start.strftime(fmt) if start.to_period("M") == end.to_period("M") else f"{start.strftime(fmt)}–{end.strftime(fmt)}"
+def cached(key: tuple, compute):
+    """Result shared by all sessions viewing the same dataset (computed once per server process)."""
+    return get_result_cache().get_or_compute((DATASET_KEY,) + key, compute)
 
 def fmt_int(x: float) -> str:
     try: return f"{int(round(x)):,}".replace(",", " ")
@@ -207,129 +235,12 @@ def fmt_pct(p: float) -> str:
 USE_GRADIENT = False
 FONT = {"base":14,"y_tick":16,"bar_text":14,"title":18}
 
-# ── Code-handling logic (disambiguation, normalization) ─────────────────────────
-CODE_KEYS = {"isrc", "upc"}                 # only codes (without *_id)
-MISSING_LABEL = "NaN"                       # label for empty code
-DISAMBIG_MODE = "full"                      # "full" - show full code; "tail"  only tail
-DISAMBIG_TAIL_LEN = 6
-RPM_MIN_STREAMS = 1000
-
-def _is_code_key(name: str) -> bool:
-    return str(name).lower() in CODE_KEYS
-
-def _normalize_code_series(s: pd.Series) -> pd.Series:
-    # keep true missing values, empty strings -> <NA>
-    s = pd.Series(s, dtype="string")
-    s = s.str.strip().str.upper().str.replace(r"[^A-Z0-9]", "", regex=True)
-    s = s.replace("", pd.NA)
-    return s
-
-def aggregate_for_dim(df_src: pd.DataFrame, dim: str) -> pd.DataFrame:
-    return df_src.groupby(dim, as_index=False).agg(quantity=('quantity','sum'), revenue=('revenue','sum'))
-
-def resolve_dim_keys(analysis_type: str, frame: pd.DataFrame) -> Tuple[str, str, str]:
-    if analysis_type == "Platforms": return "platform", "platform", "Top Platforms"
-    if analysis_type == "Countries": return "country", "country", "Top Countries"
-    if analysis_type == "Artists":   return "artist_name", "artist_name", "Top Artists"
-    if analysis_type == "Releases":
-        if "upc" in frame.columns and frame["upc"].notna().any():
-            return "upc", "release_title", "Top Releases"
-        return "release_title", "release_title", "Top Releases"
-    # Tracks
-    if "isrc" in frame.columns and frame["isrc"].notna().any():
-        return "isrc", "track_title", "Top Tracks"
-    return "track_title", "track_title", "Top Tracks"
-
-def aggregate_with_labels(df_src: pd.DataFrame, key_col: str, label_col: str) -> pd.DataFrame:
-    if key_col not in df_src.columns: key_col = label_col
-    tmp = df_src.copy()
-    group_key = key_col
-
-    # code key → normalize and group with dropna=False (to keep NaN group)
-    if _is_code_key(key_col):
-        tmp["_key_norm"] = _normalize_code_series(tmp[key_col])
-        group_key = "_key_norm"
-
-    agg = tmp.groupby(group_key, dropna=False, as_index=False).agg(
-        quantity=('quantity','sum'),
-        revenue=('revenue','sum')
-    )
-    if group_key != key_col:
-        agg = agg.rename(columns={group_key: key_col})
-
-    # labels
-    if key_col == label_col or label_col not in tmp.columns:
-        agg["label"] = agg[key_col].astype("string").fillna(MISSING_LABEL)
-    else:
-        labels = tmp[[group_key, label_col]].copy()
-        if group_key != key_col:
-            labels = labels.rename(columns={group_key: key_col})
-        labels = (
-            labels
-            .dropna(subset=[key_col, label_col])
-            .drop_duplicates(subset=[key_col])
-            .rename(columns={label_col: "label"})
-        )
-        agg = agg.merge(labels, on=key_col, how="left")
-        agg["label"] = agg["label"].astype("string")
-        agg.loc[agg["label"].isna(), "label"] = agg[key_col].astype("string")
-        agg["label"] = agg["label"].fillna(MISSING_LABEL)
-
-    # rpm
-    agg["rpm"] = agg.apply(lambda r: (r["revenue"]/r["quantity"]*1000) if r["quantity"] > 0 else 0, axis=1)
-    return agg
-
-def top3_labels_by_revenue(frame: pd.DataFrame, key_col: str, label_col: str) -> List[str]:
-    if key_col not in frame.columns: key_col = label_col
-    tmp = frame.copy()
-    group_key = key_col
-
-    if _is_code_key(key_col):
-        tmp["_key_norm"] = _normalize_code_series(tmp[key_col])
-        group_key = "_key_norm"
-
-    agg = tmp.groupby(group_key, dropna=False, as_index=False).agg(revenue=('revenue','sum'))
-    if agg.empty: return []
-
-    total = float(agg["revenue"].sum()) or 1.0
-
-    if key_col == label_col or label_col not in tmp.columns:
-        agg["label"] = agg[group_key].astype("string").fillna(MISSING_LABEL)
-    else:
-        labels = (
-            tmp[[group_key, label_col]]
-            .dropna(subset=[group_key, label_col])
-            .drop_duplicates(subset=[group_key])
-            .rename(columns={label_col: "label"})
-        )
-        agg = agg.merge(labels, on=group_key, how="left")
-        agg["label"] = agg["label"].astype("string")
-        agg.loc[agg["label"].isna(), "label"] = agg[group_key].astype("string")
-        agg["label"] = agg["label"].fillna(MISSING_LABEL)
-
-    agg = agg.sort_values("revenue", ascending=False).head(3)
-    return [f'{row["label"]} ({row["revenue"]/total:.0%})' for _, row in agg.iterrows()]
-
-def _disambiguate_labels(frame: pd.DataFrame, key_col: str, label_col: str = "label") -> pd.DataFrame:
-    df2 = frame.copy()
-    if key_col not in df2.columns or label_col not in df2.columns: return df2
-    dup_mask = df2[label_col].astype("string").duplicated(keep=False)
-    if dup_mask.any():
-        raw = df2[key_col].astype("string")
-        clean = raw.fillna("").str.replace(r"[^A-Za-z0-9]", "", regex=True).str.upper()
-        if DISAMBIG_MODE == "full":
-            code_show = clean
-        else:
-            code_show = clean.str[-max(1, int(DISAMBIG_TAIL_LEN)):]
-        # add tail only where key is not empty
-        add_mask = dup_mask & raw.notna() & (clean != "")
-        df2.loc[add_mask, label_col] = df2.loc[add_mask, label_col].astype("string") + " • " + code_show[add_mask]
-    return df2
-
 # ── Chart renderers ──────────────────────────────────────
 FIG_W, FIG_H = 9.0, 4.3
 
 def make_top_barplot_mpl(data: pd.DataFrame, y_col: str, title: str, metric: str, show_pct: bool, total_value: float):
+    import seaborn as sns
+    plt = _pyplot()
     fig, ax = plt.subplots(figsize=(FIG_W, FIG_H))
     sns.barplot(data=data, x="metric_value", y=y_col, hue=y_col, palette="Greens_r", dodge=False, ax=ax)
     leg = ax.get_legend();  leg.remove() if leg else None
@@ -354,25 +265,21 @@ def make_top_barplot_mpl(data: pd.DataFrame, y_col: str, title: str, metric: str
     fig.subplots_adjust(right=0.92, top=0.94 if SHOW_CHART_TITLE else 0.88)
     st.pyplot(fig, use_container_width=False)
 
-def make_top_barplot(df_src: pd.DataFrame, key_col: str, label_col: str, title: str,
-                     top_n: int, metric: str, show_pct: bool, total_value: float):
-    data = aggregate_with_labels(df_src, key_col, label_col)
-    data = _disambiguate_labels(data, key_col, "label")
-
+def make_top_barplot(data: pd.DataFrame, title: str,
+                     metric: str, show_pct: bool, total_value: float, key: str | None = None):
+    # data: the top_n entries, largest first (views.tab_top; shared cache entry — never modified in place)
+    # returns (bars shown, clicked row or None) — clicking a bar drills down into it
     if metric == "Earnings":
-        data["metric_value"] = data["revenue"]; xfmt = ":,.0f"
+        metric_col = "revenue"; xfmt = ":,.0f"
     elif metric == "Streams":
-        data["metric_value"] = data["quantity"]; xfmt = ":,.0f"
+        metric_col = "quantity"; xfmt = ":,.0f"
     else:
-        data["metric_value"] = data["rpm"];      xfmt = ":,.2f"
-
-    if metric == "Value per 1K Streams":
-        data = data[data["quantity"] >= RPM_MIN_STREAMS]
+        metric_col = "rpm";      xfmt = ":,.2f"
 
-    data = data.sort_values("metric_value", ascending=False).head(top_n)
+    data = data.assign(metric_value=data[metric_col])
     if data.empty:
         st.info(f"No items with ≥{RPM_MIN_STREAMS:,} streams for the selected filters.")
-        return
+        return data, None
 
     data = data.assign(
         label_wrapped=data["label"].map(lambda s: wrap_label(s, 32)),
@@ -382,7 +289,7 @@ def make_top_barplot(df_src: pd.DataFrame, key_col: str, label_col: str, title:
     if px is None:
         data_for_mpl = data.rename(columns={"label_wrapped": "label"})
         make_top_barplot_mpl(data_for_mpl, "label", title if SHOW_CHART_TITLE else "", metric, DEFAULT_SHOW_PCT, total_value)
-        return
+        return data, None
 
     if metric == "Earnings":
         base_txt = data["metric_value"].map(fmt_amt)
@@ -454,24 +361,112 @@ def make_top_barplot(df_src: pd.DataFrame, key_col: str, label_col: str, title:
     fig.update_yaxes(title=None, categoryorder="total ascending",
                      automargin=True, tickfont=dict(size=FONT["y_tick"]))
 
-    st.plotly_chart(
+    event = st.plotly_chart(
         fig,
         use_container_width=True,
         config={"displayModeBar": False, "scrollZoom": False, "doubleClick": False},
+        on_select="rerun", selection_mode="points", key=key,
+    )
+    points = (event or {}).get("selection", {}).get("points", []) if key else []
+    idx = points[0].get("point_index") if points else None
+    return data, (data.iloc[idx] if idx is not None and 0 <= idx < len(data) else None)
+
+def make_delta_barplot(data: pd.DataFrame, metric: str):
+    # data: metric_deltas() rows to show; bars are the change, green up / red down
+    fmt = fmt_amt if metric == "Earnings" else (fmt_int if metric == "Streams" else (lambda v: f"{v:,.2f}"))
+    text = data["delta"].map(lambda v: ("+" if v > 0 else "") + fmt(v)) + data["growth"].map(
+        lambda g: "" if pd.isna(g) else f" ({g:+.0%})")
+    colors = ["#059669" if v >= 0 else "#dc2626" for v in data["delta"]]
+    labels = data["label"].map(lambda s: wrap_label(s, 32))
+
+    if px is None:
+        plt = _pyplot()
+        fig, ax = plt.subplots(figsize=(FIG_W, max(FIG_H, 0.45 * len(data))))
+        ax.barh(labels[::-1], data["delta"][::-1], color=colors[::-1])
+        for i, (v, t) in enumerate(zip(data["delta"][::-1], text[::-1])):
+            ax.text(v, i, " " + t + " ", va="center", ha="left" if v >= 0 else "right", fontsize=FONT["bar_text"])
+        ax.axvline(0, color="#9ca3af", linewidth=1)
+        for side in ["top", "right", "bottom", "left"]: ax.spines[side].set_visible(False)
+        ax.set_xticks([])
+        plt.tight_layout()
+        st.pyplot(fig, use_container_width=False)
+        return
+
+    fig = px.bar(data.assign(label_wrapped=labels), x="delta", y="label_wrapped", orientation="h", text=text)
+    fig.update_traces(
+        marker_color=colors, marker_line_width=0, cliponaxis=False, textposition="outside",
+        textfont=dict(size=FONT["bar_text"]),
+        customdata=data[["label", "prev", "current"]].values,
+        hovertemplate="<b>%{customdata[0]}</b><br>Previous: %{customdata[1]:,.2f}<br>"
+                      "Current: %{customdata[2]:,.2f}<br>Change: %{x:,.2f}<extra></extra>",
     )
+    span = float(data["delta"].abs().max() or 1)
+    fig.update_layout(
+        font=dict(size=FONT["base"]), showlegend=False, dragmode=False,
+        margin=dict(l=8, r=120, t=4, b=6), height=max(300, 60 + 34 * len(data)),
+        plot_bgcolor="white", paper_bgcolor="rgba(0,0,0,0)",
+    )
+    fig.update_xaxes(visible=False, range=[-span * 1.35, span * 1.35])
+    fig.update_yaxes(title=None, autorange="reversed", automargin=True, tickfont=dict(size=FONT["y_tick"]))
+    st.plotly_chart(fig, use_container_width=True, config={"displayModeBar": False, "scrollZoom": False, "doubleClick": False})
+
+def make_pareto_chart(curve: pd.DataFrame, metric: str, key: str):
+    # cumulative share of the metric vs share of entries (largest first); dotted line = equal split
+    color = PALETTE.get(metric, "#2563eb")
+    if px is None:
+        plt = _pyplot()
+        fig, ax = plt.subplots(figsize=(FIG_W, FIG_H * 0.8))
+        ax.plot(curve["entries"] * 100, curve["share"] * 100, color=color, linewidth=2)
+        ax.plot([0, 100], [0, 100], color="#9ca3af", linewidth=1, linestyle=":")
+        ax.set_xlabel("% of entries (largest first)"); ax.set_ylabel(f"% of {metric.lower()}")
+        for side in ["top", "right"]: ax.spines[side].set_visible(False)
+        plt.tight_layout()
+        st.pyplot(fig, use_container_width=False)
+        return
+
+    fig = px.area(curve.assign(entries=curve["entries"] * 100, share=curve["share"] * 100), x="entries", y="share")
+    fig.update_traces(line_color=color, hovertemplate="Top %{x:.1f}% → %{y:.1f}%<extra></extra>")
+    fig.add_shape(type="line", x0=0, y0=0, x1=100, y1=100, line=dict(color="#9ca3af", width=1, dash="dot"))
+    fig.update_layout(
+        font=dict(size=FONT["base"]), dragmode=False, showlegend=False,
+        margin=dict(l=8, r=8, t=4, b=6), height=280, plot_bgcolor="white", paper_bgcolor="rgba(0,0,0,0)",
+    )
+    fig.update_xaxes(title="% of entries (largest first)", range=[0, 100], ticksuffix="%")
+    fig.update_yaxes(title=f"% of {metric.lower()}", range=[0, 100], ticksuffix="%", gridcolor="#f1f5f9")
+    st.plotly_chart(fig, use_container_width=True, config={"displayModeBar": False, "scrollZoom": False, "doubleClick": False}, key=key)
+
+def make_forecast_chart(months: list, actual: np.ndarray, future: list, projected: np.ndarray, metric: str):
+    # monthly totals: solid actuals, dashed projection continuing from the last actual month
+    color = PALETTE.get(metric, "#1f77b4")
+    if px is None:
+        plt = _pyplot()
+        fig, ax = plt.subplots(figsize=(FIG_W, FIG_H))
+        ax.plot(months, actual, color=color, linewidth=2)
+        ax.plot([months[-1]] + future, np.r_[actual[-1], projected], color=color, linewidth=2, linestyle="--")
+        ax.tick_params(axis="x", labelrotation=45)
+        for side in ["top", "right"]: ax.spines[side].set_visible(False)
+        plt.tight_layout()
+        st.pyplot(fig, use_container_width=False)
+        return
+
+    data = pd.DataFrame({
+        "month": months + [months[-1]] + future,
+        "value": np.r_[actual, actual[-1], projected],
+        "series": ["Actual"] * len(months) + ["Projected"] * (len(future) + 1),
+    })
+    fig = px.line(data, x="month", y="value", color="series", line_dash="series",
+                  color_discrete_map={"Actual": color, "Projected": color})
+    fig.update_layout(
+        font=dict(size=FONT["base"]), dragmode=False, legend_title_text="",
+        margin=dict(l=8, r=8, t=4, b=6), height=320, plot_bgcolor="white", paper_bgcolor="rgba(0,0,0,0)",
+    )
+    fig.update_xaxes(title=None, type="category")
+    fig.update_yaxes(title=None, gridcolor="#f1f5f9")
+    st.plotly_chart(fig, use_container_width=True, config={"displayModeBar": False, "scrollZoom": False, "doubleClick": False})
 
 def _slug(s: str) -> str:
     return re.sub(r"[^a-z0-9]+", "_", str(s).lower()).strip("_")
 
-def detect_currency_hint(frame: pd.DataFrame) -> str:
-    if "currency" in frame.columns:
-        vals = [str(x).upper() for x in frame["currency"].dropna().unique().tolist()]
-        if len(vals) == 1: return f"currency: {vals[0]}"
-        elif len(vals) > 1:
-            preview = ", ".join(sorted(vals[:3])); suffix = "…" if len(vals) > 3 else ""
-            return f"mixed currencies ({preview}{suffix})"
-    return "in report currency (e.g., $ € £)"
-
 def render_value_card(label: str, value: str, hint: str | None = None) -> str:
     # SAFE: escape user-provided text before inserting into HTML
     label_safe = _safe_str(label)
@@ -498,21 +493,41 @@ def render_list_card(title: str, lines: List[str]) -> str:
         '</div>'
     )
 
+def render_data_check(report: dict):
+    """Data quality report counted at ingestion: one line when clean, details in an expander otherwise."""
+    rows = report["rows"]
+    issues = quality_issues(report)
+    if not issues:
+        st.caption(f"✅ Data check: {fmt_int(rows)} rows, no issues found.")
+        return
+    with st.expander(f"⚠️ Data check: {len(issues)} potential issue(s) in {fmt_int(rows)} rows — totals may be affected"):
+        table = pd.DataFrame(
+            [{"Check": title, "Rows": fmt_int(n), "Share": fmt_pct(n / max(rows, 1)), "What it means": text}
+             for title, n, text in issues]
+        )
+        st.dataframe(table, hide_index=True, use_container_width=True)
+        if report["duplicate_rows"] is None:
+            st.caption("Duplicate rows are not checked for large files read in chunks.")
+
+# ─────────────────────────────────────────────────────────
+# DATA CHECK
+_quality = quality_report(raw_df, df, mapping, st.session_state["dataset_digest"], st.session_state.get("stream_source"))
+if _quality is not None:
+    render_data_check(_quality)
+
 # ─────────────────────────────────────────────────────────
 # SUMMARY (KPI)
-period_global = period_label_from_reporting_month(df)
-total_streams_global = float(df["quantity"].sum()) if not df.empty else 0.0
-total_revenue_global = float(df["revenue"].sum()) if not df.empty else 0.0
-_currency_hint = detect_currency_hint(df)
+summary = cached(("summary",), lambda: kpi_summary(df))
+period_global = summary["period"]
+total_streams_global = summary["streams"]
+total_revenue_global = summary["revenue"]
+_currency_hint = summary["currency_hint"]
 
 st.markdown(f'<div class="rp-caption">Report period: {_safe_str(period_global)}</div>', unsafe_allow_html=True)
 
-# KPI by tracks: key only isrc or title (without track_id)
-_track_key_for_kpi = "isrc" if "isrc" in df.columns and df["isrc"].notna().any() else "track_title"
-
-top_platform_lines = top3_labels_by_revenue(df, "platform", "platform")
-top_country_lines  = top3_labels_by_revenue(df, "country", "country")
-top_track_lines    = top3_labels_by_revenue(df, _track_key_for_kpi, "track_title")
+top_platform_lines = summary["top_platforms"]
+top_country_lines  = summary["top_countries"]
+top_track_lines    = summary["top_tracks"]
 
 kpi_html = (
     '<div class="kpi-row">'
@@ -524,6 +539,29 @@ kpi_html = (
     + '</div>'
 )
 st.markdown(kpi_html, unsafe_allow_html=True)
+
+# SEGMENTS (sales type, content type, label): value per 1K streams within each segment
+SEGMENT_NAMES = {"sales_type": "Sales type", "content_type": "Content type", "label_name": "Label"}
+segments = segment_columns(df)
+
+def render_segments(cols: list):
+    names = ", ".join(SEGMENT_NAMES[c].lower() for c in cols)
+    with st.expander(f"🧩 Segments — earnings and value per 1K streams by {names}"):
+        for col, box in zip(cols, st.columns(len(cols))):
+            seg = cached(("segments", col), lambda: segment_summary(df, col))
+            with box:
+                st.dataframe(
+                    pd.DataFrame({
+                        SEGMENT_NAMES[col]: seg[col].astype("string"),
+                        "Streams": seg["quantity"].map(fmt_int),
+                        "Earnings": seg["revenue"].map(fmt_amt),
+                        "Value per 1K": seg["rpm"].map(fmt_amt),
+                    }),
+                    hide_index=True, use_container_width=True,
+                )
+
+if segments:
+    render_segments(segments)
 st.markdown('<div class="after-kpi-space"></div>', unsafe_allow_html=True)
 st.markdown('<hr class="hr-line hr-after-kpi">', unsafe_allow_html=True)
 
@@ -534,13 +572,18 @@ FILTERS = {
     "artist":   ("Artist", "artist_name", "All artists"),
     "release":  ("Release", "release_title", "All releases"),
     "track":    ("Track", "track_title", "All tracks"),
+    # segments: shown only when mapped (see analyzer.views.SEGMENT_DIMS)
+    "sales_type":   ("Sales type", "sales_type", "All sales types"),
+    "content_type": ("Content type", "content_type", "All content types"),
+    "label":        ("Label", "label_name", "All labels"),
 }
+SEGMENT_FILTERS = ["sales_type", "content_type", "label"]
 FILTER_SET = {
-    "Platforms": ["artist", "country"],
-    "Countries": ["platform", "artist"],
-    "Artists":   ["platform", "country"],
-    "Releases":  ["platform", "country"],
-    "Tracks":    ["platform", "country"],
+    "Platforms": ["artist", "country"] + SEGMENT_FILTERS,
+    "Countries": ["platform", "artist"] + SEGMENT_FILTERS,
+    "Artists":   ["platform", "country"] + SEGMENT_FILTERS,
+    "Releases":  ["platform", "country"] + SEGMENT_FILTERS,
+    "Tracks":    ["platform", "country"] + SEGMENT_FILTERS,
 }
 
 HELP = {
@@ -551,19 +594,226 @@ HELP = {
     "artist":  "Filter by artist/performer.",
     "release": "Filter by release (album/EP/single).",
     "track":   "Filter by track/song.",
-    "reset":   "Clear all filters on this tab."
+    "sales_type":   "Stream, download, … — value per 1K streams is only comparable within one sales type.",
+    "content_type": "Audio, video, … as reported by the distributor.",
+    "label":   "Filter by record label.",
+    "reset":   "Clear all filters on this tab.",
+    "typed":   "Typed columns for data pipelines: categories, int64 streams, float earnings, monthly dates.",
+    "compare": "Compare two ranges of reporting months: change, growth and new / lost entries in every tab.",
+    "gini":    "0 = every entry earns the same, 1 = one entry earns everything.",
+    "forecast":"Projection from each entity's monthly history (seasonal once there are two years of data).",
 }
 
 def _k(tab: str, base: str) -> str:  # namespaced keys
     return f"{tab}__{base}"
 
+# ── DRILL-DOWN (shared by all tabs) ──────────────────────
+# Clicking a bar adds a (column, value) step; every tab then shows only that slice.
+# Row selections are cached per path prefix, so each step only scans its parent's rows.
+st.session_state.setdefault("drill", [])        # [{"col", "val", "label"}, ...]
+st.session_state.setdefault("drill_rev", 0)     # bumped on change → fresh chart widgets (clears the click)
+if st.session_state.get("drill_dataset") != DATASET_KEY:
+    st.session_state["drill"], st.session_state["drill_dataset"] = [], DATASET_KEY
+    for _key in ("compare_on", "compare_prev", "compare_cur"):
+        st.session_state.pop(_key, None)
+
+def _drill_path() -> tuple:
+    return tuple((d["col"], d["val"]) for d in st.session_state["drill"])
+
+def _rows(selection: tuple):
+    """Row positions of a drill path + tab filters (None = whole dataset)."""
+    return drill_rows(df, selection, get_result_cache(), (DATASET_KEY,))
+
+def _set_drill(steps: list):
+    st.session_state["drill"] = steps
+    st.session_state["drill_rev"] += 1
+
+def _drill_into(col: str, val, label: str):
+    steps = [d for d in st.session_state["drill"] if d["col"] != col]   # same dimension → replace
+    _set_drill(steps + [{"col": col, "val": val, "label": str(label)}])
+
+def render_full_export():
+    """
+    Workbook with KPIs and every tab, plus the row-level data as Parquet / Arrow,
+    for the current drill-down (built on click, cached).
+    """
+    path = _drill_path()
+    selection = " › ".join(d["label"] for d in st.session_state["drill"])
+    c_xlsx, c_parquet, c_arrow = st.columns([2, 1, 1], gap="small")
+    with c_xlsx:
+        st.download_button(
+            label="⬇️ Download full report (XLSX: summary, platforms, countries, artists, releases, tracks)",
+            data=lambda: cached(("xlsx", path), lambda: build_workbook(df, _rows(path), selection)),
+            file_name="royalty_report.xlsx",
+            mime=XLSX_MIME,
+            use_container_width=True,
+            key="download_xlsx",
+        )
+    with c_parquet:
+        st.download_button(
+            label="⬇️ Row-level data (Parquet)",
+            data=lambda: cached(("rows_parquet", path), lambda: to_parquet(dataset_table(df, _rows(path)))),
+            file_name="royalty_rows.parquet",
+            mime=PARQUET_MIME,
+            use_container_width=True,
+            key="download_rows_parquet",
+            help=HELP["typed"],
+        )
+    with c_arrow:
+        st.download_button(
+            label="⬇️ Row-level data (Arrow)",
+            data=lambda: cached(("rows_arrow", path), lambda: to_arrow_ipc(dataset_table(df, _rows(path)))),
+            file_name="royalty_rows.arrow",
+            mime=ARROW_MIME,
+            use_container_width=True,
+            key="download_rows_arrow",
+            help=HELP["typed"],
+        )
+
+def render_drill_bar():
+    steps = st.session_state["drill"]
+    if not steps:
+        st.caption("Tip: click a bar to drill down — all tabs then show only that slice.")
+        return
+    crumbs = " › ".join(["All"] + [html.escape(d["label"], quote=True) for d in steps])
+    c_path, c_up, c_clear = st.columns([4, 1, 1], gap="small")
+    with c_path:
+        st.markdown(f'<div class="flt-guide">Drill-down: {crumbs}</div>', unsafe_allow_html=True)
+    with c_up:
+        st.button("⬅️ Up one level", use_container_width=True, key="drill_up",
+                  on_click=_set_drill, args=(steps[:-1],))
+    with c_clear:
+        st.button("✖ Clear drill-down", use_container_width=True, key="drill_clear",
+                  on_click=_set_drill, args=([],))
+
+# ── CATALOG REACH (shared by all tabs) ───────────────────
+# Distinct counts come from the sketches built at ingestion (exact for one dataset): all rows,
+# or one platform / country drill-down, are answered directly; deeper drill-downs sketch their rows once.
+CATALOG_CARDS = [
+    ("tracks", "Unique tracks", "Distinct tracks (by ISRC, else by title)."),
+    ("releases", "Unique releases", "Distinct releases (by UPC, else by title)."),
+    ("earning_isrcs", "Earning ISRCs", "Distinct valid ISRCs with earnings above zero."),
+]
+
+def render_catalog_kpis():
+    path = _drill_path()
+    group = selection_group(path)
+    if group is not None:
+        sketches = cached(("sketches",), lambda: build_sketches(df))
+    else:
+        sketches, group = cached(("sketches", path), lambda: build_sketches(df, _rows(path))), ALL
+    counts = catalog_summary(sketches, group)
+    cards = [card for card in CATALOG_CARDS if card[0] in counts]
+    for pane, (name, title, text) in zip(st.columns(len(cards) or 1), cards):
+        c = counts[name]
+        if c["error_95"] > 0:
+            pane.metric(title, "≈ " + fmt_int(c["estimate"]),
+                        help=f"{text} Estimated from a HyperLogLog sketch: ±{c['error_95']:.1%} (95% confidence).")
+        else:
+            pane.metric(title, fmt_int(c["estimate"]), help=text)
+
+# ── PERIOD COMPARISON (shared by all tabs) ───────────────
+# Each period is one more drill step (a set of months), so both sides are cached tab views.
+MONTHS = cached(("months",), lambda: month_order(df))
+
+def _month_span(lo: str, hi: str) -> tuple:
+    return tuple(MONTHS[MONTHS.index(lo): MONTHS.index(hi) + 1])
+
+def render_compare_bar():
+    """Compare toggle and the two month ranges → (previous, current) month tuples, or None."""
+    if len(MONTHS) < 2:
+        return None
+    c_toggle, c_prev, c_cur = st.columns([1, 2, 2], gap="small")
+    with c_toggle:
+        if not st.toggle("Compare periods", key="compare_on", help=HELP["compare"]):
+            return None
+    prev, cur = default_periods(MONTHS)
+    with c_prev:
+        p_lo, p_hi = st.select_slider("Previous period", MONTHS, value=(prev[0], prev[-1]), key="compare_prev")
+    with c_cur:
+        c_lo, c_hi = st.select_slider("Current period", MONTHS, value=(cur[0], cur[-1]), key="compare_cur")
+    return _month_span(p_lo, p_hi), _month_span(c_lo, c_hi)
+
+def _period_txt(months: tuple) -> str:
+    return months[0] if len(months) == 1 else f"{months[0]} – {months[-1]}"
+
+def _period_view(tab_name: str, selection: tuple, months: tuple):
+    sel = selection + (period_step(months),)
+    return cached(("tab", tab_name, sel), lambda: tab_view(df, tab_name, (), _rows(sel)))
+
+def render_comparison(tab_name: str, selection: tuple, metric: str, top_n: int, periods: tuple):
+    """Change between two periods for this tab's selection: totals, biggest movers, new / lost entries."""
+    prev, cur = periods
+    prev_view, cur_view = _period_view(tab_name, selection, prev), _period_view(tab_name, selection, cur)
+    if prev_view is None and cur_view is None:
+        st.warning("No data in either period. Try adjusting the filters or the months.")
+        return
+    empty = prev_view or cur_view
+    empty = {"key_col": empty["key_col"], "agg": empty["agg"].iloc[:0]}
+    cmp = cached(("compare", tab_name, selection, prev, cur),
+                 lambda: compare_views(df, prev_view or empty, cur_view or empty))
+
+    metric_col = {"Earnings": "revenue", "Streams": "quantity"}.get(metric, "rpm")
+    data = metric_deltas(cmp, metric_col)
+    if metric_col == "rpm":
+        data = data[(data["quantity"] >= RPM_MIN_STREAMS) & (data["quantity_prev"] >= RPM_MIN_STREAMS)]
+        totals = [1000 * cmp["revenue" + s].sum() / max(cmp["quantity" + s].sum(), 1) for s in ("_prev", "")]
+    else:
+        totals = [cmp[metric_col + "_prev"].sum(), cmp[metric_col].sum()]
+    fmt = fmt_amt if metric == "Earnings" else (fmt_int if metric == "Streams" else (lambda v: f"{v:,.2f}"))
+    growth = (totals[1] - totals[0]) / abs(totals[0]) if totals[0] else None
+    n_new, n_lost = int((cmp["status"] == "new").sum()), int((cmp["status"] == "lost").sum())
+
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric(f"{metric}: {_period_txt(prev)}", fmt(totals[0]))
+    c2.metric(f"{metric}: {_period_txt(cur)}", fmt(totals[1]),
+              delta=None if growth is None else f"{growth:+.1%}")
+    c3.metric("New", fmt_int(n_new), help="In the current period only")
+    c4.metric("Lost", fmt_int(n_lost), help="In the previous period only")
+
+    if data.empty:
+        st.info(f"No items with ≥{RPM_MIN_STREAMS:,} streams in both periods for the selected filters.")
+        return
+    movers = data.iloc[top_k_indices(data["delta"].abs().to_numpy(), top_n)]
+    movers = movers.iloc[np.argsort(-movers["delta"].to_numpy(), kind="stable")]
+    make_delta_barplot(movers, metric)
+
+    st.download_button(
+        label="⬇️ Download comparison (CSV)",
+        data=cached(("compare_csv", tab_name, selection, prev, cur, metric),
+                    lambda: _export_comparison_csv(data, tab_name, metric, prev, cur)),
+        file_name=f"{_slug(tab_name)}_comparison.csv",
+        mime="text/csv",
+        use_container_width=True,
+        key=_k(tab_name, "download_compare"),
+    )
+
+def render_concentration(tab_name: str, selection: tuple, view: dict, metric: str):
+    """How concentrated this tab's earnings (or streams) are: Gini, top shares, Pareto curve."""
+    metric_col = "quantity" if metric == "Streams" else "revenue"
+    conc = cached(("concentration", tab_name, selection, metric_col), lambda: concentration(view["agg"], metric_col))
+    if conc is None:
+        return
+    what = "streams" if metric_col == "quantity" else "earnings"
+    plural = tab_name.lower()
+    top10_n, top10_share = conc["top"][0.10]
+    with st.expander(f"📐 Concentration — the top 10% of {plural} ({fmt_int(top10_n)}) bring {fmt_pct(top10_share)} of {what}"):
+        c1, c2, c3, c4 = st.columns(4)
+        c1.metric("Gini coefficient", f"{conc['gini']:.2f}", help=HELP["gini"])
+        c2.metric(f"Top 1% of {plural}", fmt_pct(conc["top"][0.01][1]), help=f"{fmt_int(conc['top'][0.01][0])} {plural}")
+        c3.metric(f"Top 20% of {plural}", fmt_pct(conc["top"][0.20][1]), help=f"{fmt_int(conc['top'][0.20][0])} {plural}")
+        c4.metric(f"{TARGET_SHARE:.0%} of {what} from", f"{fmt_int(conc['needed'])} {plural}",
+                  help=f"{fmt_pct(conc['needed_share'])} of {fmt_int(conc['entries'])} {plural}")
+        make_pareto_chart(conc["curve"], "Streams" if metric_col == "quantity" else "Earnings", key=f"{tab_name}__pareto")
+
 # ─────────────────────────────────────────────────────────
-def render_tab(tab_name: str):
-    desired = FILTER_SET.get(tab_name, [])
+def render_tab(tab_name: str, periods: tuple | None = None):
+    # segment filters only when the report has that column
+    desired = [f for f in FILTER_SET.get(tab_name, []) if f not in SEGMENT_FILTERS or FILTERS[f][1] in segments]
     plural  = {"Platforms":"Platforms","Countries":"Countries","Artists":"Artists","Releases":"Releases","Tracks":"Tracks"}.get(tab_name,"Items")
 
     # defaults only for filters (NOT for metric/topn!)
-    for fkey in ["platform","country","artist","release","track"]:
+    for fkey in FILTERS:
         st.session_state.setdefault(_k(tab_name, f"flt_{fkey}"), FILTERS[fkey][2])
 
     # values for header before rendering widgets
@@ -571,7 +821,7 @@ def render_tab(tab_name: str):
     topn_now   = st.session_state.get(_k(tab_name, "topn"),   "Top 10")
 
     def _ctx_list():
-        seq = ["artist","country","platform","release","track"]
+        seq = ["artist","country","platform","release","track"] + SEGMENT_FILTERS
         out = []
         for fkey in seq:
             val = st.session_state.get(_k(tab_name, f"flt_{fkey}"), FILTERS[fkey][2])
@@ -579,7 +829,7 @@ def render_tab(tab_name: str):
                 out.append(f'"{val}"' if fkey=="track" else val)
         return out
 
-    ctx_vals = _ctx_list()
+    ctx_vals = [d["label"] for d in st.session_state["drill"]] + _ctx_list()
     ctx_suffix = (" — " + ", ".join(ctx_vals)) if ctx_vals else ""
     title_map  = f"{topn_now} {plural} by {metric_now}{ctx_suffix}"
 
@@ -592,7 +842,7 @@ def render_tab(tab_name: str):
 
     # ── FILTERS PANEL (toolbar) ─────────────────────────
     st.markdown('<div class="toolbar-wrap">', unsafe_allow_html=True)
-    c_metric, c_topn, c_f1, c_f2, c_reset = st.columns([1, 1, 1, 1, .8], gap="small")
+    c_metric, c_topn, *c_filters, c_reset = st.columns([1, 1] + [1] * max(2, len(desired)) + [.8], gap="small")
 
     with c_metric:
         metric_labels = ["Earnings", "Streams", "Value per 1K Streams"]
@@ -617,36 +867,22 @@ def render_tab(tab_name: str):
         )
         top_n = int(top_n_option.split()[1])
 
-    # active filters (first 2 for tab)
-    active_filters = (desired + [None, None])[:2]
-    df_filt_stage = df.copy()
-
-    if active_filters[0] is not None:
-        f1 = active_filters[0]
-        label1, col1, def1 = FILTERS[f1]
-        opts1 = [def1] + (sorted(df_filt_stage[col1].dropna().unique().tolist()) if col1 in df_filt_stage.columns else [])
-        cur1_key = _k(tab_name, f"flt_{f1}")
-        if st.session_state.get(cur1_key) not in opts1:
-            st.session_state[cur1_key] = def1
-        with c_f1:
-            sel1 = st.selectbox(label1, opts1, key=cur1_key, label_visibility="collapsed", help=HELP.get(f1))
-        if sel1 != def1 and col1 in df_filt_stage.columns:
-            df_filt_stage = df_filt_stage[df_filt_stage[col1] == sel1]
-
-    if active_filters[1] is not None:
-        f2 = active_filters[1]
-        label2, col2, def2 = FILTERS[f2]
-        opts2 = [def2] + (sorted(df_filt_stage[col2].dropna().unique().tolist()) if col2 in df_filt_stage.columns else [])
-        cur2_key = _k(tab_name, f"flt_{f2}")
-        if st.session_state.get(cur2_key) not in opts2:
-            st.session_state[cur2_key] = def2
-        with c_f2:
-            sel2 = st.selectbox(label2, opts2, key=cur2_key, label_visibility="collapsed", help=HELP.get(f2))
-        if sel2 != def2 and col2 in df_filt_stage.columns:
-            df_filt_stage = df_filt_stage[df_filt_stage[col2] == sel2]
+    # active filters; each one's options come from the rows selected by the ones before it
+    applied = []   # (column, value) pairs of the active filters
+    for fkey, c_flt in zip(desired, c_filters):
+        label, col, default = FILTERS[fkey]
+        sel = _drill_path() + tuple(applied)
+        opts = [default] + cached(("options", col, sel), lambda: filter_options(df, (), col, _rows(sel)))
+        cur_key = _k(tab_name, f"flt_{fkey}")
+        if st.session_state.get(cur_key) not in opts:
+            st.session_state[cur_key] = default
+        with c_flt:
+            picked = st.selectbox(label, opts, key=cur_key, label_visibility="collapsed", help=HELP.get(fkey))
+        if picked != default and col in df.columns:
+            applied.append((col, picked))
 
     def _reset_current_tab():
-        for fkey in ["platform","country","artist","release","track"]:
+        for fkey in FILTERS:
             st.session_state[_k(tab_name, f"flt_{fkey}")] = FILTERS[fkey][2]
     with c_reset:
         st.button("Reset", use_container_width=True, on_click=_reset_current_tab, key=_k(tab_name, "reset"), help=HELP["reset"])
@@ -656,61 +892,179 @@ def render_tab(tab_name: str):
     st.markdown('<div class="gap-tight"></div>', unsafe_allow_html=True)
 
     # ── CHART ──────────────────────────────────────────────
-    df_filt = df_filt_stage
-    if df_filt.empty:
+    selection = _drill_path() + tuple(applied)   # drill-down steps, then this tab's filters
+    if periods is not None:
+        render_comparison(tab_name, selection, metric, int(top_n), periods)
+        return
+    view = cached(("tab", tab_name, selection), lambda: tab_view(df, tab_name, (), _rows(selection)))
+    if view is None:
         st.warning("No data to display. Try adjusting the filters.")
         return
 
-    key_col, label_col, default_title = resolve_dim_keys(tab_name, df_filt)
+    label_col, default_title = view["label_col"], view["title"]
     ctx_for_title = ", ".join(ctx_vals)
     chart_title = f"{default_title} by {metric}" + (f" — {ctx_for_title}" if ctx_for_title else "")
 
-    total_streams = float(df_filt["quantity"].sum())
-    total_revenue = float(df_filt["revenue"].sum())
+    total_streams = view["streams"]
+    total_revenue = view["revenue"]
     total_for_pct = total_revenue if metric == "Earnings" else (total_streams if metric == "Streams" else 0)
-
-    make_top_barplot(
-        df_src=df_filt, key_col=key_col, label_col=label_col, title=chart_title,
-        top_n=int(top_n), metric=metric, show_pct=DEFAULT_SHOW_PCT, total_value=total_for_pct
+    if metric == "Value per 1K Streams" and "sales_type" in segments and "sales_type" not in dict(selection):
+        n_types = len(cached(("segments", "sales_type"), lambda: segment_summary(df, "sales_type")))
+        if n_types > 1:
+            st.caption(f"Mixes {n_types} sales types — pick one to compare streams with streams.")
+
+    # the bars: filter + group + rank as one backend query; the RPM threshold is applied in the same pass
+    metric_col = METRIC_COLUMNS[metric]
+    min_streams = RPM_MIN_STREAMS if metric == "Value per 1K Streams" else 0
+    top = cached(("top", tab_name, selection, metric_col, int(top_n)),
+                 lambda: tab_top(df, tab_name, metric_col, int(top_n), _rows(selection), min_streams))
+    _, clicked = make_top_barplot(
+        data=top, title=chart_title,
+        metric=metric, show_pct=DEFAULT_SHOW_PCT, total_value=total_for_pct,
+        key=_k(tab_name, f"chart_{st.session_state['drill_rev']}"),
     )
+    if clicked is not None and pd.notna(clicked[view["key_col"]]):
+        _drill_into(view["key_col"], clicked[view["key_col"]], clicked["label"])
+        st.rerun()
+
+    render_concentration(tab_name, selection, view, metric)
 
     # ── EXPORT ───────────────────────────────────────────
-    agg = aggregate_with_labels(df_filt, key_col, label_col).copy()
-    agg = _disambiguate_labels(agg, key_col, "label")
-    agg["Value per 1K Streams"] = agg["rpm"]
-    if metric == "Value per 1K Streams":
-        agg = agg[agg["quantity"] >= RPM_MIN_STREAMS]
-    dim_col_name = {
-        "platform":"Platform",
-        "country":"Country",
-        "artist_name":"Artist",
-        "release_title":"Release",
-        "track_title":"Track",
-        "isrc":"Track",         # in case label_col is isrc
-        "upc":"Release"         # and for upc
-    }.get(label_col, label_col.title())
-    export_df = agg[["label","quantity","revenue","Value per 1K Streams"]].rename(
-        columns={"label": dim_col_name, "quantity":"Streams", "revenue":"Earnings"}
-    ).sort_values("Earnings" if metric=="Earnings" else ("Streams" if metric=="Streams" else "Value per 1K Streams"),
-                  ascending=False)
-
-    # SAFE: neutralize dangerous prefixes in dimension text to prevent CSV-formula execution in Excel
-    export_df[dim_col_name] = export_df[dim_col_name].map(lambda s: ("'" + s) if str(s).startswith(("+","-","=","@")) else s)
+    c_csv, c_parquet, c_arrow = st.columns([2, 1, 1], gap="small")
+    with c_csv:
+        st.download_button(
+            label="⬇️ Download table (CSV contains what you see in the chart)",
+            data=cached(("csv", tab_name, selection, metric), lambda: summary_csv(view, metric)),
+            file_name=f"{_slug(label_col)}_summary.csv",
+            mime="text/csv",
+            use_container_width=True,
+            key=_k(tab_name, "download"),
+        )
+    with c_parquet:
+        st.download_button(
+            label="⬇️ Parquet",
+            data=lambda: cached(("parquet", tab_name, selection, metric), lambda: to_parquet(summary_table(view, metric))),
+            file_name=f"{_slug(label_col)}_summary.parquet",
+            mime=PARQUET_MIME,
+            use_container_width=True,
+            key=_k(tab_name, "download_parquet"),
+            help=HELP["typed"],
+        )
+    with c_arrow:
+        st.download_button(
+            label="⬇️ Arrow",
+            data=lambda: cached(("arrow", tab_name, selection, metric), lambda: to_arrow_ipc(summary_table(view, metric))),
+            file_name=f"{_slug(label_col)}_summary.arrow",
+            mime=ARROW_MIME,
+            use_container_width=True,
+            key=_k(tab_name, "download_arrow"),
+            help=HELP["typed"],
+        )
 
+def _export_comparison_csv(data: pd.DataFrame, tab_name: str, metric: str, prev: tuple, cur: tuple) -> bytes:
+    dim_name = {"Platforms": "Platform", "Countries": "Country", "Artists": "Artist",
+                "Releases": "Release", "Tracks": "Track"}.get(tab_name, "Item")
+    data = data.sort_values("delta", key=lambda s: s.abs(), ascending=False)
+    export_df = pd.DataFrame({
+        dim_name: data["label"].map(lambda s: ("'" + s) if str(s).startswith(("+", "-", "=", "@")) else s),
+        f"{metric} {_period_txt(prev)}": data["prev"],
+        f"{metric} {_period_txt(cur)}": data["current"],
+        "Change": data["delta"],
+        "Growth %": (data["growth"] * 100).round(2),
+        "Status": data["status"],
+    })
+    return export_df.to_csv(index=False).encode("utf-8-sig")
+
+# ── FORECAST ─────────────────────────────────────────────
+def render_forecast():
+    """Projected earnings / streams per artist, release or platform for the current drill-down."""
+    st.markdown('<div class="toolbar-wrap">', unsafe_allow_html=True)
+    c_dim, c_metric, c_topn, c_horizon = st.columns([1, 1, 1, 2], gap="small")
+    with c_dim:
+        dim = st.selectbox("Forecast by", FORECAST_TABS, key="Forecast__dim",
+                           label_visibility="collapsed", help=HELP["forecast"])
+    with c_metric:
+        metric = st.selectbox("Metric", ["Earnings", "Streams"], key="Forecast__metric",
+                              label_visibility="collapsed", help=HELP["metric"])
+    with c_topn:
+        top_opts = ["Top 5", "Top 10", "Top 15", "Top 20", "Top 25"]
+        top_n = int(st.selectbox("Top", top_opts, index=1, key="Forecast__topn",
+                                 label_visibility="collapsed", help=HELP["topn"]).split()[1])
+    with c_horizon:
+        horizon = st.select_slider("Months ahead", list(range(3, MAX_HORIZON + 1)), value=6, key="Forecast__horizon")
+    st.markdown('</div>', unsafe_allow_html=True)
+
+    path = _drill_path()
+    view = cached(("forecast", dim, path), lambda: forecast_view(df, dim, _rows(path)))
+    if view is None:
+        st.info(f"Forecasts need at least {MIN_MONTHS} reporting months given as dates (e.g. 2024-01).")
+        return
+    metric_col = "revenue" if metric == "Earnings" else "quantity"
+    fmt = fmt_amt if metric == "Earnings" else fmt_int
+    table = forecast_table(view, metric_col, horizon)
+    n_recent = recent_months(view, horizon)
+    actual = view["history"][metric_col].sum(axis=0)
+    projected = view["forecast"][metric_col][:, :horizon].sum(axis=0)
+    recent, ahead = float(actual[-n_recent:].sum()), float(projected.sum())
+    monthly_change = (ahead / horizon - recent / n_recent) / abs(recent / n_recent) if recent else None
+
+    ctx = [d["label"] for d in st.session_state["drill"]]
+    st.markdown(f'<div class="flt-guide">{_safe_str(f"{metric} — next {horizon} months" + (" — " + ", ".join(ctx) if ctx else ""))}</div>',
+                unsafe_allow_html=True)
+    c1, c2, c3 = st.columns(3)
+    c1.metric(f"Last {n_recent} months", fmt(recent))
+    c2.metric(f"Next {horizon} months (projected)", fmt(ahead),
+              delta=None if monthly_change is None else f"{monthly_change:+.1%} per month",
+              help="Change of the monthly average against the last months of the report")
+    c3.metric(f"{dim} projected", fmt_int(len(table)))
+    make_forecast_chart(view["months"], actual, view["future"][:horizon], projected, metric)
+
+    top = top_k(table, "projected", top_n)
+    st.dataframe(
+        pd.DataFrame({
+            dim[:-1]: top["label"],
+            f"Last {n_recent} months": top["recent"].map(fmt),
+            f"Next {horizon} months": top["projected"].map(fmt),
+            "Monthly change": top["change"].map(lambda g: "—" if pd.isna(g) else f"{g:+.0%}"),
+            "Model": top["model"],
+        }),
+        hide_index=True, use_container_width=True,
+    )
     st.download_button(
-        label="⬇️ Download table (CSV contains what you see in the chart)",
-        data=export_df.to_csv(index=False).encode("utf-8-sig"),
-        file_name=f"{_slug(label_col)}_summary.csv",
+        label="⬇️ Download forecast (CSV, every entity by month)",
+        data=cached(("forecast_csv", dim, path, metric, horizon),
+                    lambda: _export_forecast_csv(table, dim, metric, n_recent, horizon)),
+        file_name=f"{_slug(dim)}_forecast.csv",
         mime="text/csv",
         use_container_width=True,
-        key=_k(tab_name, "download"),
+        key="Forecast__download",
     )
 
+def _export_forecast_csv(table: pd.DataFrame, dim: str, metric: str, n_recent: int, horizon: int) -> bytes:
+    table = table.sort_values("projected", ascending=False)
+    months = [c for c in table.columns if c not in ("label", "model", "recent", "projected", "change")]
+    export_df = pd.DataFrame({
+        dim[:-1]: table["label"].map(lambda s: ("'" + s) if str(s).startswith(("+", "-", "=", "@")) else s),
+        f"{metric} last {n_recent} months": table["recent"],
+        f"{metric} next {horizon} months": table["projected"].round(2),
+        "Monthly change %": (table["change"] * 100).round(2),
+        "Model": table["model"],
+    })
+    for month in months:
+        export_df[month] = table[month].round(2)
+    return export_df.to_csv(index=False).encode("utf-8-sig")
+
 # ─────────────────────────────────────────────────────────
-tabs = st.tabs(["Platforms", "Countries", "Artists", "Releases", "Tracks"])
-for name, pane in zip(["Platforms","Countries","Artists","Releases","Tracks"], tabs):
+render_drill_bar()
+render_catalog_kpis()
+periods = render_compare_bar()
+render_full_export()
+tabs = st.tabs(TABS + ["Forecast"])
+for name, pane in zip(TABS, tabs):
     with pane:
-        render_tab(name)
+        render_tab(name, periods)
+with tabs[-1]:
+    render_forecast()
 
 # --- Footer with Privacy & Terms (only on homepage) ---
 st.markdown("---")